@@ -2,13 +2,49 @@
 DAG Airflow per sincronitzar dades de qualitat cada nit
 airflow_db.qualitat → documentacio_tecnica.qualitat
 
-Aquest DAG copia les 4 taules de mesures cada nit a les 00:00
+Aquest DAG sincronitza les 4 taules de mesures cada nit a les 00:00, amb una
+tasca per taula (en paral·lel). Una tasca prèvia crea la taula de marques
+d'aigua (qualitat.sync_watermarks), perquè les tasques en paral·lel no hi
+facin DDL a la vegada.
+
+- Incremental (per defecte): només es copien les files amb la columna de
+  marca d'aigua (updated_at, data_hora o id) >= l'última marca guardada.
+  Les files es copien amb COPY a una taula de staging i s'integren amb un
+  upsert per la clau primària; l'upsert i la nova marca es confirmen en la
+  mateixa transacció. La marca que es guarda és el màxim copiat menys un
+  marge (WATERMARK_SAFETY_LAG): una transacció de l'origen que es confirma
+  tard amb un valor més petit que el màxim es copia a la nit següent.
+- Completa: la primera vegada, si la taula no té clau primària o columna de
+  marca, o si el DAG s'executa amb {"full_refresh": true}. La còpia es fa a
+  una taula nova que substitueix l'actual amb un RENAME atòmic: els lectors
+  mai veuen la taula buida. Si la taula té vistes que en depenen o claus
+  foranes (que no es poden moure a la taula nova), es refresca al seu lloc
+  dins d'una transacció.
+
+Les files esborrades a l'origen només desapareixen del destí amb una
+sincronització completa. Cada tasca retorna (XCom) i envia a StatsD les
+files copiades, els bytes i la durada.
 """
+import time
+import tempfile
 from airflow import DAG
 from airflow.operators.python import PythonOperator
 from airflow.providers.postgres.hooks.postgres import PostgresHook
 from datetime import datetime, timedelta
 
+try:
+    from airflow.stats import Stats
+    STATS_AVAILABLE = True
+except ImportError:
+    STATS_AVAILABLE = False
+
+# Còpia en streaming amb buffer acotat si el repositori és al path del DAG
+try:
+    from src.database.copy_stream import stream_copy
+    COPY_STREAM_AVAILABLE = True
+except ImportError:
+    COPY_STREAM_AVAILABLE = False
+
 # Configuració
 DEFAULT_ARGS = {
     'owner': 'airflow',
@@ -27,79 +63,488 @@ TABLES = [
     'mesurestorsio'
 ]
 
+SCHEMA = 'qualitat'
+
+# Marca d'aigua de cada taula (es confirma amb les dades)
+WATERMARK_TABLE = f'{SCHEMA}.sync_watermarks'
+
+# Columnes de marca d'aigua per ordre de preferència
+WATERMARK_COLUMNS = ['updated_at', 'data_hora', 'id']
+
+# Marge que es resta al màxim copiat abans de guardar-lo com a marca: cobreix
+# les transaccions de l'origen que es confirmen després de la còpia amb un
+# valor anterior (les files repetides les absorbeix l'upsert)
+WATERMARK_SAFETY_LAG = {
+    'updated_at': timedelta(hours=1),
+    'data_hora': timedelta(hours=1),
+    'id': 10000,
+}
+
+# Sufixos de les taules de la substitució atòmica
+SWAP_NEW_SUFFIX = '__sync_new'
+SWAP_OLD_SUFFIX = '__sync_old'
+
+# Memòria màxima del buffer de còpia sense copy_stream (la resta va a disc)
+SPOOL_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _table_columns(conn, table_name):
+    """Columnes d'una taula del schema qualitat, per ordre"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = %s AND table_name = %s
+            ORDER BY ordinal_position
+        """, (SCHEMA, table_name))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _primary_key_columns(conn, table_name):
+    """Columnes de la clau primària (buida si no en té)"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY array_position(i.indkey::int2[], a.attnum)
+        """, (f"{SCHEMA}.{table_name}",))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ensure_watermark_table(**context):
+    """
+    Crea la taula de marques d'aigua (tasca única abans de les sincronitzacions)
+
+    Un CREATE TABLE IF NOT EXISTS concurrent des de les tasques en paral·lel
+    pot fallar amb una violació d'unicitat a pg_type.
+    """
+    target_hook = PostgresHook(postgres_conn_id='documentacio_tecnica')
+    target_conn = target_hook.get_conn()
+    try:
+        with target_conn.cursor() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+                    table_name character varying(100) PRIMARY KEY,
+                    watermark_column character varying(100) NOT NULL,
+                    watermark_value text,
+                    rows_copied bigint,
+                    duration_seconds double precision,
+                    synced_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        target_conn.commit()
+        print(f"[OK] Taula de marques d'aigua {WATERMARK_TABLE} disponible")
+    finally:
+        target_conn.close()
+
+
+def _read_watermark(conn, table_name):
+    """(columna, valor) de l'última sincronització o None"""
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT watermark_column, watermark_value
+            FROM {WATERMARK_TABLE}
+            WHERE table_name = %s
+        """, (table_name,))
+        row = cursor.fetchone()
+    conn.commit()
+    return row
+
+
+def _save_watermark(cursor, table_name, column, value, rows, duration):
+    """Guarda la marca d'aigua dins de la transacció de les dades"""
+    cursor.execute(f"""
+        INSERT INTO {WATERMARK_TABLE}
+            (table_name, watermark_column, watermark_value, rows_copied, duration_seconds, synced_at)
+        VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (table_name) DO UPDATE SET
+            watermark_column = EXCLUDED.watermark_column,
+            watermark_value = COALESCE(EXCLUDED.watermark_value, {WATERMARK_TABLE}.watermark_value),
+            rows_copied = EXCLUDED.rows_copied,
+            duration_seconds = EXCLUDED.duration_seconds,
+            synced_at = EXCLUDED.synced_at
+    """, (table_name, column, value, rows, duration))
+
+
+def _lagged_watermark(cursor, table, column):
+    """Màxim de la columna de marca a la taula menys WATERMARK_SAFETY_LAG (text o None)"""
+    lag = WATERMARK_SAFETY_LAG.get(column)
+    if lag is None:
+        cursor.execute(f"SELECT MAX({column})::text FROM {table}")
+    else:
+        cursor.execute(f"SELECT (MAX({column}) - %s)::text FROM {table}", (lag,))
+    return cursor.fetchone()[0]
+
+
+def _merge_staging(cursor, table_name, staging_table, columns, key_columns):
+    """
+    Upsert de la taula de staging a la taula del destí per la clau primària
+
+    Returns:
+        tuple: (files inserides, files actualitzades)
+    """
+    columns_str = ', '.join(columns)
+    keys_str = ', '.join(key_columns)
+    update_columns = [col for col in columns if col not in key_columns]
+    conflict_action = ('UPDATE SET ' + ', '.join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+                       if update_columns else 'NOTHING')
+    cursor.execute(f"""
+        WITH merged AS (
+            INSERT INTO {SCHEMA}.{table_name} ({columns_str})
+            SELECT DISTINCT ON ({keys_str}) {columns_str}
+            FROM {staging_table}
+            ORDER BY {keys_str}, ctid DESC
+            ON CONFLICT ({keys_str}) DO {conflict_action}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+        FROM merged
+    """)
+    return cursor.fetchone()
+
+
+def _create_staging_table(target_conn, table_name):
+    """Taula temporal amb l'estructura de la taula del destí (s'elimina al commit)"""
+    staging_table = f"stg_sync_{table_name}"
+    with target_conn.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMP TABLE {staging_table}
+            (LIKE {SCHEMA}.{table_name} INCLUDING DEFAULTS)
+            ON COMMIT DROP
+        """)
+    return staging_table
+
+
+def _copy_rows(source_conn, target_conn, select_sql, target_table, columns):
+    """
+    COPY de l'origen a una taula del destí (sense commit)
+
+    Returns:
+        dict: rows i bytes copiats
+    """
+    if COPY_STREAM_AVAILABLE:
+        stats = stream_copy(source_conn, target_conn, select_sql, target_table, columns)
+        return {'rows': stats['rows'], 'bytes': stats['bytes']}
+
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as buffer:
+        with source_conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT", buffer)
+        size = buffer.tell()
+        buffer.seek(0)
+        with target_conn.cursor() as cursor:
+            cursor.copy_expert(f"COPY {target_table} ({', '.join(columns)}) FROM STDIN", buffer)
+            return {'rows': cursor.rowcount, 'bytes': size}
+
+
+def _incremental_sync(source_conn, target_conn, table_name, columns, key_columns,
+                      watermark_column, watermark_value, start_time):
+    """Copia les files noves o modificades a staging i fa l'upsert"""
+    columns_str = ', '.join(columns)
+
+    with source_conn.cursor() as cursor:
+        # >=: les files amb la mateixa marca que l'última es tornen a copiar (l'upsert és idempotent)
+        select_sql = cursor.mogrify(f"""
+            SELECT {columns_str}
+            FROM {SCHEMA}.{table_name}
+            WHERE {watermark_column} >= %s
+            ORDER BY {watermark_column}
+        """, (watermark_value,)).decode('utf-8')
+
+    staging_table = _create_staging_table(target_conn, table_name)
+    copied = _copy_rows(source_conn, target_conn, select_sql, staging_table, columns)
+
+    with target_conn.cursor() as cursor:
+        inserted, updated = _merge_staging(cursor, table_name, staging_table, columns, key_columns)
+        # Sense files noves es manté la marca anterior (COALESCE a _save_watermark)
+        new_watermark = _lagged_watermark(cursor, staging_table, watermark_column)
+        _save_watermark(cursor, table_name, watermark_column, new_watermark,
+                        copied['rows'], time.perf_counter() - start_time)
+    target_conn.commit()
+
+    return {**copied, 'inserted': inserted, 'updated': updated, 'watermark': new_watermark or watermark_value}
+
+
+def _dependent_objects(conn, table_name):
+    """
+    Vistes i claus foranes lligades a la taula (impedeixen la substitució)
+
+    Les vistes i les claus foranes d'altres taules apunten a l'oid de la
+    taula actual, i LIKE ... INCLUDING ALL no copia les claus foranes pròpies.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT 'vista ' || v.oid::regclass::text
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            JOIN pg_class v ON v.oid = r.ev_class
+            WHERE d.classid = 'pg_rewrite'::regclass
+              AND d.refobjid = %(table)s::regclass AND v.oid <> d.refobjid
+            UNION
+            SELECT 'clau forana ' || c.conname || ' de ' || c.conrelid::regclass::text
+            FROM pg_constraint c
+            WHERE c.contype = 'f'
+              AND (c.confrelid = %(table)s::regclass OR c.conrelid = %(table)s::regclass)
+            ORDER BY 1
+        """, {'table': f"{SCHEMA}.{table_name}"})
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _index_names_by_definition(cursor, table_name):
+    """
+    Índexs d'una taula agrupats per definició (sense nom ni taula)
+
+    Returns:
+        dict: (únic, 'USING ...') -> llista de noms
+    """
+    cursor.execute("""
+        SELECT c.relname, i.indisunique, substring(pg_get_indexdef(i.indexrelid) FROM ' USING .*$')
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY c.relname
+    """, (f"{SCHEMA}.{table_name}",))
+    indexes = {}
+    for name, unique, definition in cursor.fetchall():
+        indexes.setdefault((unique, definition), []).append(name)
+    return indexes
+
+
+def _full_refresh_in_place(source_conn, target_conn, table_name, columns, key_columns,
+                           watermark_column, start_time):
+    """
+    Sincronització completa sense substituir la taula (té vistes o claus foranes)
+
+    Es copia tot a staging i, en una sola transacció, s'esborren les files que
+    ja no són a l'origen i es fa l'upsert de la resta (sense clau primària:
+    DELETE + INSERT). Els lectors veuen la taula antiga fins al commit.
+    """
+    staging_table = _create_staging_table(target_conn, table_name)
+    copied = _copy_rows(source_conn, target_conn, f"SELECT {', '.join(columns)} FROM {SCHEMA}.{table_name}",
+                        staging_table, columns)
+
+    with target_conn.cursor() as cursor:
+        if key_columns:
+            key_match = ' AND '.join(f"s.{col} = t.{col}" for col in key_columns)
+            cursor.execute(f"""
+                DELETE FROM {SCHEMA}.{table_name} t
+                WHERE NOT EXISTS (SELECT 1 FROM {staging_table} s WHERE {key_match})
+            """)
+            inserted, updated = _merge_staging(cursor, table_name, staging_table, columns, key_columns)
+        else:
+            cursor.execute(f"DELETE FROM {SCHEMA}.{table_name}")
+            cursor.execute(f"INSERT INTO {SCHEMA}.{table_name} ({', '.join(columns)}) "
+                           f"SELECT {', '.join(columns)} FROM {staging_table}")
+            inserted, updated = cursor.rowcount, 0
+
+        new_watermark = None
+        if watermark_column:
+            new_watermark = _lagged_watermark(cursor, staging_table, watermark_column)
+            _save_watermark(cursor, table_name, watermark_column, new_watermark,
+                            copied['rows'], time.perf_counter() - start_time)
+    target_conn.commit()
+
+    return {**copied, 'inserted': inserted, 'updated': updated, 'watermark': new_watermark}
+
+
+def _full_refresh_swap(source_conn, target_conn, table_name, columns, watermark_column, start_time):
+    """
+    Copia tota la taula a una taula nova i la substitueix amb un RENAME atòmic
+
+    La taula nova hereta columnes, índexs i restriccions CHECK/NOT NULL
+    (LIKE ... INCLUDING ALL), els permisos i les seqüències de la taula
+    actual. Els índexs es creen amb noms generats a partir de la taula nova;
+    després de la substitució es reanomenen amb els noms originals,
+    aparellats per definició. Només es fa servir si la taula no té vistes ni
+    claus foranes (_dependent_objects).
+    """
+    new_table = f"{table_name}{SWAP_NEW_SUFFIX}"
+    old_table = f"{table_name}{SWAP_OLD_SUFFIX}"
+
+    with target_conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SCHEMA}.{new_table}")
+        cursor.execute(f"CREATE TABLE {SCHEMA}.{new_table} (LIKE {SCHEMA}.{table_name} INCLUDING ALL)")
+    target_conn.commit()
+
+    try:
+        copied = _copy_rows(source_conn, target_conn, f"SELECT {', '.join(columns)} FROM {SCHEMA}.{table_name}",
+                            f"{SCHEMA}.{new_table}", columns)
+
+        with target_conn.cursor() as cursor:
+            cursor.execute(f"ANALYZE {SCHEMA}.{new_table}")
+
+            # Permisos de la taula actual
+            cursor.execute("""
+                SELECT grantee, privilege_type
+                FROM information_schema.role_table_grants
+                WHERE table_schema = %s AND table_name = %s AND grantee <> current_user
+            """, (SCHEMA, table_name))
+            for grantee, privilege in cursor.fetchall():
+                grantee = grantee if grantee == 'PUBLIC' else f'"{grantee}"'
+                cursor.execute(f"GRANT {privilege} ON {SCHEMA}.{new_table} TO {grantee}")
+
+            # Les seqüències (serial) han de sobreviure al DROP de la taula antiga
+            cursor.execute("""
+                SELECT s.relname, a.attname
+                FROM pg_depend d
+                JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+                JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+                WHERE d.refobjid = %s::regclass AND d.deptype IN ('a', 'i')
+            """, (f"{SCHEMA}.{table_name}",))
+            for sequence, column in cursor.fetchall():
+                cursor.execute(f"ALTER SEQUENCE {SCHEMA}.{sequence} OWNED BY {SCHEMA}.{new_table}.{column}")
+
+            new_watermark = None
+            if watermark_column:
+                new_watermark = _lagged_watermark(cursor, f"{SCHEMA}.{new_table}", watermark_column)
+
+            # Substitució atòmica: els lectors veuen la taula antiga fins al commit
+            cursor.execute(f"LOCK TABLE {SCHEMA}.{table_name} IN ACCESS EXCLUSIVE MODE")
+            original_indexes = _index_names_by_definition(cursor, table_name)
+            new_indexes = _index_names_by_definition(cursor, new_table)
+            cursor.execute(f"ALTER TABLE {SCHEMA}.{table_name} RENAME TO {old_table}")
+            cursor.execute(f"ALTER TABLE {SCHEMA}.{new_table} RENAME TO {table_name}")
+            # Falla (i es desfà tot) si s'ha creat una vista o clau forana des de la comprovació
+            cursor.execute(f"DROP TABLE {SCHEMA}.{old_table}")
+
+            # Els índexs recuperen els noms originals (els de restriccions també
+            # reanomenen la restricció)
+            for definition, names in new_indexes.items():
+                for new_name, original_name in zip(names, original_indexes.get(definition, [])):
+                    if new_name != original_name:
+                        cursor.execute(f'ALTER INDEX {SCHEMA}."{new_name}" RENAME TO "{original_name}"')
+
+            if watermark_column:
+                _save_watermark(cursor, table_name, watermark_column, new_watermark,
+                                copied['rows'], time.perf_counter() - start_time)
+        target_conn.commit()
+    except Exception:
+        target_conn.rollback()
+        with target_conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {SCHEMA}.{new_table}")
+        target_conn.commit()
+        raise
+
+    return {**copied, 'inserted': copied['rows'], 'updated': 0, 'watermark': new_watermark}
+
+
+def _export_metrics(table_name, result):
+    """Envia les mètriques de la tasca a StatsD (si està configurat)"""
+    if not STATS_AVAILABLE:
+        return
+    Stats.gauge(f"qualitat_sync.{table_name}.rows_copied", result['rows'])
+    Stats.gauge(f"qualitat_sync.{table_name}.bytes_copied", result['bytes'])
+    Stats.timing(f"qualitat_sync.{table_name}.duration", timedelta(seconds=result['duration_seconds']))
+
+
 def sync_table(table_name, **context):
-    """Sincronitza una taula de airflow_db a documentacio_tecnica"""
-    
+    """
+    Sincronitza una taula de airflow_db a documentacio_tecnica
+
+    Returns:
+        dict: Mètriques de la tasca (XCom): mode, rows, bytes, inserted,
+        updated, watermark, duration_seconds i rows_per_second
+    """
+    start_time = time.perf_counter()
+
     # Hooks per les dues bases de dades
     # Nota: Configurar aquestes connexions a Airflow UI → Admin → Connections
     source_hook = PostgresHook(postgres_conn_id='airflow_db')
     target_hook = PostgresHook(postgres_conn_id='documentacio_tecnica')
-    
+
     source_conn = source_hook.get_conn()
     target_conn = target_hook.get_conn()
-    
+
     try:
-        # Comptar registres origen
-        with source_conn.cursor() as cursor:
-            cursor.execute(f"SELECT COUNT(*) FROM qualitat.{table_name}")
-            count = cursor.fetchone()[0]
-        
-        print(f"[INFO] {table_name}: {count:,} registres a l'origen")
-        
-        if count == 0:
-            print(f"[INFO] {table_name}: Taula buida, saltant")
-            return
-        
-        # Truncar taula destí
-        with target_conn.cursor() as cursor:
-            cursor.execute(f"TRUNCATE TABLE qualitat.{table_name}")
+        source_columns = _table_columns(source_conn, table_name)
+        target_columns = set(_table_columns(target_conn, table_name))
+        columns = [col for col in source_columns if col in target_columns]
+        key_columns = _primary_key_columns(target_conn, table_name)
+        watermark_column = next((col for col in WATERMARK_COLUMNS if col in columns), None)
+        watermark = _read_watermark(target_conn, table_name)
+
+        dag_run = context.get('dag_run')
+        full_refresh = bool(dag_run and dag_run.conf and dag_run.conf.get('full_refresh'))
+        incremental = (not full_refresh and watermark is not None and watermark[1] is not None
+                       and watermark[0] == watermark_column
+                       and key_columns and all(col in columns for col in key_columns))
+
+        if incremental:
+            print(f"[INFO] {table_name}: incremental des de {watermark_column} >= {watermark[1]}")
+            result = _incremental_sync(source_conn, target_conn, table_name, columns, key_columns,
+                                       watermark_column, watermark[1], start_time)
+            mode = 'incremental'
+        else:
+            dependents = _dependent_objects(target_conn, table_name)
             target_conn.commit()
-        
-        print(f"[INFO] {table_name}: Taula destí truncada")
-        
-        # Copiar dades
-        with source_conn.cursor() as source_cursor:
-            source_cursor.execute(f"SELECT * FROM qualitat.{table_name}")
-            
-            columns = [desc[0] for desc in source_cursor.description]
-            columns_str = ", ".join(columns)
-            placeholders = ", ".join(["%s"] * len(columns))
-            
-            with target_conn.cursor() as target_cursor:
-                batch_size = 5000
-                copied = 0
-                
-                while True:
-                    rows = source_cursor.fetchmany(batch_size)
-                    if not rows:
-                        break
-                    
-                    query = f"INSERT INTO qualitat.{table_name} ({columns_str}) VALUES ({placeholders})"
-                    target_cursor.executemany(query, rows)
-                    target_conn.commit()
-                    copied += len(rows)
-                    
-                    print(f"[INFO] {table_name}: {copied:,} / {count:,} registres copiats")
-        
-        print(f"[OK] {table_name}: Sincronització completada ({copied:,} registres)")
-        
+            if dependents:
+                print(f"[INFO] {table_name}: sincronització completa al seu lloc "
+                      f"({', '.join(dependents)} impedeixen la substitució)")
+                merge_keys = key_columns if all(col in columns for col in key_columns) else []
+                result = _full_refresh_in_place(source_conn, target_conn, table_name, columns, merge_keys,
+                                                watermark_column, start_time)
+            else:
+                print(f"[INFO] {table_name}: sincronització completa amb substitució atòmica")
+                result = _full_refresh_swap(source_conn, target_conn, table_name, columns,
+                                            watermark_column, start_time)
+            mode = 'full'
+
+        duration = time.perf_counter() - start_time
+        result.update({
+            'table': table_name,
+            'mode': mode,
+            'duration_seconds': duration,
+            'rows_per_second': result['rows'] / duration if duration > 0 else 0.0
+        })
+        _export_metrics(table_name, result)
+
+        print(f"[OK] {table_name}: Sincronització {mode} completada ({result['rows']:,} registres, "
+              f"{result['inserted']:,} nous, {result['updated']:,} actualitzats, "
+              f"{result['bytes'] / (1024 * 1024):.1f} MB en {duration:.1f} s)")
+        return result
+
     except Exception as e:
         print(f"[ERROR] {table_name}: {e}")
+        target_conn.rollback()
         raise
     finally:
         source_conn.close()
         target_conn.close()
 
+
+def report_sync_metrics(**context):
+    """Resum de les mètriques de totes les taules (XCom de les tasques)"""
+    task_instance = context['ti']
+    total_rows = 0
+    for table in TABLES:
+        result = task_instance.xcom_pull(task_ids=f'sync_{table}')
+        if not result:
+            print(f"[ERROR] {table}: sense resultat")
+            continue
+        total_rows += result['rows']
+        print(f"[INFO] {table}: {result['mode']}, {result['rows']:,} registres, "
+              f"{result['duration_seconds']:.1f} s, {result['rows_per_second']:.0f} reg/s")
+    print(f"[OK] Total: {total_rows:,} registres copiats")
+    return {'total_rows': total_rows}
+
 # Crear DAG
 with DAG(
     'sync_qualitat_db_nightly',
     default_args=DEFAULT_ARGS,
-    description='Sincronització nocturna de dades de qualitat',
+    description='Sincronització nocturna incremental de dades de qualitat',
     schedule_interval='0 0 * * *',  # Cada dia a les 00:00
     catchup=False,
+    max_active_tasks=len(TABLES),
     tags=['database', 'sync', 'qualitat'],
 ) as dag:
-    
+
+    # La taula de marques d'aigua es crea una sola vegada abans de les sincronitzacions
+    watermark_task = PythonOperator(
+        task_id='ensure_watermark_table',
+        python_callable=ensure_watermark_table,
+    )
+
     # Crear una tasca per cada taula
     sync_tasks = []
     for table in TABLES:
@@ -109,6 +554,12 @@ with DAG(
             op_kwargs={'table_name': table},
         )
         sync_tasks.append(task)
-    
-    # Les taules es poden sincronitzar en paral·lel
-    # (no hi ha dependències entre elles)
+
+    # Les taules es sincronitzen en paral·lel (no hi ha dependències entre
+    # elles); el resum s'executa encara que alguna tasca falli
+    report_task = PythonOperator(
+        task_id='report_sync_metrics',
+        python_callable=report_sync_metrics,
+        trigger_rule='all_done',
+    )
+    watermark_task >> sync_tasks >> report_task
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark de construcció del dataset global del NetworkScanner
+
+Compara l'acumulació antiga (pd.concat a cada fitxer, O(n²)) amb el
+DatasetAccumulator (concatenació única, O(n)) per diferents nombres de fitxers.
+
+Ús:
+    python scripts/benchmark_global_dataset.py [--rows 40] [--files 250 500 1000 2000]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.dataset_accumulator import DatasetAccumulator
+
+
+def make_file_frame(rows: int, index: int) -> pd.DataFrame:
+    """Genera un DataFrame similar al d'un CSV GOMPC ja netejat"""
+    return pd.DataFrame({
+        'Element': [f"ELEMENT {i}" for i in range(rows)],
+        'Actual': np.random.normal(10.0, 0.02, rows),
+        'Nominal': 10.0,
+        'Tol -': -0.05,
+        'Tol +': 0.05,
+        'CLIENT': 'AUTOLIV',
+        'FASE': 'Única',
+        'REFERENCIA': '665220400',
+        'LOT': f"LOT{index:06d}",
+        'DATA_HORA': '2025-01-31 22:01:56',
+    })
+
+
+def bench_repeated_concat(frames) -> float:
+    start = time.perf_counter()
+    dataset = pd.DataFrame()
+    for df in frames:
+        if dataset.empty:
+            dataset = df.copy()
+        else:
+            dataset = pd.concat([dataset, df], ignore_index=True)
+    return time.perf_counter() - start
+
+
+def bench_accumulator(frames) -> float:
+    start = time.perf_counter()
+    accumulator = DatasetAccumulator()
+    for df in frames:
+        accumulator.append(df)
+    accumulator.materialize()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del dataset global")
+    parser.add_argument('--rows', type=int, default=40, help="Files per fitxer CSV")
+    parser.add_argument('--files', type=int, nargs='+', default=[250, 500, 1000, 2000],
+                        help="Nombres de fitxers a provar")
+    args = parser.parse_args()
+
+    print(f"\n📊 Benchmark dataset global ({args.rows} files per fitxer)")
+    print(f"{'Fitxers':>8} | {'pd.concat (s)':>14} | {'Accumulator (s)':>16} | {'Millora':>8}")
+    print("-" * 56)
+
+    for n_files in args.files:
+        frames = [make_file_frame(args.rows, i) for i in range(n_files)]
+        t_concat = bench_repeated_concat(frames)
+        t_acc = bench_accumulator(frames)
+        print(f"{n_files:>8} | {t_concat:>14.3f} | {t_acc:>16.3f} | {t_concat / t_acc:>7.1f}x")
+
+    print("\nEl temps de pd.concat creix de forma quadràtica amb el nombre de fitxers;")
+    print("el de l'acumulador creix de forma lineal.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark de QualityMeasurementDBAdapter.prepare_dataset_for_insertion
+
+Compara la preparació per cel·la anterior (.apply amb les funcions escalars
+del ValueCleaner) amb la preparació per columnes i comprova que el resultat
+és idèntic.
+
+Ús:
+    python scripts/benchmark_prepare_dataset.py [--rows 1000000] [--elements 400]
+"""
+import sys
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+from src.services.value_cleaner import ValueCleaner
+
+
+def make_dataset(rows: int, elements: int = 400) -> pd.DataFrame:
+    """Genera un dataset similar al dataset global del NetworkScanner"""
+    rng = np.random.default_rng(0)
+    element_ids = rng.integers(0, elements, rows)
+    lot_ids = np.arange(rows) // (elements * 5)
+    actual = rng.normal(10.0, 0.02, rows).round(4)
+    return pd.DataFrame({
+        'CLIENT': 'AUTOLIV',
+        'REFERENCIA': '665220400',
+        'LOT': [f"LOT{lot:06d}" for lot in lot_ids],
+        'DATA_HORA': '31/01/2025 22:01',
+        'FASE': 'Única',
+        'Element': [f"ΔELEMENT {i}" for i in element_ids],
+        'Property': np.where(element_ids % 3 == 0, 'Diàmetre', 'Posició'),
+        'Nominal': '10,000',
+        'Actual': [f"{value:.4f}".replace('.', ',') for value in actual],
+        'Tol -': '-0,050',
+        'Tol +': '+0,050',
+        'Dev': [f"{value - 10:.4f}" for value in actual],
+        'Out': np.where(np.abs(actual - 10) > 0.05, '±0,01', ''),
+    })
+
+
+def prepare_dataset_rowwise(adapter: QualityMeasurementDBAdapter, df: pd.DataFrame) -> pd.DataFrame:
+    """Preparació anterior, valor a valor (referència per comparar)"""
+    def normalize_text(value):
+        if isinstance(value, pd.Series):
+            return value.apply(lambda x: ValueCleaner.normalize_unicode_text(str(x)) if not pd.isna(x) else "")
+        if pd.isna(value):
+            return ""
+        return ValueCleaner.normalize_unicode_text(str(value))
+
+    prepared_df = df.copy()
+    prepared_df = prepared_df.loc[:, ~prepared_df.columns.duplicated()]
+
+    prepared_df = prepared_df.copy()
+    for col in prepared_df.select_dtypes(include=['object']).columns:
+        prepared_df[col] = prepared_df[col].apply(
+            lambda x: ValueCleaner.normalize_unicode_text(str(x)) if not pd.isna(x) else x
+        )
+
+    for col in ['CLIENT', 'REFERENCIA', 'LOT']:
+        if col not in prepared_df.columns:
+            return pd.DataFrame()
+
+    prepared_df['id_referencia_some'] = (
+        normalize_text(prepared_df['CLIENT'].astype(str)) + '_' +
+        normalize_text(prepared_df['REFERENCIA'].astype(str)) + '_' +
+        normalize_text(prepared_df['LOT'].astype(str))
+    )
+
+    element_col = prepared_df.get('Element', pd.Series(['UNKNOWN'] * len(prepared_df)))
+    property_col = prepared_df.get('Property', pd.Series(['UNKNOWN'] * len(prepared_df)))
+    prepared_df['id_element'] = (
+        normalize_text(element_col.fillna('UNKNOWN').astype(str)) + '_' +
+        normalize_text(property_col.fillna('UNKNOWN').astype(str))
+    )
+
+    column_mapping = {csv_col: db_col for csv_col, db_col in adapter.column_mapping.items()
+                      if csv_col in prepared_df.columns}
+    prepared_df = prepared_df.rename(columns=column_mapping)
+    prepared_df['maquina'] = adapter.maquina
+
+    if 'data_hora' in prepared_df.columns:
+        prepared_df['data_hora'] = pd.to_datetime(prepared_df['data_hora'], errors='coerce')
+
+    if 'actual' in prepared_df.columns:
+        prepared_df['valor'] = prepared_df['actual'].apply(ValueCleaner.clean_numeric_value)
+        prepared_df['ok'] = adapter._calculate_ok_status(prepared_df)
+    else:
+        prepared_df['valor'] = None
+        prepared_df['ok'] = True
+
+    current_time = datetime.now()
+    prepared_df['created_at'] = current_time
+    prepared_df['updated_at'] = current_time
+
+    prepared_df['id_referencia_some'] = prepared_df['id_referencia_some'].fillna('UNKNOWN')
+    prepared_df['id_element'] = prepared_df['id_element'].fillna('UNKNOWN')
+
+    for col in ['nominal', 'actual', 'tolerancia_negativa', 'tolerancia_positiva', 'desviacio', 'valor']:
+        if col in prepared_df.columns:
+            prepared_df[col] = prepared_df[col].apply(ValueCleaner.clean_numeric_value)
+
+    for col in ['client', 'element', 'pieza', 'datum', 'property', 'check_value', 'out_value', 'alignment', 'fase']:
+        if col in prepared_df.columns:
+            prepared_df[col] = prepared_df[col].apply(normalize_text).str[:200]
+
+    if 'fase' not in prepared_df.columns:
+        prepared_df['fase'] = None
+
+    return prepared_df
+
+
+def run_frozen(function, *args):
+    """Executa la preparació amb datetime.now() fix (created_at/updated_at comparables)"""
+    frozen = datetime(2025, 1, 31, 22, 1, 56)
+    with mock.patch('src.database.quality_measurement_adapter.datetime') as adapter_datetime, \
+            mock.patch(f'{__name__}.datetime') as script_datetime:
+        adapter_datetime.now.return_value = frozen
+        script_datetime.now.return_value = frozen
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de prepare_dataset_for_insertion")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Files del dataset")
+    parser.add_argument('--elements', type=int, default=400, help="Elements diferents per LOT")
+    args = parser.parse_args()
+
+    adapter = QualityMeasurementDBAdapter({'host': 'localhost'})
+    df = make_dataset(args.rows, args.elements)
+
+    print(f"\n📊 Benchmark prepare_dataset_for_insertion ({args.rows} files)")
+    rowwise, t_rowwise = run_frozen(prepare_dataset_rowwise, adapter, df)
+    columnar, t_columnar = run_frozen(adapter.prepare_dataset_for_insertion, df)
+
+    pd.testing.assert_frame_equal(columnar, rowwise)
+    print(f"{'Per cel·la (s)':>16} | {'Per columnes (s)':>17} | {'Millora':>8}")
+    print("-" * 48)
+    print(f"{t_rowwise:>16.2f} | {t_columnar:>17.2f} | {t_rowwise / t_columnar:>7.1f}x")
+    print("\n✅ Resultat idèntic")
+
+
+if __name__ == "__main__":
+    main()
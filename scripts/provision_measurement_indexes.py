@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Crea els índexs de les taules de mesures (compostos, d'expressió i pg_trgm)
+derivats de TABLE_COLUMN_MAPPING i mostra les estadístiques d'ús.
+
+Exemples:
+    python scripts/provision_measurement_indexes.py --dry-run
+    python scripts/provision_measurement_indexes.py
+    python scripts/provision_measurement_indexes.py --usage
+"""
+
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import psycopg2
+
+from src.database.measurement_index_manager import MeasurementIndexManager
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Provisió d'índexs de les taules de mesures")
+    parser.add_argument('--db-key', default='primary', help="Clau de db_config.json (per defecte primary)")
+    parser.add_argument('--config', default=str(project_root / 'config' / 'database' / 'db_config.json'),
+                        help="Fitxer de configuració de la base de dades")
+    parser.add_argument('--dry-run', action='store_true', help="Mostra l'SQL sense executar-lo")
+    parser.add_argument('--no-concurrently', action='store_true',
+                        help="Crea els índexs sense CONCURRENTLY (bloqueja escriptures)")
+    parser.add_argument('--kind', action='append', choices=['composite', 'expression', 'trigram'],
+                        help="Tipus d'índex a crear (es pot repetir; per defecte tots)")
+    parser.add_argument('--usage', action='store_true', help="Mostra l'ús dels índexs i surt")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        db_config = json.load(f)[args.db_key]
+
+    connection = psycopg2.connect(
+        host=db_config['host'],
+        port=int(db_config['port']),
+        database=db_config['database'],
+        user=db_config['user'],
+        password=db_config['password']
+    )
+    try:
+        manager = MeasurementIndexManager(connection)
+
+        if args.usage:
+            print(f"{'Taula':<28} {'Índex':<45} {'idx_scan':>10} {'seq_scan':>10} {'Mida (MB)':>10}")
+            for row in manager.get_index_usage():
+                size_mb = (row['index_size'] or 0) / (1024 * 1024)
+                print(f"{row['table']:<28} {str(row['index']):<45} {str(row['idx_scan']):>10} "
+                      f"{str(row['seq_scan']):>10} {size_mb:>10.1f}")
+            return 0
+
+        result = manager.provision(dry_run=args.dry_run, concurrently=not args.no_concurrently,
+                                   kinds=args.kind)
+        if args.dry_run:
+            for statement in result['statements']:
+                print(f"{statement};")
+        print(json.dumps({key: value for key, value in result.items() if key != 'statements'},
+                         indent=2, ensure_ascii=False))
+        return 0 if result['success'] else 1
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
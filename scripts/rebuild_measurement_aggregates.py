@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Crea i reconstrueix la taula d'agregats per element de mesuresqualitat
+(inicialització o reparació; les insercions la mantenen incrementalment).
+Les insercions no creen la taula: mentre no existeix s'insereix sense agregats.
+
+Exemples:
+    python scripts/rebuild_measurement_aggregates.py
+    python scripts/rebuild_measurement_aggregates.py --create-only
+    python scripts/rebuild_measurement_aggregates.py --overview 665220400 --lot L1
+"""
+
+import sys
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+import psycopg2
+
+from src.database.measurement_aggregates import MeasurementAggregateStore
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Agregats per element de mesuresqualitat")
+    parser.add_argument('--db-key', default='primary', help="Clau de db_config.json (per defecte primary)")
+    parser.add_argument('--config', default=str(project_root / 'config' / 'database' / 'db_config.json'),
+                        help="Fitxer de configuració de la base de dades")
+    parser.add_argument('--overview', metavar='REFERENCIA',
+                        help="Mostra el resum de capacitat d'una referència en lloc de reconstruir")
+    parser.add_argument('--create-only', action='store_true',
+                        help="Només crea la taula i l'índex de grups (CONCURRENTLY), sense reconstruir")
+    parser.add_argument('--lot', action='append', help="LOT del resum (es pot repetir; per defecte tots)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        db_config = json.load(f)[args.db_key]
+
+    connection = psycopg2.connect(
+        host=db_config['host'],
+        port=int(db_config['port']),
+        database=db_config['database'],
+        user=db_config['user'],
+        password=db_config['password']
+    )
+    try:
+        store = MeasurementAggregateStore(connection)
+
+        if args.overview:
+            print(f"{'Element':<40} {'n':>6} {'Mitjana':>12} {'Cp':>7} {'Cpk':>7} {'Pp':>7} {'Ppk':>7} {'NOK':>5}")
+            for row in store.get_capability_overview(args.overview, lots=args.lot):
+                def fmt(value, spec):
+                    return format(value, spec) if value is not None else '-'
+                print(f"{str(row['element']):<40} {row['n']:>6} {fmt(row['mean'], '12.4f'):>12} "
+                      f"{fmt(row['cp'], '7.2f'):>7} {fmt(row['cpk'], '7.2f'):>7} "
+                      f"{fmt(row['pp'], '7.2f'):>7} {fmt(row['ppk'], '7.2f'):>7} {row['out_of_tolerance']:>5}")
+            return 0
+
+        store.ensure_table()
+        if args.create_only:
+            print(json.dumps({'table': store.AGGREGATE_TABLE, 'created': True}, indent=2))
+            return 0
+        groups = store.rebuild()
+        print(json.dumps({'groups': groups}, indent=2))
+        return 0
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
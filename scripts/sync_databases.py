@@ -2,11 +2,16 @@
 Script de còpia automàtica de dades entre bases de dades
 Copia les 4 taules de mesures de airflow_db a documentacio_tecnica
 
+Les files passen de l'origen al destí amb COPY a tots dos costats
+(src.database.copy_stream), sense carregar-les a memòria; la sincronització
+incremental copia a una taula de staging i fa un únic upsert.
+
 Ús:
-    python scripts/sync_databases.py [--full-sync] [--verify-only]
+    python scripts/sync_databases.py [--full-sync] [--verify-only] [--copy-format text|binary]
     
     --full-sync: Fa una còpia completa (trunca i recopia tot)
     --verify-only: Només verifica l'estat, no copia res
+    --copy-format: Format del COPY (binary només si els tipus coincideixen)
 """
 import sys
 import json
@@ -14,12 +19,14 @@ import argparse
 import logging
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, List
 import psycopg2
-from psycopg2.extras import execute_batch
 
 # Afegir el directori arrel al path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src.database.copy_stream import COPY_FORMATS, stream_copy
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -38,11 +45,32 @@ TABLES_TO_SYNC = [
     'mesurestorsio'  # Nota: "torsio" no "toriso"
 ]
 
+# Columnes copiades (mateix ordre a l'origen i al destí)
+SYNC_COLUMNS = [
+    'client', 'data_hora', 'maquina', 'fase', 'id_referencia_client', 'id_lot',
+    'cavitat', 'pieza', 'element', 'datum', 'property', 'actual', 'nominal',
+    'tolerancia_negativa', 'tolerancia_positiva', 'desviacio',
+    'check_value', 'created_at', 'updated_at'
+]
+
+# Prefix de les taules temporals de staging del destí
+STAGING_PREFIX = 'stg_sync_'
+
 class DatabaseSync:
     """Gestiona la sincronització entre airflow_db i documentacio_tecnica"""
     
-    def __init__(self, config_path: str = None):
-        """Inicialitza el sincronitzador"""
+    def __init__(self, config_path: str = None, copy_format: str = 'text'):
+        """
+        Inicialitza el sincronitzador
+        
+        Args:
+            config_path: Fitxer db_config.json
+            copy_format: Format del COPY entre bases de dades ('text' o 'binary')
+        """
+        if copy_format not in COPY_FORMATS:
+            raise ValueError(f"Format de COPY desconegut: {copy_format}")
+        self.copy_format = copy_format
+        
         if config_path is None:
             config_path = Path(__file__).parent.parent / "config" / "database" / "db_config.json"
         
@@ -64,7 +92,9 @@ class DatabaseSync:
                 port=self.source_config['port'],
                 database=self.source_config['database'],
                 user=self.source_config['user'],
-                password=self.source_config['password']
+                password=self.source_config['password'],
+                # Mateix encoding als dos costats: el COPY en text passa els bytes tal qual
+                client_encoding='utf8'
             )
             logger.info(f"✅ Connectat a {self.source_config['database']}")
             return conn
@@ -80,7 +110,9 @@ class DatabaseSync:
                 port=self.target_config['port'],
                 database=self.target_config['database'],
                 user=self.target_config['user'],
-                password=self.target_config['password']
+                password=self.target_config['password'],
+                # Mateix encoding als dos costats: el COPY en text passa els bytes tal qual
+                client_encoding='utf8'
             )
             logger.info(f"✅ Connectat a {self.target_config['database']}")
             return conn
@@ -160,12 +192,79 @@ class DatabaseSync:
             source_conn.close()
             target_conn.close()
     
-    def sync_table_incremental(self, table_name: str):
-        """Sincronitza una taula de forma incremental (només nous registres)"""
-        logger.info(f"\n🔄 Sincronitzant {table_name} (incremental)...")
+    def _primary_key_columns(self, conn, table_name: str, schema: str = 'public') -> List[str]:
+        """Columnes de la clau primària d'una taula (buida si no en té)"""
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                SELECT a.attname
+                FROM pg_index i
+                JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                WHERE i.indrelid = %s::regclass AND i.indisprimary
+                ORDER BY array_position(i.indkey::int2[], a.attnum)
+            """, (f"{schema}.{table_name}",))
+            return [row[0] for row in cursor.fetchall()]
+    
+    def _merge_sql(self, table_name: str, staging_table: str, key_columns: List[str]) -> str:
+        """
+        INSERT ... SELECT des de la staging amb upsert per la clau primària
+        
+        Retorna (inserits, actualitzats). Si la clau no és dins de les columnes
+        copiades, es manté ON CONFLICT DO NOTHING (només insercions).
+        """
+        columns_str = ', '.join(SYNC_COLUMNS)
+        if key_columns and all(col in SYNC_COLUMNS for col in key_columns):
+            keys_str = ', '.join(key_columns)
+            update_columns = [col for col in SYNC_COLUMNS if col not in key_columns]
+            # Una clau repetida a la staging: es queda l'última fila copiada
+            return f"""
+                WITH merged AS (
+                    INSERT INTO {table_name} ({columns_str})
+                    SELECT DISTINCT ON ({keys_str}) {columns_str}
+                    FROM {staging_table}
+                    ORDER BY {keys_str}, ctid DESC
+                    ON CONFLICT ({keys_str}) DO UPDATE SET
+                        {', '.join(f"{col} = EXCLUDED.{col}" for col in update_columns)}
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted)
+                FROM merged
+            """
+        return f"""
+            WITH merged AS (
+                INSERT INTO {table_name} ({columns_str})
+                SELECT {columns_str} FROM {staging_table}
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            )
+            SELECT COUNT(*), 0 FROM merged
+        """
+    
+    def _sync_result(self, table_name: str, mode: str, copy_stats: Dict = None, **extra) -> Dict:
+        """Resultat d'una taula amb les mètriques de la còpia"""
+        copy_stats = copy_stats or {}
+        return {
+            'table': table_name,
+            'mode': mode,
+            'rows': copy_stats.get('rows', 0),
+            'bytes': copy_stats.get('bytes', 0),
+            'elapsed_seconds': copy_stats.get('elapsed_seconds', 0.0),
+            'rows_per_second': copy_stats.get('rows_per_second', 0.0),
+            'mb_per_second': copy_stats.get('mb_per_second', 0.0),
+            **extra
+        }
+    
+    def sync_table_incremental(self, table_name: str) -> Dict:
+        """
+        Sincronitza una taula de forma incremental (només nous registres)
+        
+        Les files noves es copien amb COPY de l'origen a una taula temporal de
+        staging del destí i s'integren amb un únic upsert; tot en una transacció.
+        """
+        logger.info(f"\n🔄 Sincronitzant {table_name} (incremental, COPY {self.copy_format})...")
         
         source_conn = self.connect_source()
         target_conn = self.connect_target()
+        staging_table = f"{STAGING_PREFIX}{table_name}"
         
         try:
             # Obtenir última data_hora al destí
@@ -175,62 +274,61 @@ class DatabaseSync:
                     FROM {table_name}
                 """)
                 last_sync = cursor.fetchone()[0]
+                cursor.execute(f"""
+                    CREATE TEMP TABLE {staging_table}
+                    (LIKE {table_name} INCLUDING DEFAULTS)
+                    ON COMMIT DROP
+                """)
             
             logger.info(f"   Última sincronització: {last_sync}")
             
-            # Llegir nous registres de l'origen
             with source_conn.cursor() as cursor:
-                cursor.execute(f"""
-                    SELECT 
-                        client, data_hora, maquina, fase, id_referencia_client, id_lot,
-                        cavitat, pieza, element, datum, property, actual, nominal,
-                        tolerancia_negativa, tolerancia_positiva, desviacio,
-                        check_value, created_at, updated_at
+                select_sql = cursor.mogrify(f"""
+                    SELECT {', '.join(SYNC_COLUMNS)}
                     FROM qualitat.{table_name}
                     WHERE data_hora > %s
                     ORDER BY data_hora
-                """, (last_sync,))
-                
-                rows = cursor.fetchall()
-                logger.info(f"   Nous registres a copiar: {len(rows):,}")
+                """, (last_sync,)).decode('utf-8')
             
-            if len(rows) == 0:
+            # Origen -> staging en streaming
+            copy_stats = stream_copy(source_conn, target_conn, select_sql, staging_table,
+                                     SYNC_COLUMNS, copy_format=self.copy_format)
+            logger.info(f"   Nous registres copiats a staging: {copy_stats['rows']:,}")
+            
+            if copy_stats['rows'] == 0:
+                target_conn.rollback()
                 logger.info(f"   ✅ {table_name} ja està sincronitzada")
-                return 0
+                return self._sync_result(table_name, 'incremental', copy_stats, inserted=0, updated=0)
             
-            # Inserir al destí
+            # Staging -> taula destí
+            key_columns = self._primary_key_columns(target_conn, table_name)
             with target_conn.cursor() as cursor:
-                insert_query = f"""
-                    INSERT INTO {table_name} (
-                        client, data_hora, maquina, fase, id_referencia_client, id_lot,
-                        cavitat, pieza, element, datum, property, actual, nominal,
-                        tolerancia_negativa, tolerancia_positiva, desviacio,
-                        check_value, created_at, updated_at
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, 
-                        %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT DO NOTHING
-                """
-                
-                execute_batch(cursor, insert_query, rows, page_size=1000)
-                target_conn.commit()
+                cursor.execute(self._merge_sql(table_name, staging_table, key_columns))
+                inserted, updated = cursor.fetchone()
+            target_conn.commit()
             
-            logger.info(f"   ✅ {len(rows):,} registres copiats a {table_name}")
-            return len(rows)
+            logger.info(f"   ✅ {copy_stats['rows']:,} registres copiats a {table_name} "
+                        f"({inserted:,} nous, {updated:,} actualitzats, "
+                        f"{copy_stats['bytes'] / (1024 * 1024):.1f} MB, {copy_stats['rows_per_second']:.0f} reg/seg)")
+            return self._sync_result(table_name, 'incremental', copy_stats, inserted=inserted, updated=updated)
             
         except Exception as e:
             logger.error(f"   ❌ Error sincronitzant {table_name}: {e}")
             target_conn.rollback()
-            return 0
+            return self._sync_result(table_name, 'incremental', error=str(e))
             
         finally:
             source_conn.close()
             target_conn.close()
     
-    def sync_table_full(self, table_name: str):
-        """Sincronitza una taula completament (trunca i recopia tot)"""
-        logger.info(f"\n🔄 Sincronitzant {table_name} (completa)...")
+    def sync_table_full(self, table_name: str) -> Dict:
+        """
+        Sincronitza una taula completament (trunca i recopia tot)
+        
+        El TRUNCATE i el COPY es fan en una sola transacció: si la còpia falla,
+        la taula destí queda com estava.
+        """
+        logger.info(f"\n🔄 Sincronitzant {table_name} (completa, COPY {self.copy_format})...")
         
         source_conn = self.connect_source()
         target_conn = self.connect_target()
@@ -242,68 +340,29 @@ class DatabaseSync:
             
             if source_count == 0:
                 logger.warning(f"   ⚠️  Taula origen buida, saltant...")
-                return 0
+                return self._sync_result(table_name, 'full')
             
-            # Truncar destí
+            # Truncar destí (es confirma amb la còpia)
             with target_conn.cursor() as cursor:
                 cursor.execute(f"TRUNCATE TABLE {table_name} RESTART IDENTITY CASCADE")
-                target_conn.commit()
             
             logger.info(f"   Taula destí truncada")
             
-            # Copiar en lots de 10,000
-            batch_size = 10000
-            offset = 0
-            total_copied = 0
-            
-            while True:
-                # Llegir lot de l'origen
-                with source_conn.cursor() as cursor:
-                    cursor.execute(f"""
-                        SELECT 
-                            client, data_hora, maquina, fase, id_referencia_client, id_lot,
-                            cavitat, pieza, element, datum, property, actual, nominal,
-                            tolerancia_negativa, tolerancia_positiva, desviacio,
-                            check_value, created_at, updated_at
-                        FROM qualitat.{table_name}
-                        ORDER BY data_hora
-                        LIMIT %s OFFSET %s
-                    """, (batch_size, offset))
-                    
-                    rows = cursor.fetchall()
-                
-                if len(rows) == 0:
-                    break
-                
-                # Inserir lot al destí
-                with target_conn.cursor() as cursor:
-                    insert_query = f"""
-                        INSERT INTO {table_name} (
-                            client, data_hora, maquina, fase, id_referencia_client, id_lot,
-                            cavitat, pieza, element, datum, property, actual, nominal,
-                            tolerancia_negativa, tolerancia_positiva, desviacio,
-                            check_value, created_at, updated_at
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                            %s, %s, %s, %s, %s, %s
-                        )
-                    """
-                    
-                    execute_batch(cursor, insert_query, rows, page_size=1000)
-                    target_conn.commit()
-                
-                total_copied += len(rows)
-                offset += batch_size
-                
-                logger.info(f"   Progrés: {total_copied:,} / {source_count:,} ({total_copied*100//source_count}%)")
+            copy_stats = stream_copy(
+                source_conn, target_conn,
+                f"SELECT {', '.join(SYNC_COLUMNS)} FROM qualitat.{table_name} ORDER BY data_hora",
+                table_name, SYNC_COLUMNS, copy_format=self.copy_format
+            )
+            target_conn.commit()
             
-            logger.info(f"   ✅ {total_copied:,} registres copiats a {table_name}")
-            return total_copied
+            logger.info(f"   ✅ {copy_stats['rows']:,} registres copiats a {table_name} "
+                        f"({copy_stats['bytes'] / (1024 * 1024):.1f} MB, {copy_stats['rows_per_second']:.0f} reg/seg)")
+            return self._sync_result(table_name, 'full', copy_stats)
             
         except Exception as e:
             logger.error(f"   ❌ Error sincronitzant {table_name}: {e}")
             target_conn.rollback()
-            return 0
+            return self._sync_result(table_name, 'full', error=str(e))
             
         finally:
             source_conn.close()
@@ -321,11 +380,9 @@ class DatabaseSync:
         
         for table in TABLES_TO_SYNC:
             if full_sync:
-                copied = self.sync_table_full(table)
+                results[table] = self.sync_table_full(table)
             else:
-                copied = self.sync_table_incremental(table)
-            
-            results[table] = copied
+                results[table] = self.sync_table_incremental(table)
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
@@ -336,11 +393,16 @@ class DatabaseSync:
         logger.info("="*60)
         
         total_copied = 0
-        for table, count in results.items():
-            logger.info(f"   {table}: {count:,} registres")
-            total_copied += count
+        total_bytes = 0
+        for table, result in results.items():
+            status = f" ❌ {result['error']}" if result.get('error') else ''
+            logger.info(f"   {table}: {result['rows']:,} registres, {result['bytes'] / (1024 * 1024):.1f} MB, "
+                        f"{result['rows_per_second']:.0f} reg/seg{status}")
+            total_copied += result['rows']
+            total_bytes += result['bytes']
         
         logger.info(f"\n   Total registres copiats: {total_copied:,}")
+        logger.info(f"   Total transferit: {total_bytes / (1024 * 1024):.1f} MB")
         logger.info(f"   Temps total: {duration:.2f} segons")
         logger.info(f"   Velocitat: {total_copied/duration if duration > 0 else 0:.0f} reg/seg")
         
@@ -356,11 +418,13 @@ def main():
                        help='Fa una còpia completa (trunca i recopia tot)')
     parser.add_argument('--verify-only', action='store_true',
                        help='Només verifica l\'estat, no copia res')
+    parser.add_argument('--copy-format', choices=COPY_FORMATS, default='text',
+                       help='Format del COPY (binary només si els tipus de columna coincideixen)')
     
     args = parser.parse_args()
     
     try:
-        sync = DatabaseSync()
+        sync = DatabaseSync(copy_format=args.copy_format)
         
         if args.verify_only:
             sync.verify_sync_status()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Vigilància contínua de la xarxa GOMPC
+
+Insereix a la BBDD els CSV nous o modificats pocs segons després que
+apareguin, i escriu l'estat (retard, cua, rendiment) a un fitxer JSON.
+
+Ús:
+    python scripts/watch_network_share.py [--interval 5] [--settle 10] [--status data/cache/network_watcher_status.json]
+"""
+import sys
+import logging
+import argparse
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.services.network_scanner import NetworkScanner
+from src.services.network_watcher import NetworkWatcher
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vigilància de la xarxa GOMPC")
+    parser.add_argument('--path', default=None, help="Ruta de xarxa (per defecte la del NetworkScanner)")
+    parser.add_argument('--interval', type=float, default=NetworkWatcher.DEFAULT_POLL_INTERVAL,
+                        help="Segons entre cicles")
+    parser.add_argument('--settle', type=float, default=NetworkWatcher.DEFAULT_SETTLE_SECONDS,
+                        help="Segons sense canvis abans d'inserir un fitxer")
+    parser.add_argument('--full-rescan', type=float, default=NetworkWatcher.DEFAULT_FULL_RESCAN_INTERVAL,
+                        help="Segons entre revisions completes de totes les carpetes")
+    parser.add_argument('--status', default=None, help="Fitxer d'estat JSON")
+    parser.add_argument('--table', default='mesures_gompcnou', choices=NetworkScanner.TARGET_TABLES,
+                        help="Taula destí")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    watcher = NetworkWatcher(
+        scanner=NetworkScanner(args.path),
+        poll_interval=args.interval,
+        settle_seconds=args.settle,
+        full_rescan_interval=args.full_rescan,
+        status_path=args.status,
+        target_table=args.table
+    )
+    watcher.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ Aquest paquet conté les classes i utilitats per gestionar
 les connexions i operacions amb la base de dades PostgreSQL.
 """
 
+from .connection_pool import PooledConnectionProvider, get_connection_pool, close_all_pools
 from .quality_measurement_adapter import QualityMeasurementDBAdapter
 
-__all__ = ['QualityMeasurementDBAdapter']
+__all__ = ['QualityMeasurementDBAdapter', 'PooledConnectionProvider',
+           'get_connection_pool', 'close_all_pools']
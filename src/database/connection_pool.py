@@ -0,0 +1,262 @@
+"""
+Connection Pool
+
+Pool de connexions PostgreSQL compartit per tot el procés. Cada combinació de
+paràmetres de connexió (host, port, base de dades, usuari...) té un únic pool
+basat en psycopg2.pool.ThreadedConnectionPool, de manera que els serveis i
+els QThreads reutilitzen connexions ja autenticades en lloc d'obrir-ne una de
+nova a cada consulta.
+
+Afegeix al ThreadedConnectionPool:
+- Espera acotada quan el pool és ple (en lloc d'error immediat)
+- Comprovació de salut de connexions que han estat inactives
+- Reciclatge de connexions inactives massa temps
+- Reinici de l'estat de sessió quan una connexió torna al pool
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+logger = logging.getLogger(__name__)
+
+
+class PooledConnectionProvider:
+    """Pool de connexions thread-safe per a uns paràmetres de connexió"""
+
+    # Valors per defecte (sobreescrivibles amb variables d'entorn DB_POOL_*)
+    # Com ThreadedConnectionPool, només es mantenen obertes min_connections inactives
+    DEFAULT_MIN_CONNECTIONS = 2
+    DEFAULT_MAX_CONNECTIONS = 10
+
+    # Connexions inactives més temps que això es tanquen i es tornen a obrir
+    DEFAULT_MAX_IDLE_SECONDS = 300.0
+
+    # Connexions inactives més temps que això es comproven amb SELECT 1
+    DEFAULT_HEALTH_CHECK_SECONDS = 30.0
+
+    # Temps màxim d'espera per obtenir una connexió amb el pool ple
+    DEFAULT_CHECKOUT_TIMEOUT = 30.0
+
+    def __init__(self, conn_params: Dict[str, Any], min_connections: int = None,
+                 max_connections: int = None, max_idle_seconds: float = None,
+                 health_check_seconds: float = None, checkout_timeout: float = None):
+        """
+        Inicialitza el pool (les connexions s'obren en el primer ús)
+
+        Args:
+            conn_params: Paràmetres per psycopg2.connect
+            min_connections: Connexions que es mantenen obertes
+            max_connections: Connexions simultànies màximes
+            max_idle_seconds: Inactivitat màxima abans de reciclar una connexió
+            health_check_seconds: Inactivitat a partir de la qual es comprova la connexió
+            checkout_timeout: Espera màxima per una connexió lliure
+        """
+        self.conn_params = dict(conn_params)
+        self.min_connections = _setting(min_connections, 'DB_POOL_MIN', self.DEFAULT_MIN_CONNECTIONS, int)
+        self.max_connections = max(self.min_connections,
+                                   _setting(max_connections, 'DB_POOL_MAX', self.DEFAULT_MAX_CONNECTIONS, int))
+        self.max_idle_seconds = _setting(max_idle_seconds, 'DB_POOL_MAX_IDLE',
+                                         self.DEFAULT_MAX_IDLE_SECONDS, float)
+        self.health_check_seconds = _setting(health_check_seconds, 'DB_POOL_HEALTH_CHECK',
+                                             self.DEFAULT_HEALTH_CHECK_SECONDS, float)
+        self.checkout_timeout = _setting(checkout_timeout, 'DB_POOL_CHECKOUT_TIMEOUT',
+                                         self.DEFAULT_CHECKOUT_TIMEOUT, float)
+
+        self._pool: Optional[ThreadedConnectionPool] = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_connections)
+        self._last_used: Dict[int, float] = {}
+        self.stats = {'checkouts': 0, 'recycled': 0,
+                      'health_check_failures': 0, 'waits': 0}
+
+    def getconn(self):
+        """
+        Obté una connexió del pool (espera si totes estan en ús)
+
+        Returns:
+            connection: Connexió psycopg2 en bon estat
+
+        Raises:
+            PoolError: Si no hi ha cap connexió lliure dins del temps d'espera
+        """
+        if not self._slots.acquire(blocking=False):
+            self.stats['waits'] += 1
+            if not self._slots.acquire(timeout=self.checkout_timeout):
+                raise PoolError(
+                    f"No hi ha connexions lliures després d'esperar {self.checkout_timeout}s "
+                    f"(màxim {self.max_connections})"
+                )
+
+        try:
+            pool = self._get_pool()
+            conn = pool.getconn()
+            idle = time.monotonic() - self._last_used.get(id(conn), time.monotonic())
+
+            if conn.closed or idle > self.max_idle_seconds:
+                self.stats['recycled'] += 1
+                conn = self._replace(pool, conn)
+            elif idle > self.health_check_seconds and not self._is_healthy(conn):
+                self.stats['health_check_failures'] += 1
+                logger.warning("Connexió del pool no vàlida, se n'obre una de nova")
+                conn = self._replace(pool, conn)
+
+            self.stats['checkouts'] += 1
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Retorna una connexió al pool
+
+        Args:
+            conn: Connexió obtinguda amb getconn
+            discard: Si és True, la connexió es tanca en lloc de reutilitzar-se
+        """
+        try:
+            if not discard and not conn.closed:
+                try:
+                    self._reset_session(conn)
+                except Exception as e:
+                    logger.debug(f"No es pot reiniciar la connexió, es descarta: {e}")
+                    discard = True
+
+            self._last_used[id(conn)] = time.monotonic()
+            with self._lock:
+                pool = self._pool
+            if pool is None or pool.closed:
+                if not conn.closed:
+                    conn.close()
+                return
+            pool.putconn(conn, close=discard or bool(conn.closed))
+            if conn.closed:
+                # Descartada (o per sobre del mínim de connexions inactives)
+                self._last_used.pop(id(conn), None)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Context manager que obté una connexió i la retorna al pool en acabar"""
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        """Tanca totes les connexions del pool"""
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estat del pool: mides i comptadors"""
+        with self._lock:
+            pool = self._pool
+            idle = len(pool._pool) if pool is not None and not pool.closed else 0
+            in_use = len(pool._used) if pool is not None and not pool.closed else 0
+        return {
+            'host': self.conn_params.get('host'),
+            'database': self.conn_params.get('database'),
+            'min_connections': self.min_connections,
+            'max_connections': self.max_connections,
+            'idle_connections': idle,
+            'in_use_connections': in_use,
+            **self.stats
+        }
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None or self._pool.closed:
+                self._pool = ThreadedConnectionPool(self.min_connections, self.max_connections,
+                                                    **self.conn_params)
+                logger.info(f"Pool de connexions creat per {self.conn_params.get('host')}/"
+                            f"{self.conn_params.get('database')} "
+                            f"(min {self.min_connections}, max {self.max_connections})")
+            return self._pool
+
+    def _replace(self, pool: ThreadedConnectionPool, conn):
+        """Descarta una connexió i n'obté una de nova del pool"""
+        self._last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+        new_conn = pool.getconn()
+        if new_conn.closed:
+            pool.putconn(new_conn, close=True)
+            new_conn = pool.getconn()
+        return new_conn
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset_session(conn):
+        """Deixa la connexió com acabada d'obrir (transacció, autocommit i SET de sessió)"""
+        conn.reset()
+        if conn.autocommit:
+            conn.autocommit = False
+
+
+_pools: Dict[Tuple, PooledConnectionProvider] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(conn_params: Dict[str, Any], **pool_options) -> PooledConnectionProvider:
+    """
+    Retorna el pool compartit per uns paràmetres de connexió (el crea si cal)
+
+    Args:
+        conn_params: Paràmetres per psycopg2.connect
+        **pool_options: Opcions del pool (només s'apliquen en crear-lo)
+
+    Returns:
+        PooledConnectionProvider: Pool del procés per aquests paràmetres
+    """
+    key = tuple(sorted((name, str(value)) for name, value in conn_params.items()))
+    with _pools_lock:
+        provider = _pools.get(key)
+        if provider is None:
+            provider = PooledConnectionProvider(conn_params, **pool_options)
+            _pools[key] = provider
+        return provider
+
+
+def close_all_pools():
+    """Tanca tots els pools del procés (per exemple en sortir de l'aplicació)"""
+    with _pools_lock:
+        providers = list(_pools.values())
+        _pools.clear()
+    for provider in providers:
+        provider.closeall()
+
+
+atexit.register(close_all_pools)
+
+
+def _setting(value, env_name: str, default, cast):
+    if value is not None:
+        return cast(value)
+    env_value = os.environ.get(env_name)
+    if env_value:
+        try:
+            return cast(env_value)
+        except ValueError:
+            logger.warning(f"Valor invàlid per {env_name}: {env_value}")
+    return default
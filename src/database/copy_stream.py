@@ -0,0 +1,188 @@
+"""
+Copy Stream
+
+Còpia de files entre dues bases de dades PostgreSQL amb COPY a tots dos
+costats: el COPY (SELECT ...) TO STDOUT de l'origen s'executa en un fil i
+alimenta directament el COPY ... FROM STDIN del destí a través d'un buffer
+acotat (una cua de blocs de bytes). Cap dels dos costats porta el resultat
+sencer a memòria ni converteix les files a objectes Python.
+
+Format 'text' (per defecte) o 'binary'; el binari només és vàlid si les
+columnes tenen exactament els mateixos tipus a l'origen i al destí.
+"""
+
+import queue
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+COPY_FORMATS = ('text', 'binary')
+
+# Mida dels blocs que passen pel buffer i nombre màxim de blocs pendents
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_CHUNKS = 16
+
+
+class CopyStreamClosed(Exception):
+    """El costat contrari de la còpia s'ha aturat"""
+
+
+class BoundedCopyPipe:
+    """
+    Canal entre COPY TO (escriptor) i COPY FROM (lector) amb memòria acotada
+
+    L'escriptor agrupa les dades en blocs de chunk_size bytes i espera si ja
+    hi ha max_chunks blocs pendents; com a màxim hi ha uns
+    chunk_size * (max_chunks + 2) bytes en memòria.
+    """
+
+    _END = object()
+
+    def __init__(self, chunk_size: int = None, max_chunks: int = None):
+        """
+        Inicialitza el canal
+
+        Args:
+            chunk_size: Bytes per bloc
+            max_chunks: Blocs pendents màxims abans de bloquejar l'escriptor
+        """
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        self._queue = queue.Queue(maxsize=max_chunks or DEFAULT_MAX_CHUNKS)
+        self._pending = bytearray()
+        self._current = memoryview(b'')
+        self._closed = threading.Event()
+        self._error: Optional[BaseException] = None
+        self.bytes_written = 0
+        self.bytes_read = 0
+
+    # --- Costat de l'origen (copy_expert TO) ---
+
+    def write(self, data) -> int:
+        """Rep dades del COPY TO de l'origen"""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._pending += data
+        self.bytes_written += len(data)
+        if len(self._pending) >= self.chunk_size:
+            self._put(bytes(self._pending))
+            self._pending.clear()
+        return len(data)
+
+    def finish(self, error: BaseException = None) -> None:
+        """Marca el final de les dades (o l'error de l'origen)"""
+        if error is None and self._pending:
+            self._put(bytes(self._pending))
+            self._pending.clear()
+        self._error = error
+        self._put(self._END)
+
+    # --- Costat del destí (copy_expert FROM) ---
+
+    def read(self, size: int = -1) -> bytes:
+        """Retorna fins a size bytes per al COPY FROM del destí (b'' al final)"""
+        while not self._current:
+            chunk = self._queue.get()
+            if chunk is self._END:
+                self._queue.put(self._END)
+                if self._error is not None:
+                    raise CopyStreamClosed(f"Error a l'origen de la còpia: {self._error}")
+                return b''
+            self._current = memoryview(chunk)
+        if size is None or size < 0:
+            size = len(self._current)
+        data, self._current = self._current[:size], self._current[size:]
+        self.bytes_read += len(data)
+        return data.tobytes()
+
+    def close(self) -> None:
+        """Atura l'escriptor (el destí ha fallat o ha acabat)"""
+        self._closed.set()
+
+    def _put(self, item) -> None:
+        while True:
+            if self._closed.is_set():
+                raise CopyStreamClosed("El destí de la còpia s'ha aturat")
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_copy(source_connection, target_connection, select_sql: str, target_table: str,
+                columns, copy_format: str = 'text', chunk_size: int = None,
+                max_chunks: int = None) -> Dict[str, Any]:
+    """
+    Copia el resultat d'una consulta de l'origen a una taula del destí
+
+    No fa commit: la transacció del destí queda per al cridador (p.ex. per
+    fer el merge des d'una taula de staging abans de confirmar).
+
+    Args:
+        source_connection: Connexió psycopg2 a l'origen
+        target_connection: Connexió psycopg2 al destí
+        select_sql: Consulta de l'origen (ja amb els paràmetres interpolats)
+        target_table: Taula del destí (sovint una taula temporal de staging)
+        columns: Columnes del destí, en el mateix ordre que la consulta
+        copy_format: 'text' o 'binary'
+        chunk_size: Bytes per bloc del buffer
+        max_chunks: Blocs pendents màxims del buffer
+
+    Returns:
+        dict: rows, bytes, elapsed_seconds, rows_per_second i mb_per_second
+    """
+    if copy_format not in COPY_FORMATS:
+        raise ValueError(f"Format de COPY desconegut: {copy_format}")
+
+    pipe = BoundedCopyPipe(chunk_size, max_chunks)
+    source_result: Dict[str, Any] = {}
+
+    def produce():
+        try:
+            with source_connection.cursor() as cursor:
+                cursor.copy_expert(f"COPY ({select_sql}) TO STDOUT WITH (FORMAT {copy_format})", pipe)
+                source_result['rows'] = cursor.rowcount
+            pipe.finish()
+        except CopyStreamClosed:
+            # El destí s'ha aturat: el seu error és el que s'informa
+            pass
+        except BaseException as e:
+            source_result['error'] = e
+            try:
+                pipe.finish(e)
+            except CopyStreamClosed:
+                pass
+
+    start_time = time.perf_counter()
+    producer = threading.Thread(target=produce, name=f"copy-{target_table}", daemon=True)
+    producer.start()
+    try:
+        with target_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {target_table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT {copy_format})", pipe
+            )
+            rows = cursor.rowcount
+    except Exception:
+        pipe.close()
+        producer.join()
+        # Si ha fallat l'origen, l'error del destí només n'és la conseqüència
+        if 'error' in source_result:
+            raise source_result['error']
+        raise
+    producer.join()
+    if 'error' in source_result:
+        raise source_result['error']
+
+    elapsed = time.perf_counter() - start_time
+    if rows is None or rows < 0:
+        rows = source_result.get('rows', 0)
+    return {
+        'rows': rows,
+        'bytes': pipe.bytes_read,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+        'mb_per_second': pipe.bytes_read / (1024 * 1024) / elapsed if elapsed > 0 else 0.0
+    }
@@ -1,8 +1,16 @@
 import io
+import time
 import psycopg2
+from psycopg2.extras import execute_values
+
+from .connection_pool import get_connection_pool
+from .server_cursor import iter_query_chunks, iter_query_dataframes
 
 class PostgresConn:
-    def __init__(self, host, database, user, password, port=5432):
+    # Files per sentència INSERT ... VALUES multi-fila del mode upsert
+    DEFAULT_PAGE_SIZE = 1000
+
+    def __init__(self, host, database, user, password, port=5432, pooled=True):
         self.conn_params = {
             'host': host,
             'database': database,
@@ -10,19 +18,41 @@ class PostgresConn:
             'password': password,
             'port': port
         }
+        # Per defecte les connexions s'obtenen del pool compartit del procés
+        self.pooled = pooled
         self.connection = None
 
 
     def connect(self):
         if self.connection is None or self.connection.closed:
-            self.connection = psycopg2.connect(**self.conn_params)
+            if self.pooled:
+                if self.connection is not None:
+                    # Connexió trencada: es retorna al pool per descartar-la
+                    get_connection_pool(self.conn_params).putconn(self.connection, discard=True)
+                    self.connection = None
+                self.connection = get_connection_pool(self.conn_params).getconn()
+            else:
+                self.connection = psycopg2.connect(**self.conn_params)
         return self.connection
 
 
     def close(self):
-        if self.connection and not self.connection.closed:
-            self.connection.close()
-            self.connection = None
+        """Retorna la connexió al pool (o la tanca si no és del pool)"""
+        if self.connection is None:
+            return
+        connection, self.connection = self.connection, None
+        if self.pooled:
+            get_connection_pool(self.conn_params).putconn(connection)
+        elif not connection.closed:
+            connection.close()
+
+
+    def __del__(self):
+        # Evita que una instància no tancada retingui una connexió del pool
+        try:
+            self.close()
+        except Exception:
+            pass
 
 
     def execute(self, query, params=None, commit=False):
@@ -40,6 +70,16 @@ class PostgresConn:
             return cursor.fetchall()
 
 
+    def iter_chunks(self, query, params=None, itersize=None):
+        """Files d'una consulta per blocs amb un cursor de servidor: (columnes, files)"""
+        return iter_query_chunks(self.connect(), query, params, itersize)
+
+
+    def iter_dataframes(self, query, params=None, itersize=None):
+        """DataFrames d'una consulta per blocs amb un cursor de servidor"""
+        return iter_query_dataframes(self.connect(), query, params, itersize)
+
+
     def fetchone(self, query, params=None):
         conn = self.connect()
         with conn.cursor() as cursor:
@@ -62,10 +102,23 @@ class PostgresConn:
         except Exception:
             return []
     
-    def upload_dataframe(self, df, table_name, mode='upsert'):
-        """Upload dataframe with support for INSERT, UPSERT, or REPLACE modes"""
+    def upload_dataframe(self, df, table_name, mode='upsert', commit=True, page_size=None):
+        """
+        Upload dataframe with support for INSERT, UPSERT, or REPLACE modes
+
+        Args:
+            df: Dades a pujar (columnes = columnes de la taula)
+            table_name: Taula destí
+            mode: 'insert', 'upsert' o 'replace'
+            commit: Si és False, no es fa commit ni rollback (transacció del cridador)
+            page_size: Files per sentència en mode upsert (per defecte DEFAULT_PAGE_SIZE)
+
+        Returns:
+            dict: table, mode, rows, seconds i rows_per_second
+        """
         conn = self.connect()
         cur = conn.cursor()
+        start_time = time.perf_counter()
         
         try:
             if mode == 'insert':
@@ -73,17 +126,29 @@ class PostgresConn:
                 self._upload_insert_only(df, table_name, cur, conn)
             elif mode == 'upsert':
                 # UPSERT behavior (INSERT or UPDATE on conflict)
-                self._upload_upsert(df, table_name, cur, conn)
+                self._upload_upsert(df, table_name, cur, conn, page_size=page_size)
             elif mode == 'replace':
                 # DELETE existing and INSERT new
                 self._upload_replace(df, table_name, cur, conn)
             else:
                 raise ValueError(f"Invalid mode: {mode}. Use 'insert', 'upsert', or 'replace'")
-                
-            print(f"✔️ Dades pujades a la taula '{table_name}' ({len(df)} files) - Mode: {mode}")
+            
+            if commit:
+                conn.commit()
+            
+            elapsed = time.perf_counter() - start_time
+            print(f"✔️ Dades pujades a la taula '{table_name}' ({len(df)} files) - Mode: {mode} - {elapsed:.2f}s")
+            return {
+                'table': table_name,
+                'mode': mode,
+                'rows': len(df),
+                'seconds': elapsed,
+                'rows_per_second': len(df) / elapsed if elapsed > 0 else 0.0
+            }
             
         except Exception as e:
-            conn.rollback()
+            if commit:
+                conn.rollback()
             raise RuntimeError(f"Error pujant a la taula '{table_name}': {e}")
         finally:
             cur.close()
@@ -99,10 +164,9 @@ class PostgresConn:
         copy_sql = f"COPY {table_name} ({cols_sql}) FROM STDIN WITH CSV HEADER"
         
         cur.copy_expert(copy_sql, buffer)
-        conn.commit()
     
-    def _upload_upsert(self, df, table_name, cur, conn):
-        """UPSERT behavior using ON CONFLICT DO UPDATE"""
+    def _upload_upsert(self, df, table_name, cur, conn, page_size=None):
+        """UPSERT behavior using multi-row INSERT ... VALUES ... ON CONFLICT DO UPDATE"""
         # Get primary keys for the table
         primary_keys = self.get_table_primary_keys(table_name)
         
@@ -111,9 +175,14 @@ class PostgresConn:
             print(f"⚠️ No primary keys found for {table_name}, using INSERT mode")
             return self._upload_insert_only(df, table_name, cur, conn)
         
+        # Una sentència multi-fila no pot actualitzar la mateixa clau dues vegades:
+        # com amb la inserció fila a fila, es queda l'última aparició
+        key_columns = [col for col in primary_keys if col in df.columns]
+        if key_columns:
+            df = df.drop_duplicates(subset=key_columns, keep='last')
+        
         columns = list(df.columns)
         cols_sql = ", ".join(columns)
-        placeholders = ", ".join(["%s"] * len(columns))
         
         # Build conflict resolution
         conflict_cols = ", ".join(primary_keys)
@@ -122,22 +191,21 @@ class PostgresConn:
         if update_cols:  # Only if there are non-primary key columns to update
             upsert_sql = f"""
             INSERT INTO {table_name} ({cols_sql}) 
-            VALUES ({placeholders})
+            VALUES %s
             ON CONFLICT ({conflict_cols}) 
             DO UPDATE SET {update_cols}
             """
         else:  # All columns are primary keys, just ignore conflicts
             upsert_sql = f"""
             INSERT INTO {table_name} ({cols_sql}) 
-            VALUES ({placeholders})
+            VALUES %s
             ON CONFLICT ({conflict_cols}) 
             DO NOTHING
             """
         
-        # Execute batch insert
+        # Execute batch insert (page_size files per sentència)
         data = [tuple(row) for row in df.values]
-        cur.executemany(upsert_sql, data)
-        conn.commit()
+        execute_values(cur, upsert_sql, data, page_size=page_size or self.DEFAULT_PAGE_SIZE)
     
     def _upload_replace(self, df, table_name, cur, conn):
         """Replace all data in table"""
@@ -1,5 +1,6 @@
 import os
 import json
+import time
 import logging
 import base64
 import tempfile
@@ -15,7 +16,8 @@ class DatabaseUploader:
                  mapping_path="config/column_mappings/table_mappings.json",
                  export_path="data/processed/exports/",
                  db_config_path="config/database/db_config.json",
-                 csv_mappings_path="config/column_mappings/csv_to_db_mappings.json"):
+                 csv_mappings_path="config/column_mappings/csv_to_db_mappings.json",
+                 page_size=None):
         self.client = client
         self.ref_project = ref_project
         self.mapping_path = mapping_path
@@ -23,6 +25,8 @@ class DatabaseUploader:
         self.db_config_path = db_config_path
         self.csv_mappings_path = csv_mappings_path
         self.db_key = db_key
+        # Files per sentència de l'upsert (None = valor per defecte de PostgresConn)
+        self.page_size = page_size
         self.conn = self._connect()
 
     def _connect(self):
@@ -85,12 +89,26 @@ class DatabaseUploader:
         return df.where(pd.notnull(df), None)
 
     def upload_all(self):
+        """
+        Puja totes les taules en una única transacció
+
+        Cada taula té el seu SAVEPOINT per poder informar de tots els errors;
+        si alguna taula falla es desfà tota la pujada.
+
+        Returns:
+            dict: success, errors (per taula) i timings (per taula)
+        """
         mappings = self._load_mappings()
         dataframes = self._get_dataframes()
 
         load_order = list(mappings.keys())
 
         errors = {}
+        timings = {}
+        start_time = time.perf_counter()
+
+        conn = self.conn.connect()
+        cursor = conn.cursor()
 
         for table in load_order:
             if table not in dataframes:
@@ -134,14 +152,32 @@ class DatabaseUploader:
             df = self._clean_dataframe_for_db(df)
 
             try:
+                cursor.execute("SAVEPOINT upload_table")
                 # Use UPSERT mode to handle duplicate keys gracefully
-                self.conn.upload_dataframe(df, table, mode='upsert')
-                logger.info(f"✔️ Dades pujades a la taula '{table}' ({len(df)} files).")
+                result = self.conn.upload_dataframe(df, table, mode='upsert', commit=False,
+                                                    page_size=self.page_size)
+                cursor.execute("RELEASE SAVEPOINT upload_table")
+                timings[table] = result
+                logger.info(f"✔️ Dades pujades a la taula '{table}' ({len(df)} files) en "
+                            f"{result['seconds']:.2f}s ({result['rows_per_second']:.0f} files/s).")
                 print(f"✔️ Taula '{table}': pujada correcta amb {len(df)} files")
             except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT upload_table")
                 errors[table] = str(e)
                 logger.error(f"❌ Error pujant a la taula '{table}': {e}")
 
+        try:
+            if errors:
+                conn.rollback()
+                logger.error("Pujada desfeta: cap taula s'ha desat per culpa dels errors")
+            else:
+                conn.commit()
+        finally:
+            cursor.close()
+
+        total_seconds = time.perf_counter() - start_time
+        logger.info(f"Pujada de {len(timings)} taules en {total_seconds:.2f}s")
+
         if errors:
             print("\n🚨 Errors durant la pujada:")
             for table, err in errors.items():
@@ -166,6 +202,12 @@ class DatabaseUploader:
             except Exception as cleanup_error:
                 logger.warning(f"Error en la neteja automàtica: {cleanup_error}")
 
+        return {
+            'success': not errors,
+            'errors': errors,
+            'timings': timings,
+            'total_seconds': total_seconds
+        }
 
 
     def cleanup_csv(self):
@@ -0,0 +1,358 @@
+"""
+Measurement Aggregates
+
+Taula d'agregats per (màquina, referència, LOT, element, cavitat) de
+mesuresqualitat: nombre de mesures, suma, suma de quadrats, mínim, màxim,
+mesures fora de tolerància i suma de rangs mòbils. Els resums de capacitat
+(Cp/Cpk/Pp/Ppk) de centenars d'elements es poden calcular a partir
+d'aquestes poques files sense llegir les mesures.
+
+El manteniment és incremental: cada lot d'inserció recalcula només els grups
+afectats (els que tenien les files abans del merge i els nous). La taula i
+l'índex de grups es creen en l'aprovisionament
+(scripts/rebuild_measurement_aggregates.py), no a les insercions: aquestes
+només comproven, amb el cache d'esquema, que la taula existeix.
+"""
+
+import logging
+import math
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .schema_metadata_cache import schema_metadata_cache
+
+logger = logging.getLogger(__name__)
+
+# Constant d2 per rangs mòbils de 2 observacions (sigma dins del subgrup)
+D2_MOVING_RANGE = 1.128
+
+
+class MeasurementAggregateStore:
+    """Manteniment i lectura de la taula d'agregats de mesuresqualitat"""
+
+    SOURCE_TABLE = 'mesuresqualitat'
+    AGGREGATE_TABLE = 'mesuresqualitat_agregats'
+
+    # Columnes que defineixen un grup (NULL es guarda com a text buit)
+    GROUP_COLUMNS = ['maquina', 'id_referencia_client', 'id_lot', 'element', 'cavitat']
+
+    # Clau primària de la taula origen
+    KEY_COLUMNS = ['id_referencia_some', 'id_element']
+
+    def __init__(self, connection, default_maquina: str = 'gompc'):
+        """
+        Inicialitza el magatzem d'agregats
+
+        Args:
+            connection: Connexió psycopg2
+            default_maquina: Valor per defecte de la columna maquina de mesuresqualitat
+        """
+        self.connection = connection
+        self.default_maquina = default_maquina
+
+    def create_table_sql(self) -> List[str]:
+        """
+        SQL idempotent per crear la taula d'agregats i l'índex de grups de la taula origen
+
+        L'índex es crea amb CONCURRENTLY per no bloquejar les escriptures a
+        mesuresqualitat; s'ha d'executar fora de cap transacció.
+        """
+        group_expression = ', '.join(f"COALESCE({col}, '')" for col in self.GROUP_COLUMNS)
+        return [
+            f"""
+            CREATE TABLE IF NOT EXISTS {self.AGGREGATE_TABLE} (
+                maquina character varying(50) NOT NULL,
+                id_referencia_client character varying(100) NOT NULL,
+                id_lot character varying(100) NOT NULL,
+                element character varying(200) NOT NULL,
+                cavitat character varying(100) NOT NULL,
+                n integer NOT NULL,
+                sum_actual double precision,
+                sum_sq_actual double precision,
+                min_actual double precision,
+                max_actual double precision,
+                out_of_tolerance integer NOT NULL DEFAULT 0,
+                moving_range_sum double precision NOT NULL DEFAULT 0,
+                moving_range_count integer NOT NULL DEFAULT 0,
+                nominal double precision,
+                tolerancia_negativa double precision,
+                tolerancia_positiva double precision,
+                first_measurement timestamp without time zone,
+                last_measurement timestamp without time zone,
+                updated_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT {self.AGGREGATE_TABLE}_pkey
+                    PRIMARY KEY (maquina, id_referencia_client, id_lot, element, cavitat)
+            )
+            """,
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.group_index_name()} "
+            f"ON {self.SOURCE_TABLE} ({group_expression})"
+        ]
+
+    def group_index_name(self) -> str:
+        """Nom de l'índex de grups de la taula origen"""
+        return f"idx_{self.SOURCE_TABLE}_agg_group"
+
+    def ensure_table(self) -> None:
+        """
+        Crea la taula d'agregats i l'índex de grups si no existeixen
+
+        És un pas d'aprovisionament (script de reconstrucció), no s'ha de
+        cridar des de les insercions. S'executa en autocommit per poder crear
+        l'índex amb CONCURRENTLY; un índex invàlid d'un intent anterior
+        interromput s'elimina i es torna a crear.
+        """
+        previous_autocommit = self.connection.autocommit
+        if not previous_autocommit:
+            self.connection.rollback()
+        self.connection.autocommit = True
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT i.indisvalid
+                    FROM pg_catalog.pg_index i
+                    WHERE i.indexrelid = to_regclass(%s)
+                """, (self.group_index_name(),))
+                row = cursor.fetchone()
+                if row is not None and not row[0]:
+                    logger.warning(f"Índex {self.group_index_name()} invàlid, es torna a crear")
+                    cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {self.group_index_name()}")
+                for statement in self.create_table_sql():
+                    cursor.execute(statement)
+        finally:
+            self.connection.autocommit = previous_autocommit
+        schema_metadata_cache.invalidate(self.connection, self.AGGREGATE_TABLE)
+        schema_metadata_cache.invalidate(self.connection, self.SOURCE_TABLE)
+
+    def table_exists(self) -> bool:
+        """
+        True si la taula d'agregats existeix
+
+        Es resol amb el cache d'esquema: el catàleg es consulta una vegada per
+        sessió (i es revalida amb l'empremta), no a cada inserció.
+        """
+        return bool(schema_metadata_cache.get_columns(self.connection, self.AGGREGATE_TABLE))
+
+    def batch_groups(self, batch: pd.DataFrame) -> Set[Tuple[str, ...]]:
+        """
+        Grups (màquina, referència, LOT, element, cavitat) d'un lot preparat
+
+        Les columnes que falten es prenen com les desaria la base de dades:
+        maquina amb el valor per defecte i la resta com a NULL ('').
+        """
+        columns = []
+        for col in self.GROUP_COLUMNS:
+            if col in batch.columns:
+                values = batch[col].astype(object).where(batch[col].notna(), '').astype(str)
+            else:
+                values = pd.Series(self.default_maquina if col == 'maquina' else '', index=batch.index)
+            columns.append(values)
+        if not columns or batch.empty:
+            return set()
+        return set(zip(*columns))
+
+    def existing_groups(self, cursor, batch: pd.DataFrame) -> Set[Tuple[str, ...]]:
+        """
+        Grups on són ara les files del lot (abans del merge)
+
+        Una actualització pot moure una fila de grup (p.ex. canvi de cavitat):
+        el grup antic també s'ha de recalcular.
+        """
+        if batch.empty or not all(col in batch.columns for col in self.KEY_COLUMNS):
+            return set()
+        group_expression = ', '.join(f"COALESCE({col}, '')" for col in self.GROUP_COLUMNS)
+        cursor.execute(f"""
+            SELECT DISTINCT {group_expression}
+            FROM {self.SOURCE_TABLE}
+            WHERE ({', '.join(self.KEY_COLUMNS)}) IN (
+                SELECT * FROM unnest(%s::text[], %s::text[])
+            )
+        """, tuple(batch[col].astype(str).tolist() for col in self.KEY_COLUMNS))
+        return {tuple(row) for row in cursor.fetchall()}
+
+    def refresh_groups(self, cursor, groups: Iterable[Tuple[str, ...]]) -> int:
+        """
+        Recalcula els agregats dels grups indicats a partir de mesuresqualitat
+
+        Els grups sense cap mesura vàlida s'eliminen de la taula d'agregats.
+
+        Args:
+            cursor: Cursor de la transacció de la inserció
+            groups: Tuples (maquina, id_referencia_client, id_lot, element, cavitat)
+
+        Returns:
+            int: Nombre de grups recalculats
+        """
+        groups = sorted(set(groups))
+        if not groups:
+            return 0
+
+        params = tuple(list(column) for column in zip(*groups))
+        keys_sql = (f"SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[], %s::text[]) "
+                    f"AS k({', '.join(self.GROUP_COLUMNS)})")
+        group_list = ', '.join(self.GROUP_COLUMNS)
+
+        cursor.execute(f"""
+            DELETE FROM {self.AGGREGATE_TABLE}
+            WHERE ({group_list}) IN ({keys_sql})
+        """, params)
+
+        source_groups = ', '.join(f"COALESCE(m.{col}, '') AS {col}" for col in self.GROUP_COLUMNS)
+        join_condition = ' AND '.join(f"COALESCE(m.{col}, '') = k.{col}" for col in self.GROUP_COLUMNS)
+        cursor.execute(f"""
+            INSERT INTO {self.AGGREGATE_TABLE} (
+                {group_list}, n, sum_actual, sum_sq_actual, min_actual, max_actual,
+                out_of_tolerance, moving_range_sum, moving_range_count,
+                nominal, tolerancia_negativa, tolerancia_positiva,
+                first_measurement, last_measurement, updated_at
+            )
+            SELECT
+                {group_list},
+                COUNT(*),
+                SUM(actual),
+                SUM(actual * actual),
+                MIN(actual),
+                MAX(actual),
+                COUNT(*) FILTER (WHERE actual < nominal + tolerancia_negativa
+                                    OR actual > nominal + tolerancia_positiva),
+                COALESCE(SUM(moving_range), 0),
+                COUNT(moving_range),
+                MODE() WITHIN GROUP (ORDER BY nominal),
+                MODE() WITHIN GROUP (ORDER BY tolerancia_negativa),
+                MODE() WITHIN GROUP (ORDER BY tolerancia_positiva),
+                MIN(data_hora),
+                MAX(data_hora),
+                CURRENT_TIMESTAMP
+            FROM (
+                SELECT
+                    {source_groups},
+                    CAST(m.actual AS double precision) AS actual,
+                    CAST(m.nominal AS double precision) AS nominal,
+                    CAST(m.tolerancia_negativa AS double precision) AS tolerancia_negativa,
+                    CAST(m.tolerancia_positiva AS double precision) AS tolerancia_positiva,
+                    m.data_hora,
+                    ABS(m.actual - LAG(m.actual) OVER (
+                        PARTITION BY {', '.join(f"COALESCE(m.{col}, '')" for col in self.GROUP_COLUMNS)}
+                        ORDER BY m.data_hora, m.id_element
+                    )) AS moving_range
+                FROM {self.SOURCE_TABLE} m
+                JOIN ({keys_sql}) k ON {join_condition}
+                WHERE m.actual IS NOT NULL
+            ) g
+            GROUP BY {group_list}
+        """, params)
+        return len(groups)
+
+    def rebuild(self) -> int:
+        """
+        Reconstrueix tota la taula d'agregats (inicialització o reparació)
+
+        Returns:
+            int: Nombre de grups
+        """
+        group_expression = ', '.join(f"COALESCE({col}, '')" for col in self.GROUP_COLUMNS)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT DISTINCT {group_expression} FROM {self.SOURCE_TABLE} WHERE actual IS NOT NULL")
+            groups = {tuple(row) for row in cursor.fetchall()}
+            cursor.execute(f"DELETE FROM {self.AGGREGATE_TABLE}")
+            refreshed = self.refresh_groups(cursor, groups)
+        if not self.connection.autocommit:
+            self.connection.commit()
+        logger.info(f"Agregats de mesures reconstruïts: {refreshed} grups")
+        return refreshed
+
+    def get_capability_overview(self, id_referencia_client: str, lots: List[str] = None,
+                                maquina: str = None) -> List[Dict[str, Any]]:
+        """
+        Resum de capacitat per element a partir dels agregats
+
+        Args:
+            id_referencia_client: Referència del client
+            lots: LOTs a incloure (None = tots)
+            maquina: Màquina (None = totes)
+
+        Returns:
+            Llista de diccionaris per element amb n, mean, std_overall,
+            std_within, out_of_tolerance, cp, cpk, pp i ppk
+        """
+        conditions = ["id_referencia_client = %s"]
+        params: List[Any] = [id_referencia_client]
+        if lots:
+            conditions.append("id_lot = ANY(%s)")
+            params.append([str(lot) for lot in lots])
+        if maquina:
+            conditions.append("maquina = %s")
+            params.append(maquina)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT element, SUM(n), SUM(sum_actual), SUM(sum_sq_actual),
+                       MIN(min_actual), MAX(max_actual), SUM(out_of_tolerance),
+                       SUM(moving_range_sum), SUM(moving_range_count),
+                       MODE() WITHIN GROUP (ORDER BY nominal),
+                       MODE() WITHIN GROUP (ORDER BY tolerancia_negativa),
+                       MODE() WITHIN GROUP (ORDER BY tolerancia_positiva)
+                FROM {self.AGGREGATE_TABLE}
+                WHERE {' AND '.join(conditions)}
+                GROUP BY element
+                ORDER BY element
+            """, tuple(params))
+            rows = cursor.fetchall()
+        if not self.connection.autocommit:
+            self.connection.rollback()
+
+        return [self.capability_from_aggregate(*row) for row in rows]
+
+    @staticmethod
+    def capability_from_aggregate(element: str, n, sum_actual, sum_sq_actual, min_actual, max_actual,
+                                  out_of_tolerance, moving_range_sum, moving_range_count,
+                                  nominal, tol_neg, tol_pos) -> Dict[str, Any]:
+        """
+        Estadístics i índexs de capacitat d'un element a partir de sumes
+
+        Pp/Ppk utilitzen la desviació global (sumes); Cp/Cpk la desviació dins
+        del subgrup estimada amb el rang mòbil mitjà (MR/d2).
+        """
+        n = int(n or 0)
+
+        def as_float(value) -> Optional[float]:
+            return float(value) if value is not None else None
+
+        mean = as_float(sum_actual) / n if n and sum_actual is not None else None
+        std_overall = None
+        if n > 1 and sum_actual is not None and sum_sq_actual is not None:
+            variance = (float(sum_sq_actual) - float(sum_actual) ** 2 / n) / (n - 1)
+            std_overall = math.sqrt(max(variance, 0.0))
+        std_within = None
+        if moving_range_count:
+            std_within = float(moving_range_sum) / int(moving_range_count) / D2_MOVING_RANGE
+
+        nominal, tol_neg, tol_pos = as_float(nominal), as_float(tol_neg), as_float(tol_pos)
+
+        def indices(std: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+            if mean is None or not std or None in (nominal, tol_neg, tol_pos):
+                return None, None
+            usl, lsl = nominal + tol_pos, nominal + tol_neg
+            if usl <= lsl:
+                return None, None
+            return (usl - lsl) / (6 * std), min(usl - mean, mean - lsl) / (3 * std)
+
+        cp, cpk = indices(std_within)
+        pp, ppk = indices(std_overall)
+        return {
+            'element': element,
+            'n': n,
+            'mean': mean,
+            'std_overall': std_overall,
+            'std_within': std_within,
+            'min': as_float(min_actual),
+            'max': as_float(max_actual),
+            'out_of_tolerance': int(out_of_tolerance or 0),
+            'nominal': nominal,
+            'tolerancia_negativa': tol_neg,
+            'tolerancia_positiva': tol_pos,
+            'cp': cp,
+            'cpk': cpk,
+            'pp': pp,
+            'ppk': ppk
+        }
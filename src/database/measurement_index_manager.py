@@ -0,0 +1,248 @@
+"""
+Measurement Index Manager
+
+Deriva i crea els índexs que necessiten les consultes del
+MeasurementHistoryService a partir de TABLE_COLUMN_MAPPING:
+
+- Compostos: (referència, element, data_hora DESC) i (referència, LOT, element)
+- D'expressió: UPPER(referència) i UPPER(LOT) per comparacions sense majúscules
+- Trigrama (pg_trgm, GIN): per cerques LIKE '%x%' de referència i LOT
+
+La creació és idempotent (IF NOT EXISTS, i els índexs invàlids d'un
+CREATE INDEX CONCURRENTLY interromput es tornen a crear). També informa de
+l'ús dels índexs i de les lectures seqüencials de cada taula.
+"""
+
+import hashlib
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Longitud màxima d'un identificador PostgreSQL
+MAX_IDENTIFIER_LENGTH = 63
+
+
+class MeasurementIndexManager:
+    """Provisió i seguiment dels índexs de les taules de mesures"""
+
+    def __init__(self, connection, schema: str = None, table_mapping: Dict[str, Dict] = None):
+        """
+        Inicialitza el gestor
+
+        Args:
+            connection: Connexió psycopg2 (es posa en autocommit per CREATE INDEX CONCURRENTLY)
+            schema: Schema de les taules (per defecte el del MeasurementHistoryService)
+            table_mapping: Mapatge de taules (per defecte TABLE_COLUMN_MAPPING)
+        """
+        if schema is None or table_mapping is None:
+            from src.services.measurement_history_service import MEASUREMENT_SCHEMA, TABLE_COLUMN_MAPPING
+            schema = schema or MEASUREMENT_SCHEMA
+            table_mapping = table_mapping or TABLE_COLUMN_MAPPING
+
+        self.connection = connection
+        self.schema = schema
+        self.table_mapping = table_mapping
+
+    def derive_index_definitions(self) -> List[Dict[str, str]]:
+        """
+        Deriva les definicions d'índex de totes les taules del mapatge
+
+        Returns:
+            list: Diccionaris amb name, table, kind i sql
+        """
+        definitions = []
+        for table_key, mapping in self.table_mapping.items():
+            table = mapping['table']
+            qualified_table = f"{self.schema}.{table}"
+            columns = mapping['columns']
+
+            ref_col = columns.get('id_referencia_client')
+            element_col = columns.get('element')
+            lot_col = columns.get('id_lot')
+            data_col = columns.get('data_hora')
+
+            def add(kind: str, suffix: str, expression: str, method: str = 'btree'):
+                name = self._index_name(table, suffix)
+                definitions.append({
+                    'name': name,
+                    'table': table,
+                    'kind': kind,
+                    'sql': (f"CREATE INDEX {{concurrently}}IF NOT EXISTS {name} "
+                            f"ON {qualified_table} USING {method} ({expression})")
+                })
+
+            # Compostos: mesures d'un element (ordenades per data) i agregats per LOT
+            if ref_col and element_col:
+                expression = f"{ref_col}, {element_col}"
+                if data_col:
+                    expression += f", {data_col} DESC"
+                add('composite', 'ref_elem_data', expression)
+            if ref_col and lot_col and element_col:
+                add('composite', 'ref_lot_elem', f"{ref_col}, {lot_col}, {element_col}")
+
+            # Expressions: comparacions UPPER(...) = UPPER(%s)
+            if ref_col:
+                add('expression', 'upper_ref', f"UPPER(CAST({ref_col} AS text))")
+            if lot_col:
+                add('expression', 'upper_lot', f"UPPER(CAST({lot_col} AS text))")
+
+            # Trigrama: LIKE '%x%' (amb i sense UPPER)
+            if ref_col:
+                add('trigram', 'ref_trgm', f"CAST({ref_col} AS text) gin_trgm_ops", method='gin')
+                add('trigram', 'upper_ref_trgm', f"UPPER(CAST({ref_col} AS text)) gin_trgm_ops", method='gin')
+            if lot_col:
+                add('trigram', 'upper_lot_trgm', f"UPPER(CAST({lot_col} AS text)) gin_trgm_ops", method='gin')
+
+        return definitions
+
+    def provision(self, dry_run: bool = False, concurrently: bool = True,
+                  kinds: List[str] = None) -> Dict[str, Any]:
+        """
+        Crea els índexs que falten (idempotent)
+
+        Args:
+            dry_run: Si és True, només retorna l'SQL que s'executaria
+            concurrently: Crear amb CONCURRENTLY (sense bloquejar escriptures)
+            kinds: Tipus a crear ('composite', 'expression', 'trigram'); None = tots
+
+        Returns:
+            dict: success, created, existing, skipped, errors i statements
+        """
+        result = {'success': True, 'created': [], 'existing': [], 'skipped': [], 'errors': [], 'statements': []}
+        definitions = [d for d in self.derive_index_definitions() if kinds is None or d['kind'] in kinds]
+
+        previous_autocommit = self.connection.autocommit
+        self.connection.autocommit = True
+        try:
+            existing_tables = self._existing_tables()
+            index_state = self._index_state()
+
+            trigram_available = True
+            if any(d['kind'] == 'trigram' for d in definitions):
+                trigram_available = self._ensure_trigram_extension(dry_run, result)
+
+            for definition in definitions:
+                name = definition['name']
+                if definition['table'] not in existing_tables:
+                    result['skipped'].append({'name': name, 'reason': "la taula no existeix"})
+                    continue
+                if definition['kind'] == 'trigram' and not trigram_available:
+                    result['skipped'].append({'name': name, 'reason': "pg_trgm no disponible"})
+                    continue
+
+                state = index_state.get(name)
+                if state is True:
+                    result['existing'].append(name)
+                    continue
+
+                statements = []
+                if state is False:
+                    # Índex invàlid d'un CREATE INDEX CONCURRENTLY interromput
+                    statements.append(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}"
+                                      f"IF EXISTS {self.schema}.{name}")
+                statements.append(definition['sql'].format(concurrently='CONCURRENTLY ' if concurrently else ''))
+                result['statements'].extend(statements)
+
+                if dry_run:
+                    continue
+
+                try:
+                    with self.connection.cursor() as cursor:
+                        for statement in statements:
+                            cursor.execute(statement)
+                    result['created'].append(name)
+                    logger.info(f"Índex creat: {name}")
+                except Exception as e:
+                    result['errors'].append({'name': name, 'error': str(e)})
+                    logger.warning(f"No s'ha pogut crear l'índex {name}: {e}")
+        finally:
+            self.connection.autocommit = previous_autocommit
+
+        result['success'] = not result['errors']
+        logger.info(f"Provisió d'índexs: {len(result['created'])} creats, {len(result['existing'])} existents, "
+                    f"{len(result['skipped'])} omesos, {len(result['errors'])} errors")
+        return result
+
+    def get_index_usage(self) -> List[Dict[str, Any]]:
+        """
+        Estadístiques d'ús dels índexs i de lectures seqüencials de les taules del mapatge
+
+        Returns:
+            list: Una fila per índex amb table, index, idx_scan, idx_tup_read,
+            index_size, seq_scan, seq_tup_read i managed (si és un índex derivat)
+        """
+        tables = sorted({mapping['table'] for mapping in self.table_mapping.values()})
+        managed = {definition['name'] for definition in self.derive_index_definitions()}
+        query = """
+            SELECT t.relname, i.indexrelname, i.idx_scan, i.idx_tup_read,
+                   pg_relation_size(i.indexrelid), t.seq_scan, t.seq_tup_read
+            FROM pg_stat_user_tables t
+            LEFT JOIN pg_stat_user_indexes i ON i.relid = t.relid
+            WHERE t.schemaname = %s AND t.relname = ANY(%s)
+            ORDER BY t.relname, i.indexrelname
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(query, (self._schema_name(), tables))
+            rows = cursor.fetchall()
+        if not self.connection.autocommit:
+            self.connection.rollback()
+
+        return [{
+            'table': row[0],
+            'index': row[1],
+            'idx_scan': row[2],
+            'idx_tup_read': row[3],
+            'index_size': row[4],
+            'seq_scan': row[5],
+            'seq_tup_read': row[6],
+            'managed': row[1] in managed
+        } for row in rows]
+
+    def _ensure_trigram_extension(self, dry_run: bool, result: Dict) -> bool:
+        """Activa pg_trgm si cal; retorna False si no es pot"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            if cursor.fetchone():
+                return True
+            result['statements'].append("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            if dry_run:
+                return True
+            try:
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                logger.info("Extensió pg_trgm activada")
+                return True
+            except Exception as e:
+                logger.warning(f"No es pot activar pg_trgm (calen permisos): {e}")
+                result['errors'].append({'name': 'pg_trgm', 'error': str(e)})
+                return False
+
+    def _existing_tables(self) -> set:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (self._schema_name(),))
+            return {row[0] for row in cursor.fetchall()}
+
+    def _index_state(self) -> Dict[str, bool]:
+        """Índexs existents al schema: nom -> vàlid"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT c.relname, x.indisvalid
+                FROM pg_index x
+                JOIN pg_class c ON c.oid = x.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = %s
+            """, (self._schema_name(),))
+            return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def _schema_name(self) -> str:
+        """Nom del schema sense cometes"""
+        return self.schema.strip('"')
+
+    @staticmethod
+    def _index_name(table: str, suffix: str) -> str:
+        """Nom d'índex estable i dins del límit de 63 caràcters"""
+        name = f"idx_{table}_{suffix}".lower()
+        if len(name) <= MAX_IDENTIFIER_LENGTH:
+            return name
+        digest = hashlib.md5(name.encode('utf-8')).hexdigest()[:8]
+        return f"{name[:MAX_IDENTIFIER_LENGTH - 9]}_{digest}"
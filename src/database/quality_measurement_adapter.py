@@ -12,6 +12,7 @@ Adapta la taula mesuresqualitat per incloure totes les columnes del dat
 """
 
 import logging
+import numpy as np
 import pandas as pd
 import psycopg2
 from psycopg2.extras import RealDictCursor
@@ -19,12 +20,35 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
 import os
+import io
+import time
+
+from .connection_pool import get_connection_pool
+from .measurement_aggregates import MeasurementAggregateStore
+from .schema_metadata_cache import schema_metadata_cache
+from .server_cursor import iter_query_dataframes, read_query_dataframe
 
 logger = logging.getLogger(__name__)
 
 class QualityMeasurementDBAdapter:
     """Gestiona l'adaptació de l'esquema de BBDD per les mesures de qualitat"""
     
+    # Mètodes d'inserció: 'copy' (COPY a taula temporal + merge) o 'executemany' (fila a fila)
+    INSERT_METHODS = ('copy', 'executemany')
+    DEFAULT_INSERT_METHOD = 'copy'
+    
+    # Mida de lot per defecte de cada mètode
+    DEFAULT_BATCH_SIZES = {'copy': 10000, 'executemany': 1000}
+    
+    # Clau primària de mesuresqualitat (ON CONFLICT)
+    UPSERT_KEY_COLUMNS = ['id_referencia_some', 'id_element']
+    
+    # Taula temporal de staging per al mètode 'copy' (es buida a cada commit)
+    STAGING_TABLE = 'stg_mesuresqualitat'
+    
+    # Representació de NULL al COPY (distingeix NULL de text buit)
+    COPY_NULL = '\\N'
+    
     def __init__(self, db_config: Dict[str, str], table_name: str = 'mesuresqualitat'):
         """
         Inicialitza l'adaptador
@@ -36,6 +60,7 @@ class QualityMeasurementDBAdapter:
                 'mesures_gompc_projecets', 'mesureshoytom', 'mesurestoriso'
         """
         self.connection = None
+        self._pool = None
         self.table_name = table_name
         
         # Debug logging per verificar la configuració rebuda
@@ -75,6 +100,10 @@ class QualityMeasurementDBAdapter:
         
         # Camp fixe per aquesta màquina
         self.maquina = "gompc"
+        
+        # Mantenir la taula d'agregats per element a cada inserció
+        self.update_aggregates = True
+        self._aggregate_store = None
     
     def connect(self) -> bool:
         """
@@ -97,16 +126,18 @@ class QualityMeasurementDBAdapter:
             
             logger.info(f"Intentant connectar a {config['host']}:{config['port']} -> {config['database']}")
             
-            self.connection = psycopg2.connect(
-                host=config['host'],
-                port=int(config['port']),  # Assegurar que port sigui enter
-                database=config['database'],
-                user=config['user'],
-                password=config['password'],
+            # Connexió del pool compartit del procés
+            self._pool = get_connection_pool({
+                'host': config['host'],
+                'port': int(config['port']),  # Assegurar que port sigui enter
+                'database': config['database'],
+                'user': config['user'],
+                'password': config['password'],
                 # Assegurar encoding UTF-8 per suportar Unicode correctament
-                client_encoding='utf8',
-                connect_timeout=10  # Timeout de connexió
-            )
+                'client_encoding': 'utf8',
+                'connect_timeout': 10  # Timeout de connexió
+            })
+            self.connection = self._pool.getconn()
             self.connection.autocommit = True
             
             # Configurar la connexió per treballar amb UTF-8
@@ -127,48 +158,34 @@ class QualityMeasurementDBAdapter:
             return False
     
     def disconnect(self):
-        """Tanca la connexió a la base de dades"""
+        """Retorna la connexió al pool compartit"""
         if self.connection:
-            self.connection.close()
+            connection, self.connection = self.connection, None
+            if self._pool is not None:
+                self._pool.putconn(connection)
+            else:
+                connection.close()
             logger.info("Connexió a la base de dades tancada")
     
     def close(self):
         """Àlies per disconnect() per compatibilitat"""
         self.disconnect()
     
-    def get_current_table_structure(self) -> Dict[str, str]:
+    def get_current_table_structure(self, refresh: bool = False) -> Dict[str, str]:
         """
         Obté l'estructura actual de la taula mesuresqualitat
         
+        L'estructura es llegeix del catàleg una vegada per sessió
+        (schema_metadata_cache) i es reutilitza a cada inserció.
+        
+        Args:
+            refresh: Si és True, es torna a llegir del catàleg
+        
         Returns:
             dict: Diccionari amb nom_columna: tipus_dada
         """
         try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT column_name, data_type, character_maximum_length, is_nullable
-                    FROM information_schema.columns 
-                    WHERE table_name = 'mesuresqualitat' 
-                    AND table_schema = 'public'
-                    ORDER BY ordinal_position;
-                """)
-                
-                columns = {}
-                for row in cursor.fetchall():
-                    col_name, data_type, max_length, is_nullable = row
-                    if max_length:
-                        full_type = f"{data_type}({max_length})"
-                    else:
-                        full_type = data_type
-                    
-                    columns[col_name] = {
-                        'type': full_type,
-                        'nullable': is_nullable == 'YES'
-                    }
-                
-                logger.info(f"Estructura actual de mesuresqualitat: {len(columns)} columnes")
-                return columns
-                
+            return schema_metadata_cache.get_columns(self.connection, 'mesuresqualitat', refresh=refresh)
         except Exception as e:
             logger.error(f"Error obtenint estructura de la taula: {e}")
             return {}
@@ -249,6 +266,13 @@ class QualityMeasurementDBAdapter:
             dict: Resultat de l'actualització amb success i message
         """
         try:
+            if schema_metadata_cache.is_schema_applied(self.connection, 'mesuresqualitat'):
+                logger.info("Esquema de mesuresqualitat ja actualitzat en aquesta sessió")
+                return {
+                    'success': True,
+                    'message': 'Taula ja actualitzada (sense modificacions)'
+                }
+            
             logger.info("Actualitzant esquema de la taula mesuresqualitat...")
             
             # Obtenir estructura actual
@@ -260,6 +284,8 @@ class QualityMeasurementDBAdapter:
                 
                 with self.connection.cursor() as cursor:
                     cursor.execute(schema_sql)
+                schema_metadata_cache.invalidate(self.connection, 'mesuresqualitat')
+                schema_metadata_cache.mark_schema_applied(self.connection, 'mesuresqualitat')
                 
                 logger.info("Nova taula mesuresqualitat creada amb èxit")
                 return {
@@ -273,14 +299,22 @@ class QualityMeasurementDBAdapter:
                 # Crear script d'actualització progressiva
                 alter_statements = self._generate_alter_statements(current_structure)
                 
+                failed_statements = 0
                 with self.connection.cursor() as cursor:
                     for statement in alter_statements:
                         try:
                             cursor.execute(statement)
                             logger.info(f"Executat: {statement[:50]}...")
                         except Exception as e:
+                            failed_statements += 1
                             logger.warning(f"Error executant ALTER: {e}")
                 
+                # L'estructura ha pogut canviar; si tot s'ha aplicat, no cal
+                # tornar-ho a fer fins que l'esquema canviï
+                schema_metadata_cache.invalidate(self.connection, 'mesuresqualitat')
+                if not failed_statements:
+                    schema_metadata_cache.mark_schema_applied(self.connection, 'mesuresqualitat')
+                
                 logger.info("Taula mesuresqualitat actualitzada")
                 return {
                     'success': True,
@@ -368,6 +402,13 @@ class QualityMeasurementDBAdapter:
         """
         Prepara el dataset per a la inserció a la BBDD amb suport Unicode millorat
         
+        Totes les conversions es fan per columnes: el text es normalitza una
+        vegada per valor diferent (ValueCleaner.normalize_unicode_series), els
+        números amb ValueCleaner.clean_numeric_series i les claus primàries es
+        construeixen per combinació diferent de valors. El resultat és el mateix
+        que aplicar les funcions escalars del ValueCleaner cel·la a cel·la
+        (vegeu scripts/benchmark_prepare_dataset.py).
+        
         Args:
             df: DataFrame amb les dades del CSV
             
@@ -376,14 +417,11 @@ class QualityMeasurementDBAdapter:
         """
         logger.info(f"Preparant dataset de {len(df)} files per inserció amb suport Unicode")
         
-        # Crear còpia del dataset
-        prepared_df = df.copy()
-        
-        # Neteja inicial - eliminar columnes duplicades
-        prepared_df = prepared_df.loc[:, ~prepared_df.columns.duplicated()]
+        # Còpia única del dataset, sense columnes duplicades
+        prepared_df = df.loc[:, ~df.columns.duplicated()].copy()
         
         # Neteja de caràcters especials i normalització Unicode millorada
-        prepared_df = self._clean_encoding_issues_enhanced(prepared_df)
+        prepared_df = self._clean_encoding_issues_enhanced(prepared_df, copy=False)
         
         # Verificar que tenim les columnes essencials
         required_cols = ['CLIENT', 'REFERENCIA', 'LOT']
@@ -393,20 +431,20 @@ class QualityMeasurementDBAdapter:
                 return pd.DataFrame()  # Retornar dataset buit
         
         # Generar claus primàries amb normalització Unicode
-        prepared_df['id_referencia_some'] = (
-            self._normalize_text_for_db(prepared_df['CLIENT'].astype(str)) + '_' + 
-            self._normalize_text_for_db(prepared_df['REFERENCIA'].astype(str)) + '_' + 
-            self._normalize_text_for_db(prepared_df['LOT'].astype(str))
-        )
+        prepared_df['id_referencia_some'] = self._join_key_columns([
+            prepared_df['CLIENT'].astype(str),
+            prepared_df['REFERENCIA'].astype(str),
+            prepared_df['LOT'].astype(str)
+        ])
         
         # Generar id_element amb més seguretat i normalització
         element_col = prepared_df.get('Element', pd.Series(['UNKNOWN'] * len(prepared_df)))
         property_col = prepared_df.get('Property', pd.Series(['UNKNOWN'] * len(prepared_df)))
         
-        prepared_df['id_element'] = (
-            self._normalize_text_for_db(element_col.fillna('UNKNOWN').astype(str)) + '_' + 
-            self._normalize_text_for_db(property_col.fillna('UNKNOWN').astype(str))
-        )
+        prepared_df['id_element'] = self._join_key_columns([
+            element_col.fillna('UNKNOWN').astype(str),
+            property_col.fillna('UNKNOWN').astype(str)
+        ])
         
         # Mapear columnes - només les que existeixen
         column_mapping = {}
@@ -424,8 +462,10 @@ class QualityMeasurementDBAdapter:
             prepared_df['data_hora'] = pd.to_datetime(prepared_df['data_hora'], errors='coerce')
         
         # Assignar valor i ok basant-se en 'actual' amb precisió millorada
+        actual_values = None
         if 'actual' in prepared_df.columns:
-            prepared_df['valor'] = self._convert_to_numeric_with_precision(prepared_df['actual'])
+            actual_values = self._convert_to_numeric_with_precision(prepared_df['actual'])
+            prepared_df['valor'] = actual_values
             # Determinar OK basant-se en si està dins de toleràncies
             prepared_df['ok'] = self._calculate_ok_status(prepared_df)
         else:
@@ -444,14 +484,17 @@ class QualityMeasurementDBAdapter:
         # Convertir camps numèrics amb gestió millorada de precisió
         numeric_cols = ['nominal', 'actual', 'tolerancia_negativa', 'tolerancia_positiva', 'desviacio', 'valor']
         for col in numeric_cols:
-            if col in prepared_df.columns:
+            if col == 'actual' and actual_values is not None:
+                # Ja convertit per calcular 'valor'
+                prepared_df[col] = actual_values
+            elif col in prepared_df.columns:
                 prepared_df[col] = self._convert_to_numeric_with_precision(prepared_df[col])
         
         # Convertir camps de text amb normalització Unicode i limitar longitud
         text_cols = ['client', 'element', 'pieza', 'datum', 'property', 'check_value', 'out_value', 'alignment', 'fase']
         for col in text_cols:
             if col in prepared_df.columns:
-                prepared_df[col] = prepared_df[col].apply(self._normalize_text_for_db).str[:200]
+                prepared_df[col] = self._normalize_text_for_db(prepared_df[col]).str[:200]
         
         # Per clients regulars sense fase, afegir columna buida
         if 'fase' not in prepared_df.columns:
@@ -460,6 +503,46 @@ class QualityMeasurementDBAdapter:
         logger.info(f"Dataset preparat amb suport Unicode: {len(prepared_df)} files, {len(prepared_df.columns)} columnes")
         return prepared_df
     
+    def _join_key_columns(self, parts: List[pd.Series]) -> pd.Series:
+        """
+        Clau composta 'a_b_c' a partir de columnes de text normalitzades
+        
+        Les parts es normalitzen i s'uneixen una sola vegada per combinació
+        diferent de valors, sense crear cap sèrie intermèdia de text per fila.
+        
+        Args:
+            parts: Columnes de la clau (amb el mateix índex)
+            
+        Returns:
+            pd.Series: Clau de cada fila
+        """
+        normalized = [self._normalize_text_for_db(part) for part in parts]
+        if any(not part.index.equals(normalized[0].index) for part in normalized[1:]):
+            # Índexs diferents: la concatenació alinea per índex (els buits queden NaN)
+            joined = normalized[0]
+            for part in normalized[1:]:
+                joined = joined + '_' + part
+            return joined
+        if len(normalized[0]) == 0:
+            return normalized[0].astype(object)
+        # Mateix tipus que la concatenació de columnes de text (str a pandas 3)
+        dtype = parts[0].dtype
+        
+        # Codi de cada combinació a partir dels codis de cada part
+        codes = np.zeros(len(normalized[0]), dtype=np.int64)
+        factorized_parts = []
+        for part in normalized:
+            part_codes, uniques = pd.factorize(part.to_numpy(dtype=object))
+            codes, _ = pd.factorize(codes * len(uniques) + part_codes)
+            factorized_parts.append((part_codes, uniques))
+        
+        # Primera fila de cada combinació: la clau es construeix una sola vegada
+        first_rows = np.empty(codes.max() + 1, dtype=np.int64)
+        first_rows[codes[::-1]] = np.arange(len(codes) - 1, -1, -1)
+        keys = np.array(['_'.join(uniques[part_codes[row]] for part_codes, uniques in factorized_parts)
+                         for row in first_rows], dtype=object)
+        return pd.Series(keys[codes], index=normalized[0].index, dtype=dtype)
+    
     def _calculate_ok_status(self, df: pd.DataFrame) -> pd.Series:
         """
         Calcula l'estat OK basant-se en toleràncies
@@ -566,76 +649,6 @@ class QualityMeasurementDBAdapter:
         logger.info("Neteja d'encoding completada")
         return cleaned_df
 
-    def _convert_to_numeric_european(self, series: pd.Series) -> pd.Series:
-        """
-        Converteix una sèrie a valors numèrics gestionant formats europeus
-        
-        Args:
-            series: Sèrie pandas amb valors a convertir
-            
-        Returns:
-            Sèrie pandas amb valors numèrics
-        """
-        def clean_numeric_value(value):
-            """Neteja un valor per convertir-lo a numèric"""
-            if pd.isna(value):
-                return None
-            
-            # Convertir a string
-            str_val = str(value).strip()
-            
-            # Si ja és un número vàlid, retornar-lo
-            try:
-                return float(str_val)
-            except ValueError:
-                pass
-            
-            # Netejar valors comuns
-            str_val = str_val.replace(' ', '')  # Eliminar espais
-            str_val = str_val.replace('±', '')   # Eliminar símbol ±
-            str_val = str_val.replace('+/-', '') # Eliminar +/-
-            str_val = str_val.replace('°', '')   # Eliminar símbols de grau
-            str_val = str_val.replace('μ', '')   # Eliminar micro
-            
-            # Si conté comes i punts, determinar quin és el separador decimal
-            if ',' in str_val and '.' in str_val:
-                # Format: 1.234,56 (europeu) -> 1234.56
-                if str_val.rindex(',') > str_val.rindex('.'):
-                    str_val = str_val.replace('.', '').replace(',', '.')
-                # Format: 1,234.56 (americà) -> mantenir
-                else:
-                    str_val = str_val.replace(',', '')
-            elif ',' in str_val:
-                # Només comes - assumir format europeu: 1,5 -> 1.5
-                str_val = str_val.replace(',', '.')
-            
-            # Eliminar caràcters no numèrics excepte el punt decimal i el signe menys
-            import re
-            str_val = re.sub(r'[^\d\.\-]', '', str_val)
-            
-            # Assegurar que només hi ha un punt decimal
-            parts = str_val.split('.')
-            if len(parts) > 2:
-                str_val = parts[0] + '.' + ''.join(parts[1:])
-            
-            try:
-                return float(str_val) if str_val else None
-            except ValueError:
-                logger.warning(f"No s'ha pogut convertir valor: '{value}' -> '{str_val}'")
-                return None
-        
-        # Aplicar la funció de neteja
-        cleaned_series = series.apply(clean_numeric_value)
-        
-        # Informar sobre conversions
-        original_count = len(series.dropna())
-        converted_count = len(cleaned_series.dropna())
-        if original_count > 0:
-            success_rate = (converted_count / original_count) * 100
-            logger.info(f"Conversió numèrica: {converted_count}/{original_count} valors ({success_rate:.1f}%)")
-        
-        return cleaned_series
-
     def _calculate_ok_status(self, df: pd.DataFrame) -> pd.Series:
         """
         Calcula l'estat OK basant-se en toleràncies
@@ -676,19 +689,31 @@ class QualityMeasurementDBAdapter:
             # Retornar tots True per defecte
             return pd.Series([True] * len(df), index=df.index)
     
-    def insert_dataset(self, df: pd.DataFrame, batch_size: int = 1000) -> Dict[str, Any]:
+    def insert_dataset(self, df: pd.DataFrame, batch_size: int = None, method: str = None) -> Dict[str, Any]:
         """
         Insereix el dataset a la taula mesuresqualitat
         
+        Amb method='copy' cada lot es carrega amb COPY a una taula temporal i
+        s'integra amb un únic INSERT ... SELECT ... ON CONFLICT. Cada lot és una
+        transacció: si falla, només es descarta aquell lot. method='executemany'
+        manté la inserció fila a fila anterior (per comparar).
+        
         Args:
             df: DataFrame amb les dades preparades
-            batch_size: Mida del lot per la inserció
+            batch_size: Mida del lot per la inserció (per defecte segons el mètode)
+            method: 'copy' (per defecte) o 'executemany'
             
         Returns:
-            dict: Resum de la inserció amb success, records_inserted, errors, etc.
+            dict: Resum de la inserció amb success, records_inserted, errors, rows_per_second, etc.
         """
+        method = method or self.DEFAULT_INSERT_METHOD
+        start_time = time.perf_counter()
         try:
-            logger.info(f"Iniciant inserció de {len(df)} files en lots de {batch_size}")
+            if method not in self.INSERT_METHODS:
+                raise ValueError(f"Mètode d'inserció desconegut: {method}")
+            batch_size = batch_size or self.DEFAULT_BATCH_SIZES[method]
+            
+            logger.info(f"Iniciant inserció de {len(df)} files en lots de {batch_size} (mètode {method})")
             
             # El dataset ja ha de venir preparat, no cal preparar-lo de nou
             prepared_df = df.copy()
@@ -700,50 +725,51 @@ class QualityMeasurementDBAdapter:
             df_columns = [col for col in prepared_df.columns if col in table_columns]
             insert_df = prepared_df[df_columns]
             
+            self._aggregate_store = self._prepare_aggregate_store()
+            
+            if method == 'copy':
+                insert_batch = self._insert_batch_copy
+                self._begin_copy_insertion()
+            else:
+                insert_batch = self._insert_batch_executemany
+            
             # Inserció en lots
             total_inserted = 0
             total_errors = 0
             errors_list = []
             
-            for i in range(0, len(insert_df), batch_size):
-                batch = insert_df.iloc[i:i+batch_size]
-                
-                try:
-                    # Generar SQL d'inserció
-                    placeholders = ', '.join(['%s'] * len(df_columns))
-                    columns_str = ', '.join(df_columns)
-                    
-                    sql = f"""
-                    INSERT INTO mesuresqualitat ({columns_str}) 
-                    VALUES ({placeholders})
-                    ON CONFLICT (id_referencia_some, id_element) 
-                    DO UPDATE SET 
-                        {', '.join([f"{col} = EXCLUDED.{col}" for col in df_columns if col not in ['id_referencia_some', 'id_element', 'updated_at']])},
-                        updated_at = CURRENT_TIMESTAMP
-                    """
-                    
-                    with self.connection.cursor() as cursor:
-                        # Preparar dades per la inserció
-                        data_tuples = [tuple(row) for row in batch.values]
-                        cursor.executemany(sql, data_tuples)
-                    
-                    total_inserted += len(batch)
-                    logger.info(f"Lot {i//batch_size + 1}: {len(batch)} files inserides (Total: {total_inserted})")
+            try:
+                for i in range(0, len(insert_df), batch_size):
+                    batch = insert_df.iloc[i:i+batch_size]
                     
-                except Exception as e:
-                    total_errors += len(batch)
-                    error_msg = f"Error en lot {i//batch_size + 1}: {e}"
-                    errors_list.append(error_msg)
-                    logger.error(error_msg)
-            
-            logger.info(f"Inserció completada: {total_inserted} files inserides, {total_errors} errors")
+                    try:
+                        insert_batch(batch, df_columns)
+                        
+                        total_inserted += len(batch)
+                        logger.info(f"Lot {i//batch_size + 1}: {len(batch)} files inserides (Total: {total_inserted})")
+                        
+                    except Exception as e:
+                        total_errors += len(batch)
+                        error_msg = f"Error en lot {i//batch_size + 1}: {e}"
+                        errors_list.append(error_msg)
+                        logger.error(error_msg)
+            finally:
+                if method == 'copy':
+                    self._end_copy_insertion()
+            
+            elapsed = time.perf_counter() - start_time
+            rows_per_second = total_inserted / elapsed if elapsed > 0 else 0.0
+            logger.info(f"Inserció completada: {total_inserted} files inserides, {total_errors} errors "
+                        f"({rows_per_second:.0f} files/s)")
             
             return {
                 'success': total_errors == 0,
                 'records_inserted': total_inserted,
                 'skipped_records': total_errors,
                 'errors': errors_list,
-                'total_processed': len(df)
+                'total_processed': len(df),
+                'method': method,
+                'rows_per_second': rows_per_second
             }
             
         except Exception as e:
@@ -753,9 +779,179 @@ class QualityMeasurementDBAdapter:
                 'records_inserted': 0,
                 'skipped_records': 0,
                 'errors': [str(e)],
-                'total_processed': len(df) if 'df' in locals() else 0
+                'total_processed': len(df) if 'df' in locals() else 0,
+                'method': method,
+                'rows_per_second': 0.0
             }
     
+    def _build_upsert_sql(self, columns: List[str], source_sql: str) -> str:
+        """
+        Genera l'INSERT ... ON CONFLICT per a les columnes donades
+        
+        Args:
+            columns: Columnes a inserir
+            source_sql: Origen de les files ('VALUES (...)' o 'SELECT ... FROM ...')
+        """
+        columns_str = ', '.join(columns)
+        update_columns = [col for col in columns if col not in self.UPSERT_KEY_COLUMNS + ['updated_at']]
+        return f"""
+                    INSERT INTO mesuresqualitat ({columns_str}) 
+                    {source_sql}
+                    ON CONFLICT ({', '.join(self.UPSERT_KEY_COLUMNS)}) 
+                    DO UPDATE SET 
+                        {''.join(f"{col} = EXCLUDED.{col}, " for col in update_columns)}updated_at = CURRENT_TIMESTAMP
+                    """
+    
+    def _insert_batch_executemany(self, batch: pd.DataFrame, columns: List[str]):
+        """Insereix un lot fila a fila amb executemany (mètode anterior)"""
+        placeholders = ', '.join(['%s'] * len(columns))
+        sql = self._build_upsert_sql(columns, f"VALUES ({placeholders})")
+        
+        with self.connection.cursor() as cursor:
+            previous_groups = self._previous_aggregate_groups(cursor, batch)
+            # Preparar dades per la inserció
+            data_tuples = [tuple(row) for row in batch.values]
+            cursor.executemany(sql, data_tuples)
+            self._refresh_aggregates(cursor, batch, previous_groups)
+    
+    def _begin_copy_insertion(self):
+        """
+        Prepara la connexió i la taula temporal de staging per al mètode 'copy'
+        
+        La staging es crea de nou a cada inserció: una de prèvia que hagi
+        quedat a la connexió (del pool, reset() no elimina les taules
+        temporals) no tindria les columnes afegides per update_table_schema.
+        """
+        self._copy_previous_autocommit = self.connection.autocommit
+        self.connection.autocommit = False
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{self.STAGING_TABLE}")
+                cursor.execute(f"""
+                    CREATE TEMP TABLE {self.STAGING_TABLE}
+                    (LIKE mesuresqualitat INCLUDING DEFAULTS)
+                    ON COMMIT DELETE ROWS
+                """)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            self.connection.autocommit = self._copy_previous_autocommit
+            raise
+    
+    def _end_copy_insertion(self):
+        """Elimina la taula de staging i restaura el mode autocommit de la connexió"""
+        try:
+            self.connection.rollback()
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{self.STAGING_TABLE}")
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            logger.warning(f"No es pot eliminar la taula de staging {self.STAGING_TABLE}: {e}")
+        finally:
+            self.connection.autocommit = getattr(self, '_copy_previous_autocommit', True)
+    
+    def _insert_batch_copy(self, batch: pd.DataFrame, columns: List[str]):
+        """
+        Insereix un lot amb COPY a la taula de staging i un únic merge
+        
+        El lot és una transacció: en cas d'error es fa rollback i la taula
+        destí i la de staging queden com abans del lot.
+        """
+        # Un INSERT ... SELECT no pot actualitzar la mateixa fila dues vegades:
+        # com executemany, es queda l'última aparició de cada clau
+        key_columns = [col for col in self.UPSERT_KEY_COLUMNS if col in columns]
+        if key_columns:
+            batch = batch.drop_duplicates(subset=key_columns, keep='last')
+        
+        columns_str = ', '.join(columns)
+        sql = self._build_upsert_sql(columns, f"SELECT {columns_str} FROM {self.STAGING_TABLE}")
+        
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {self.STAGING_TABLE} ({columns_str}) FROM STDIN "
+                    f"WITH (FORMAT csv, NULL '{self.COPY_NULL}')",
+                    self._dataframe_to_copy_buffer(batch)
+                )
+                previous_groups = self._previous_aggregate_groups(cursor, batch)
+                cursor.execute(sql)
+                self._refresh_aggregates(cursor, batch, previous_groups)
+            self.connection.commit()
+        except Exception:
+            self.connection.rollback()
+            raise
+    
+    def _prepare_aggregate_store(self) -> Optional[MeasurementAggregateStore]:
+        """
+        Magatzem d'agregats per a la inserció; None si està desactivat o la taula no existeix
+
+        No executa DDL: la taula es crea amb scripts/rebuild_measurement_aggregates.py.
+        """
+        if not self.update_aggregates:
+            return None
+        store = MeasurementAggregateStore(self.connection, default_maquina=self.maquina)
+        try:
+            if store.table_exists():
+                return store
+            logger.warning(f"La taula {store.AGGREGATE_TABLE} no existeix, s'insereix sense agregats "
+                           f"(executeu scripts/rebuild_measurement_aggregates.py)")
+        except Exception as e:
+            if not self.connection.autocommit:
+                self.connection.rollback()
+            logger.warning(f"No es pot comprovar la taula d'agregats, s'insereix sense agregats: {e}")
+        return None
+    
+    def _previous_aggregate_groups(self, cursor, batch: pd.DataFrame) -> set:
+        """Grups on eren les files del lot abans del merge (per recalcular-los també)"""
+        store = self._aggregate_store
+        if store is None:
+            return set()
+        in_transaction = not self.connection.autocommit
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT aggregates")
+            groups = store.existing_groups(cursor, batch)
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT aggregates")
+            return groups
+        except Exception as e:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT aggregates")
+            logger.warning(f"Error llegint els grups d'agregats anteriors del lot: {e}")
+            return set()
+    
+    def _refresh_aggregates(self, cursor, batch: pd.DataFrame, previous_groups: set):
+        """
+        Recalcula els agregats dels grups afectats per un lot
+        
+        Dins d'una transacció es protegeix amb un SAVEPOINT: si falla, el lot
+        de mesures es confirma igualment i els agregats d'aquells grups es
+        corregeixen a la propera inserció o amb MeasurementAggregateStore.rebuild().
+        """
+        store = self._aggregate_store
+        if store is None:
+            return
+        in_transaction = not self.connection.autocommit
+        try:
+            if in_transaction:
+                cursor.execute("SAVEPOINT aggregates")
+            refreshed = store.refresh_groups(cursor, previous_groups | store.batch_groups(batch))
+            if in_transaction:
+                cursor.execute("RELEASE SAVEPOINT aggregates")
+            logger.debug(f"Agregats actualitzats: {refreshed} grups")
+        except Exception as e:
+            if in_transaction:
+                cursor.execute("ROLLBACK TO SAVEPOINT aggregates")
+            logger.warning(f"Error actualitzant els agregats del lot: {e}")
+    
+    def _dataframe_to_copy_buffer(self, df: pd.DataFrame) -> io.StringIO:
+        """Serialitza un DataFrame en CSV per COPY (valors nuls com a \\N)"""
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False, na_rep=self.COPY_NULL)
+        buffer.seek(0)
+        return buffer
+    
     def get_insert_summary(self) -> Dict[str, Any]:
         """
         Obté un resum de les dades inserides
@@ -882,13 +1078,16 @@ class QualityMeasurementDBAdapter:
                 self.connection.rollback()
             raise e
     
-    def execute_query_to_dataframe(self, query: str, params: tuple = None) -> pd.DataFrame:
+    def execute_query_to_dataframe(self, query: str, params: tuple = None, itersize: int = None) -> pd.DataFrame:
         """
         Executa una query SQL i retorna els resultats com a DataFrame
         
+        Les files es llegeixen per blocs amb un cursor de servidor.
+        
         Args:
             query: Query SQL a executar
             params: Paràmetres de la query (opcional)
+            itersize: Files per bloc (opcional)
             
         Returns:
             pd.DataFrame: Resultats de la query com a DataFrame
@@ -897,11 +1096,7 @@ class QualityMeasurementDBAdapter:
             if not self.connection:
                 raise Exception("No hi ha connexió activa a la base de dades")
             
-            # Usar pandas per llegir directament de la BD
-            if params:
-                df = pd.read_sql_query(query, self.connection, params=params)
-            else:
-                df = pd.read_sql_query(query, self.connection)
+            df = read_query_dataframe(self.connection, query, params, itersize)
             
             logger.info(f"Query executada correctament: {len(df)} files retornades")
             return df
@@ -910,6 +1105,23 @@ class QualityMeasurementDBAdapter:
             logger.error(f"Error executant query to DataFrame: {e}")
             raise e
     
+    def iter_query_dataframes(self, query: str, params: tuple = None, itersize: int = None):
+        """
+        Executa una query SQL i en retorna els resultats per blocs de DataFrame
+        
+        Args:
+            query: Query SQL a executar
+            params: Paràmetres de la query (opcional)
+            itersize: Files per bloc (opcional)
+            
+        Yields:
+            pd.DataFrame: Bloc de resultats (com a mínim un, encara que sigui buit)
+        """
+        if not self.connection:
+            raise Exception("No hi ha connexió activa a la base de dades")
+        
+        yield from iter_query_dataframes(self.connection, query, params, itersize)
+    
     def get_table_info(self, table_name: str) -> Dict[str, Any]:
         """
         Obté informació detallada d'una taula
@@ -1150,17 +1362,20 @@ class QualityMeasurementDBAdapter:
             text_series_or_value: Text o sèrie de pandas a normalitzar
             
         Returns:
-            str o sèrie: Text normalitzat
+            str o sèrie: Text normalitzat (els nuls queden com a "")
         """
         from src.services.value_cleaner import ValueCleaner
         
+        if isinstance(text_series_or_value, pd.Series):
+            series = text_series_or_value
+            if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+                # Valors no textuals (números, booleans...): es normalitza el seu str()
+                series = series.astype(object).where(series.isna(), series.astype(str))
+            return ValueCleaner.normalize_unicode_series(series)
+        
         if pd.isna(text_series_or_value):
             return ""
-        
-        if isinstance(text_series_or_value, pd.Series):
-            return text_series_or_value.apply(lambda x: ValueCleaner.normalize_unicode_text(str(x)) if not pd.isna(x) else "")
-        else:
-            return ValueCleaner.normalize_unicode_text(str(text_series_or_value))
+        return ValueCleaner.normalize_unicode_text(str(text_series_or_value))
     
     def _convert_to_numeric_with_precision(self, numeric_series) -> pd.Series:
         """
@@ -1175,30 +1390,34 @@ class QualityMeasurementDBAdapter:
         from src.services.value_cleaner import ValueCleaner
         
         if isinstance(numeric_series, pd.Series):
-            return numeric_series.apply(ValueCleaner.clean_numeric_value)
+            return ValueCleaner.clean_numeric_series(numeric_series)
         else:
             return ValueCleaner.clean_numeric_value(numeric_series)
     
-    def _clean_encoding_issues_enhanced(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _clean_encoding_issues_enhanced(self, df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
         """
         Neteja problemes d'encoding amb suport Unicode millorat
         
+        Cada columna de text es normalitza per valors únics; els nuls es mantenen.
+        
         Args:
             df: DataFrame a netejar
+            copy: Treballar sobre una còpia (False = modificar df)
             
         Returns:
             DataFrame: DataFrame amb encoding net
         """
-        from src.services.value_cleaner import ValueCleaner
-        
-        df_clean = df.copy()
+        df_clean = df.copy() if copy else df
         
         # Netejar totes les columnes de text
         for col in df_clean.select_dtypes(include=['object']).columns:
             try:
-                df_clean[col] = df_clean[col].apply(
-                    lambda x: ValueCleaner.normalize_unicode_text(str(x)) if not pd.isna(x) else x
-                )
+                series = df_clean[col]
+                missing = series.isna()
+                normalized = self._normalize_text_for_db(series)
+                if missing.any():
+                    normalized = normalized.where(~missing, series.astype(object))
+                df_clean[col] = normalized
             except Exception as e:
                 logger.warning(f"Error netejant columna {col}: {e}")
                 continue
@@ -0,0 +1,207 @@
+"""
+Schema Metadata Cache
+
+Cache en memòria (per procés) de l'estructura de les taules (columnes de
+information_schema) per (base de dades, schema, taula). Les connexions del
+pool a la mateixa base de dades comparteixen l'entrada, de manera que la
+consulta al catàleg es fa una vegada per sessió i no a cada inserció.
+
+Cada entrada guarda una empremta del catàleg (oid de la taula, columnes i
+índexs) que es torna a comprovar, amb una consulta petita a pg_catalog, quan
+han passat revalidate_seconds: un canvi d'esquema fet per un altre procés
+es detecta sense tornar a llegir information_schema. Els canvis d'esquema
+fets pel mateix procés l'han d'invalidar explícitament (invalidate).
+"""
+
+import copy
+import time
+import logging
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SchemaMetadataCache:
+    """Estructura de taules per (connexió, schema, taula) amb validació per empremta"""
+
+    DEFAULT_REVALIDATE_SECONDS = 300.0
+
+    COLUMNS_QUERY = """
+        SELECT column_name, data_type, character_maximum_length, is_nullable
+        FROM information_schema.columns
+        WHERE table_name = %s
+        AND table_schema = %s
+        ORDER BY ordinal_position;
+    """
+
+    # Empremta: oid de la taula + columnes (nom, tipus, NOT NULL) + índexs
+    FINGERPRINT_QUERY = """
+        SELECT c.oid::bigint,
+               md5(COALESCE((
+                   SELECT string_agg(a.attname || ':' || format_type(a.atttypid, a.atttypmod)
+                                     || ':' || a.attnotnull::text, ',' ORDER BY a.attnum)
+                   FROM pg_catalog.pg_attribute a
+                   WHERE a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+               ), '') || '|' || COALESCE((
+                   SELECT string_agg(i.indexrelid::regclass::text, ',' ORDER BY i.indexrelid::regclass::text)
+                   FROM pg_catalog.pg_index i
+                   WHERE i.indrelid = c.oid
+               ), ''))
+        FROM pg_catalog.pg_class c
+        JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = %s AND c.relname = %s
+    """
+
+    def __init__(self, revalidate_seconds: float = None):
+        """
+        Inicialitza el cache
+
+        Args:
+            revalidate_seconds: Segons durant els quals una entrada es fa servir
+                sense comprovar l'empremta del catàleg
+        """
+        self.revalidate_seconds = (self.DEFAULT_REVALIDATE_SECONDS if revalidate_seconds is None
+                                   else revalidate_seconds)
+        self._entries: Dict[Hashable, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.stats = {'hits': 0, 'loads': 0, 'revalidations': 0, 'schema_changes': 0, 'invalidations': 0}
+
+    @staticmethod
+    def connection_key(connection) -> Tuple:
+        """
+        Identificador de la base de dades d'una connexió (sense contrasenya)
+
+        Les connexions psycopg2 s'identifiquen pels paràmetres del DSN; la
+        resta (connexions de test) per la identitat de l'objecte.
+        """
+        try:
+            params = connection.get_dsn_parameters()
+            return (params.get('host'), params.get('port'), params.get('dbname'), params.get('user'))
+        except Exception:
+            return ('connection', id(connection))
+
+    def get_columns(self, connection, table: str, schema: str = 'public',
+                    refresh: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Estructura d'una taula: nom_columna -> {'type', 'nullable'}
+
+        Args:
+            connection: Connexió psycopg2
+            table: Nom de la taula
+            schema: Schema de la taula
+            refresh: Si és True, es torna a llegir del catàleg
+
+        Returns:
+            dict: Columnes en ordre (buit si la taula no existeix)
+        """
+        with self._lock:
+            entry = None if refresh else self._valid_entry(connection, table, schema)
+            if entry is None:
+                entry = self._load(connection, table, schema)
+            return copy.deepcopy(entry['columns'])
+
+    def is_schema_applied(self, connection, table: str, schema: str = 'public') -> bool:
+        """
+        True si ja s'ha aplicat l'actualització d'esquema a la taula en aquesta
+        sessió i l'esquema no ha canviat després
+        """
+        with self._lock:
+            entry = self._valid_entry(connection, table, schema)
+            return bool(entry and entry['schema_applied'])
+
+    def mark_schema_applied(self, connection, table: str, schema: str = 'public') -> None:
+        """
+        Recorda que l'esquema de la taula ja està actualitzat
+
+        Es llegeix l'estructura actual (l'empremta queda associada a l'esquema
+        aplicat); un canvi posterior del catàleg anul·la la marca.
+        """
+        with self._lock:
+            entry = self._valid_entry(connection, table, schema) or self._load(connection, table, schema)
+            entry['schema_applied'] = True
+
+    def invalidate(self, connection=None, table: str = None, schema: str = None) -> int:
+        """
+        Elimina les entrades d'una connexió/taula (o totes si no s'indica res)
+
+        S'ha de cridar després d'executar DDL sobre la taula.
+
+        Returns:
+            int: Nombre d'entrades eliminades
+        """
+        with self._lock:
+            connection_key = self.connection_key(connection) if connection is not None else None
+            stale = [key for key in self._entries
+                     if (connection_key is None or key[0] == connection_key)
+                     and (schema is None or key[1] == schema)
+                     and (table is None or key[2] == table)]
+            for key in stale:
+                del self._entries[key]
+            self.stats['invalidations'] += len(stale)
+        if stale:
+            logger.debug(f"Cache d'esquema invalidat: {len(stale)} entrades")
+        return len(stale)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Comptadors del cache"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries),
+                    'revalidate_seconds': self.revalidate_seconds}
+
+    def fetch_fingerprint(self, connection, table: str, schema: str = 'public') -> Optional[str]:
+        """Empremta actual de la taula al catàleg (None si no existeix)"""
+        with connection.cursor() as cursor:
+            cursor.execute(self.FINGERPRINT_QUERY, (schema, table))
+            row = cursor.fetchone()
+        return f"{row[0]}:{row[1]}" if row else None
+
+    def _valid_entry(self, connection, table: str, schema: str) -> Optional[Dict[str, Any]]:
+        """Entrada vigent (revalidada amb l'empremta si cal) o None"""
+        key = (self.connection_key(connection), schema, table)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        if time.monotonic() - entry['checked_at'] < self.revalidate_seconds:
+            self.stats['hits'] += 1
+            return entry
+
+        if self.fetch_fingerprint(connection, table, schema) == entry['fingerprint']:
+            entry['checked_at'] = time.monotonic()
+            self.stats['revalidations'] += 1
+            return entry
+
+        logger.info(f"L'esquema de {schema}.{table} ha canviat, es torna a llegir")
+        del self._entries[key]
+        self.stats['schema_changes'] += 1
+        return None
+
+    def _load(self, connection, table: str, schema: str) -> Dict[str, Any]:
+        """Llegeix l'estructura i l'empremta del catàleg i les guarda"""
+        fingerprint = self.fetch_fingerprint(connection, table, schema)
+        with connection.cursor() as cursor:
+            cursor.execute(self.COLUMNS_QUERY, (table, schema))
+            rows = cursor.fetchall()
+
+        columns = {}
+        for col_name, data_type, max_length, is_nullable in rows:
+            columns[col_name] = {
+                'type': f"{data_type}({max_length})" if max_length else data_type,
+                'nullable': is_nullable == 'YES'
+            }
+
+        entry = {
+            'columns': columns,
+            'fingerprint': fingerprint,
+            'checked_at': time.monotonic(),
+            'schema_applied': False
+        }
+        self._entries[(self.connection_key(connection), schema, table)] = entry
+        self.stats['loads'] += 1
+        logger.info(f"Estructura actual de {table}: {len(columns)} columnes")
+        return entry
+
+
+# Cache compartit de l'estructura de les taules de mesures
+schema_metadata_cache = SchemaMetadataCache()
@@ -0,0 +1,141 @@
+"""
+Server Cursor
+
+Lectura en streaming de consultes PostgreSQL amb cursors de servidor
+(cursors amb nom de psycopg2). Les files es reben en blocs de `itersize`
+en lloc de portar tot el resultat a memòria amb fetchall(), de manera que
+les taules de mesures de milions de files es poden recórrer amb memòria
+acotada.
+"""
+
+import uuid
+import logging
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Files per bloc (FETCH FORWARD) per defecte
+DEFAULT_ITERSIZE = 20000
+
+
+def iter_query_chunks(connection, query: str, params=None,
+                      itersize: int = None) -> Iterator[Tuple[List[str], List[tuple]]]:
+    """
+    Executa una consulta amb un cursor de servidor i en retorna les files per blocs
+
+    Els cursors de servidor necessiten una transacció: si la connexió és en
+    mode autocommit, es desactiva durant la lectura i es restaura en acabar.
+    Si la connexió ja era transaccional, la transacció queda per al cridador.
+
+    Args:
+        connection: Connexió psycopg2
+        query: Consulta SELECT
+        params: Paràmetres de la consulta (opcional)
+        itersize: Files per bloc (per defecte DEFAULT_ITERSIZE)
+
+    Yields:
+        tuple: (columnes, files del bloc). Si no hi ha cap fila es retorna
+        un únic bloc buit perquè el cridador conegui les columnes.
+    """
+    itersize = itersize or DEFAULT_ITERSIZE
+    owns_transaction = connection.autocommit
+    if owns_transaction:
+        connection.autocommit = False
+
+    cursor = connection.cursor(name=f"stream_{uuid.uuid4().hex}")
+    cursor.itersize = itersize
+    try:
+        cursor.execute(query, params)
+        columns = None
+        total_rows = 0
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if columns is None:
+                columns = [desc[0] for desc in cursor.description]
+            if not rows:
+                if total_rows == 0:
+                    yield columns, []
+                break
+            total_rows += len(rows)
+            yield columns, rows
+        logger.debug(f"Consulta en streaming completada: {total_rows} files")
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+        if owns_transaction:
+            try:
+                connection.rollback()
+            finally:
+                connection.autocommit = True
+
+
+def iter_query_dataframes(connection, query: str, params=None,
+                          itersize: int = None) -> Iterator[pd.DataFrame]:
+    """
+    Com iter_query_chunks però cada bloc es retorna com a DataFrame
+
+    Els decimals es converteixen a float com fa pd.read_sql_query.
+    """
+    for columns, rows in iter_query_chunks(connection, query, params, itersize):
+        yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+
+
+def read_query_dataframe(connection, query: str, params=None, itersize: int = None) -> pd.DataFrame:
+    """
+    Llegeix tot el resultat d'una consulta en un DataFrame, bloc a bloc
+
+    Cada bloc es copia a arrays preassignats per columna, que creixen per
+    duplicació d'un en un. No es guarden tots els blocs per concatenar-los
+    al final (que duplicaria el resultat en memòria): el pic és el resultat
+    més una columna i el bloc en curs.
+    """
+    columns = None
+    dtypes = None
+    arrays: List[np.ndarray] = []
+    size = 0
+
+    for chunk in iter_query_dataframes(connection, query, params, itersize):
+        if columns is None:
+            columns = list(chunk.columns)
+            dtypes = list(chunk.dtypes)
+            arrays = [chunk.iloc[:, i].to_numpy(copy=True) for i in range(len(columns))]
+            size = len(chunk)
+            if chunk.empty:
+                return chunk
+            continue
+
+        needed = size + len(chunk)
+        for i in range(len(columns)):
+            values = chunk.iloc[:, i].to_numpy()
+            array = arrays[i]
+            dtype = np.result_type(array.dtype, values.dtype)
+            capacity = max(needed, 2 * len(array)) if needed > len(array) else len(array)
+            if capacity != len(array) or dtype != array.dtype:
+                grown = np.empty(capacity, dtype=dtype)
+                grown[:size] = array[:size]
+                array = grown
+            array[size:needed] = values
+            arrays[i] = array
+        size = needed
+
+    if columns is None:
+        return pd.DataFrame()
+
+    data = {}
+    for i, array in enumerate(arrays):
+        column = pd.Series(array[:size], copy=False)
+        if column.dtype != dtypes[i]:
+            # Tipus de pandas (p.ex. dates amb zona horària) que to_numpy converteix a objectes
+            try:
+                column = column.astype(dtypes[i])
+            except (TypeError, ValueError):
+                column = column.infer_objects()
+        data[i] = column
+    df = pd.DataFrame(data, copy=False)
+    df.columns = columns
+    return df
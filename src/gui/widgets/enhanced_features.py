@@ -281,6 +281,10 @@ class MultiLOTComparisonDialog(QDialog):
         select_all_btn.clicked.connect(self._select_all_lots)
         left_layout.addWidget(select_all_btn)
         
+        refresh_btn = QPushButton("🔄 Refresh LOTs")
+        refresh_btn.clicked.connect(self._refresh_lots)
+        left_layout.addWidget(refresh_btn)
+        
         compare_btn = QPushButton("Compare Selected LOTs")
         compare_btn.clicked.connect(self._compare_lots)
         left_layout.addWidget(compare_btn)
@@ -345,6 +349,14 @@ class MultiLOTComparisonDialog(QDialog):
             logger.error(f"Error loading LOTs: {e}")
             QMessageBox.warning(self, "Error", f"Could not load LOTs: {e}")
     
+    def _refresh_lots(self):
+        """Discard cached query results and reload LOTs from the database"""
+        from src.services.measurement_history_service import MeasurementHistoryService
+        
+        MeasurementHistoryService.refresh_cache()
+        self.lot_list.clear()
+        self.load_available_lots()
+    
     def _select_all_lots(self):
         """Select all LOTs in the list"""
         for i in range(self.lot_list.count()):
@@ -366,22 +378,26 @@ class MultiLOTComparisonDialog(QDialog):
         
         try:
             from src.services.measurement_history_service import MeasurementHistoryService
-            from src.services.capability_calculation_service import CapabilityCalculationService
             import numpy as np
             
             # Clear previous results
             self.results_table.setRowCount(0)
             
             service = MeasurementHistoryService(machine=self.machine)
-            calc_service = CapabilityCalculationService()
+            
+            # One aggregated query for every (LOT, element) pair
+            statistics = service.get_lot_element_statistics(
+                client=self.client,
+                project_reference=self.reference,
+                lots=selected_lots
+            )
+            
+            stats_by_lot = {}
+            for element_stats in statistics:
+                stats_by_lot.setdefault(element_stats['id_lot'], []).append(element_stats)
             
             for lot in selected_lots:
-                # Get all elements for this LOT
-                elements = service.get_available_elements(
-                    client=self.client,
-                    project_reference=self.reference,
-                    lot=lot
-                )
+                elements = stats_by_lot.get(lot, [])
                 
                 if not elements:
                     continue
@@ -391,41 +407,13 @@ class MultiLOTComparisonDialog(QDialog):
                 lot_cpks = []
                 total_measurements = 0
                 
-                for element in elements:
-                    # Get measurements for this element
-                    measurements = service.get_measurements(
-                        client=self.client,
-                        project_reference=self.reference,
-                        element_name=element['name'],
-                        lot=lot
-                    )
-                    
-                    if not measurements or len(measurements) < 2:
-                        continue
-                    
-                    total_measurements += len(measurements)
-                    
-                    # Get tolerance for this element
-                    tolerance = element.get('tolerance', 0)
-                    nominal = element.get('nominal', 0)
+                for element_stats in elements:
+                    total_measurements += element_stats['n']
                     
-                    if tolerance > 0:
-                        usl = nominal + tolerance
-                        lsl = nominal - tolerance
-                        
-                        # Calculate Cp and Cpk
-                        values = np.array(measurements)
-                        mean = np.mean(values)
-                        std = np.std(values, ddof=1)
-                        
-                        if std > 0:
-                            cp = (usl - lsl) / (6 * std)
-                            cpu = (usl - mean) / (3 * std)
-                            cpl = (mean - lsl) / (3 * std)
-                            cpk = min(cpu, cpl)
-                            
-                            lot_cps.append(cp)
-                            lot_cpks.append(cpk)
+                    capability = service.capability_from_statistics(element_stats)
+                    if capability:
+                        lot_cps.append(capability['cp'])
+                        lot_cpks.append(capability['cpk'])
                 
                 # Calculate average statistics for this LOT
                 if lot_cps and lot_cpks:
@@ -22,26 +22,47 @@ logger = logging.getLogger(__name__)
 class DatabaseLoadWorker(QThread):
     """Worker thread per carregar dades de la base de dades"""
     
-    data_loaded = pyqtSignal(str, pd.DataFrame)  # table_name, dataframe
+    chunk_loaded = pyqtSignal(str, pd.DataFrame)  # table_name, bloc de files
+    data_loaded = pyqtSignal(str, bool)  # table_name, retallada a MAX_DISPLAY_ROWS
     error_occurred = pyqtSignal(str)
     finished_loading = pyqtSignal()
     
-    def __init__(self, table_name, db_adapter, limit=None):
+    # Màxim de files a la graella (QTableWidget crea un element per cel·la),
+    # també amb "Mostrar totes les files"
+    MAX_DISPLAY_ROWS = 100000
+    
+    # Files per bloc: els primers blocs es mostren mentre arriben els següents
+    DISPLAY_ITERSIZE = 2000
+    
+    def __init__(self, table_name, db_adapter, limit=None, itersize=None):
         super().__init__()
         self.table_name = table_name
         self.db_adapter = db_adapter
         self.limit = limit
+        self.itersize = itersize or self.DISPLAY_ITERSIZE
     
     def run(self):
         try:
-            # Carregar dades de la taula
-            if self.limit:
-                query = f"SELECT * FROM {self.table_name} LIMIT {self.limit}"
-            else:
-                query = f"SELECT * FROM {self.table_name}"
-                
-            df = self.db_adapter.execute_query_to_dataframe(query)
-            self.data_loaded.emit(self.table_name, df)
+            # Sense límit es demana una fila de més per saber si cal retallar
+            max_rows = min(self.limit, self.MAX_DISPLAY_ROWS) if self.limit else self.MAX_DISPLAY_ROWS
+            query_limit = max_rows if self.limit and self.limit <= self.MAX_DISPLAY_ROWS else max_rows + 1
+            query = f"SELECT * FROM {self.table_name} LIMIT {query_limit}"
+            
+            # Lectura per blocs amb cursor de servidor; cada bloc s'envia a la graella
+            total_rows = 0
+            truncated = False
+            for chunk in self.db_adapter.iter_query_dataframes(query, itersize=self.itersize):
+                if self.isInterruptionRequested():
+                    return
+                if total_rows + len(chunk) > max_rows:
+                    chunk = chunk.iloc[:max_rows - total_rows]
+                    truncated = True
+                total_rows += len(chunk)
+                self.chunk_loaded.emit(self.table_name, chunk)
+                if truncated:
+                    break
+            
+            self.data_loaded.emit(self.table_name, truncated)
         except Exception as e:
             self.error_occurred.emit(f"Error carregant taula {self.table_name}: {str(e)}")
         finally:
@@ -61,6 +82,8 @@ class DatabaseEditor(QDialog):
         self.current_table = None
         self.current_dataframe = None
         self.modified_rows = set()
+        self.load_worker = None
+        self._loaded_chunks = []  # Blocs rebuts de la càrrega en curs
         
         self.init_ui()
         self.load_database_connection()
@@ -292,8 +315,18 @@ class DatabaseEditor(QDialog):
             else:
                 limit = self.limit_spinbox.value()
             
-            # Modificar el worker per acceptar límit
-            self.load_worker = DatabaseLoadWorker(table_name, self.db_adapter, limit)
+            # Una càrrega anterior encara en curs ja no s'ha de mostrar
+            if self.load_worker is not None and self.load_worker.isRunning():
+                self.load_worker.requestInterruption()
+            
+            self._loaded_chunks = []
+            self.table_widget.clear()
+            self.table_widget.setRowCount(0)
+            self.table_widget.setColumnCount(0)
+            
+            self.load_worker = DatabaseLoadWorker(table_name, self.db_adapter, limit,
+                                                  itersize=DatabaseLoadWorker.DISPLAY_ITERSIZE)
+            self.load_worker.chunk_loaded.connect(self.on_chunk_loaded)
             self.load_worker.data_loaded.connect(self.on_data_loaded)
             self.load_worker.error_occurred.connect(self.on_load_error)
             self.load_worker.finished_loading.connect(self.on_load_finished)
@@ -302,16 +335,47 @@ class DatabaseEditor(QDialog):
         except Exception as e:
             self.on_load_error(f"Error iniciant càrrega: {str(e)}")
     
-    def on_data_loaded(self, table_name, dataframe):
-        """Quan les dades s'han carregat correctament"""
+    def on_chunk_loaded(self, table_name, chunk):
+        """Afegeix a la graella un bloc de files a mesura que arriba"""
+        if self.sender() is not self.load_worker:
+            return
+        
+        start_row = self.table_widget.rowCount()
+        if not self._loaded_chunks:
+            self.table_widget.setColumnCount(len(chunk.columns))
+            self.table_widget.setHorizontalHeaderLabels([str(col) for col in chunk.columns])
+        self._loaded_chunks.append(chunk)
+        self.append_rows_to_table_widget(chunk, start_row)
+        self.stats_label.setText(f"Carregant '{table_name}': {start_row + len(chunk):,} files...")
+    
+    def on_data_loaded(self, table_name, truncated):
+        """Quan s'han rebut tots els blocs de la taula"""
+        if self.sender() is not self.load_worker:
+            return
+        
+        chunks = self._loaded_chunks
+        self._loaded_chunks = []
+        # Com a màxim MAX_DISPLAY_ROWS files: una sola concatenació al final
+        if not chunks:
+            dataframe = pd.DataFrame()
+        elif len(chunks) == 1:
+            dataframe = chunks[0]
+        else:
+            dataframe = pd.concat(chunks, ignore_index=True)
+        
         self.current_dataframe = dataframe
-        self.populate_table_widget(dataframe)
+        if not dataframe.empty:
+            self.table_widget.resizeColumnsToContents()
+            self.table_widget.horizontalHeader().setStretchLastSection(True)
         self.update_stats(dataframe)
         self.modified_rows.clear()
         self.save_btn.setEnabled(False)
         
         # Actualitzar informació de la taula
         self.info_text.append(f"✅ Taula '{table_name}' carregada: {len(dataframe)} files")
+        if truncated:
+            self.info_text.append(f"⚠️ Es mostren només les primeres {DatabaseLoadWorker.MAX_DISPLAY_ROWS:,} files; "
+                                  f"useu una query amb filtres per veure la resta")
         
         # Mostrar informació sobre les columnes
         if not dataframe.empty:
@@ -347,25 +411,31 @@ class DatabaseEditor(QDialog):
             self.table_widget.setColumnCount(0)
             return
         
-        # Configurar files i columnes
-        self.table_widget.setRowCount(len(dataframe))
+        # Configurar columnes i headers
         self.table_widget.setColumnCount(len(dataframe.columns))
-        
-        # Headers
-        self.table_widget.setHorizontalHeaderLabels(dataframe.columns.tolist())
+        self.table_widget.setHorizontalHeaderLabels([str(col) for col in dataframe.columns])
         
         # Emplenar dades
-        for row in range(len(dataframe)):
-            for col in range(len(dataframe.columns)):
-                value = dataframe.iloc[row, col]
-                item = QTableWidgetItem(str(value) if pd.notna(value) else "")
-                self.table_widget.setItem(row, col, item)
+        self.append_rows_to_table_widget(dataframe, 0)
         
         # Ajustar columnes
         self.table_widget.resizeColumnsToContents()
         header = self.table_widget.horizontalHeader()
         header.setStretchLastSection(True)
     
+    def append_rows_to_table_widget(self, dataframe, start_row):
+        """Afegeix les files d'un DataFrame a la graella a partir de start_row"""
+        # Omplir la graella no és una edició de l'usuari (itemChanged)
+        self.table_widget.blockSignals(True)
+        try:
+            self.table_widget.setRowCount(start_row + len(dataframe))
+            for offset, values in enumerate(dataframe.itertuples(index=False, name=None)):
+                for col, value in enumerate(values):
+                    item = QTableWidgetItem(str(value) if pd.notna(value) else "")
+                    self.table_widget.setItem(start_row + offset, col, item)
+        finally:
+            self.table_widget.blockSignals(False)
+    
     def update_stats(self, dataframe):
         """Actualitza les estadístiques"""
         rows = len(dataframe)
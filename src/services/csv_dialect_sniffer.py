@@ -0,0 +1,157 @@
+"""
+CSV Dialect Sniffer
+
+Detecta l'encoding i el separador d'un CSV GOMPC llegint només els primers
+bytes del fitxer, per poder-lo parsejar una sola vegada amb pd.read_csv en
+lloc de provar totes les combinacions encoding × separador sobre la xarxa.
+
+Com que tots els exports GOMPC d'una mateixa carpeta de referència tenen el
+mateix format, el dialecte detectat es guarda en memòria per carpeta.
+"""
+
+import codecs
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CsvDialectSniffer:
+    """Detecta i cacheja el dialecte (encoding + separador) dels CSV per carpeta"""
+
+    # Mateix ordre de preferència que la lectura per força bruta
+    SEPARATORS = [';', ',', '\t']
+
+    # Encodings candidats per contingut sense BOM (latin-1 sempre descodifica)
+    ENCODINGS = ['utf-8', 'windows-1252', 'latin-1']
+    SINGLE_BYTE_ENCODINGS = ('windows-1252', 'latin-1')
+
+    BOMS = [
+        (codecs.BOM_UTF8, 'utf-8-sig'),
+        (codecs.BOM_UTF16_LE, 'utf-16'),
+        (codecs.BOM_UTF16_BE, 'utf-16'),
+    ]
+
+    # Bytes que es llegeixen del principi del fitxer
+    HEAD_SIZE = 64 * 1024
+
+    def __init__(self):
+        self._cache: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'cache_hits': 0, 'sniffed': 0, 'fallbacks': 0}
+
+    def get_cached(self, folder: str) -> Optional[Dict[str, str]]:
+        """
+        Retorna el dialecte cachejat d'una carpeta
+
+        Args:
+            folder: Carpeta de referència
+
+        Returns:
+            dict: {'encoding', 'sep'} o None si no n'hi ha
+        """
+        with self._lock:
+            dialect = self._cache.get(folder)
+            if dialect is not None:
+                self.stats['cache_hits'] += 1
+            return dialect
+
+    def remember(self, folder: str, dialect: Dict[str, str]) -> None:
+        """Guarda el dialecte validat d'una carpeta"""
+        with self._lock:
+            self._cache[folder] = dialect
+
+    def invalidate(self, folder: str = None) -> None:
+        """Invalida el dialecte d'una carpeta (o de totes si folder és None)"""
+        with self._lock:
+            if folder is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(folder, None)
+
+    def record_fallback(self) -> None:
+        """Comptabilitza una lectura que ha hagut de fer servir la força bruta"""
+        with self._lock:
+            self.stats['fallbacks'] += 1
+
+    def sniff(self, file_path: str) -> Optional[Dict[str, str]]:
+        """
+        Detecta encoding i separador a partir del principi del fitxer
+
+        Args:
+            file_path: Ruta del fitxer CSV
+
+        Returns:
+            dict: {'encoding', 'sep'} o None si no es pot determinar
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(self.HEAD_SIZE)
+        except OSError as e:
+            logger.debug(f"No es pot llegir el principi de {file_path}: {e}")
+            return None
+
+        return self.sniff_head(head)
+
+    def sniff_head(self, head: bytes) -> Optional[Dict[str, str]]:
+        """
+        Detecta encoding i separador a partir de bytes ja llegits
+
+        Args:
+            head: Principi del fitxer (els HEAD_SIZE primers bytes, o tot el contingut)
+
+        Returns:
+            dict: {'encoding', 'sep'} o None si no es pot determinar
+        """
+        head = head[:self.HEAD_SIZE]
+        if not head:
+            return None
+
+        with self._lock:
+            self.stats['sniffed'] += 1
+
+        text, encoding = self._decode_head(head)
+        if text is None:
+            return None
+
+        sep = self._detect_separator(text)
+        if sep is None:
+            return None
+
+        return {'encoding': encoding, 'sep': sep}
+
+    def _decode_head(self, head: bytes):
+        """Detecta el BOM o prova els encodings candidats sobre el principi del fitxer"""
+        for bom, encoding in self.BOMS:
+            if head.startswith(bom):
+                try:
+                    return head.decode(encoding, errors='ignore'), encoding
+                except LookupError:
+                    return None, None
+
+        for encoding in self.ENCODINGS:
+            try:
+                return head.decode(encoding), encoding
+            except UnicodeDecodeError as e:
+                # El tall del principi pot partir un caràcter multibyte al final
+                if encoding == 'utf-8' and e.start >= len(head) - 3:
+                    return head[:e.start].decode(encoding), encoding
+                continue
+
+        return None, None
+
+    def _detect_separator(self, text: str) -> Optional[str]:
+        """
+        Tria el primer separador present a la capçalera, igual que la lectura
+        per força bruta (que accepta el primer que dona més d'una columna)
+        """
+        header = next((line for line in text.splitlines() if line.strip()), None)
+        if header is None:
+            return None
+
+        for sep in self.SEPARATORS:
+            if sep in header:
+                return sep
+
+        return None
@@ -0,0 +1,156 @@
+"""
+Dataset Accumulator
+
+Acumulador de DataFrames per construir el dataset global del NetworkScanner
+sense el cost quadràtic de fer pd.concat a cada fitxer.
+
+Els DataFrames de cada fitxer es guarden en una llista i només es
+concatenen una vegada quan es demana el dataset complet. Opcionalment,
+quan s'arriba a un nombre de files, els blocs es bolquen a disc per
+mantenir la memòria acotada.
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+from typing import Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetAccumulator:
+    """Acumula DataFrames per blocs i els materialitza una sola vegada"""
+
+    def __init__(self, flush_rows: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        Inicialitza l'acumulador
+
+        Args:
+            flush_rows: Nombre de files en memòria a partir del qual es bolca
+                        un bloc a disc (None = tot en memòria)
+            spill_dir: Directori on guardar els blocs bolcats (per defecte un
+                       directori temporal que es crea quan cal)
+        """
+        self.flush_rows = flush_rows
+        self.spill_dir = spill_dir
+        self._owns_spill_dir = False
+        self._frames: List[pd.DataFrame] = []
+        self._frames_rows = 0
+        self._spilled_chunks: List[str] = []
+        self._spilled_rows = 0
+        self._materialized: Optional[pd.DataFrame] = None
+        self._columns: dict = {}
+
+    def append(self, df: pd.DataFrame) -> None:
+        """
+        Afegeix un DataFrame a l'acumulador
+
+        Args:
+            df: DataFrame d'un fitxer processat
+        """
+        if df is None or df.empty:
+            return
+
+        self._materialized = None
+        self._frames.append(df)
+        self._frames_rows += len(df)
+        self._columns.update(dict.fromkeys(df.columns))
+
+        if self.flush_rows and self._frames_rows >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """Bolca els DataFrames en memòria a un bloc en disc"""
+        if not self._frames:
+            return
+
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="global_dataset_")
+            self._owns_spill_dir = True
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        chunk = pd.concat(self._frames, ignore_index=True)
+        chunk_path = os.path.join(self.spill_dir, f"chunk_{len(self._spilled_chunks):06d}.pkl")
+        chunk.to_pickle(chunk_path)
+
+        self._spilled_chunks.append(chunk_path)
+        self._spilled_rows += len(chunk)
+        logger.debug(f"Bloc bolcat a disc: {chunk_path} ({len(chunk)} files)")
+
+        self._frames = []
+        self._frames_rows = 0
+
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Itera pels blocs acumulats sense materialitzar el dataset complet
+
+        Yields:
+            DataFrame: Cada bloc en disc i després el bloc en memòria
+        """
+        for chunk_path in self._spilled_chunks:
+            yield pd.read_pickle(chunk_path)
+
+        if self._frames:
+            if len(self._frames) > 1:
+                self._frames = [pd.concat(self._frames, ignore_index=True)]
+            yield self._frames[0]
+
+    def materialize(self) -> pd.DataFrame:
+        """
+        Retorna el dataset complet concatenant tots els blocs una sola vegada
+
+        Returns:
+            DataFrame: Dataset complet (buit si no hi ha dades)
+        """
+        if self._materialized is not None:
+            return self._materialized
+
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            self._materialized = pd.DataFrame()
+        elif len(chunks) == 1:
+            self._materialized = chunks[0]
+        else:
+            self._materialized = pd.concat(chunks, ignore_index=True)
+
+        return self._materialized
+
+    def clear(self) -> None:
+        """Buida l'acumulador i elimina els blocs en disc"""
+        for chunk_path in self._spilled_chunks:
+            try:
+                os.remove(chunk_path)
+            except OSError:
+                pass
+        if self._owns_spill_dir and self.spill_dir:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+            self._owns_spill_dir = False
+
+        self._frames = []
+        self._frames_rows = 0
+        self._spilled_chunks = []
+        self._spilled_rows = 0
+        self._materialized = None
+        self._columns = {}
+
+    @property
+    def columns(self) -> List[str]:
+        """Columnes del dataset (en ordre d'aparició) sense materialitzar-lo"""
+        return list(self._columns)
+
+    @property
+    def total_rows(self) -> int:
+        """Nombre total de files acumulades"""
+        return self._spilled_rows + self._frames_rows
+
+    @property
+    def num_chunks(self) -> int:
+        """Nombre de blocs (en disc + en memòria)"""
+        return len(self._spilled_chunks) + (1 if self._frames else 0)
+
+    def __len__(self) -> int:
+        return self.total_rows
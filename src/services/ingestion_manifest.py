@@ -0,0 +1,239 @@
+"""
+Ingestion Manifest Service
+
+Aquest servei manté un registre persistent dels fitxers CSV ja ingerits
+des del directori de xarxa, per evitar tornar a llegir i inserir fitxers
+que no han canviat des de l'última execució.
+
+Cada entrada es guarda per ruta amb la mida, el mtime i el hash del contingut.
+La comprovació ràpida es fa amb mida + mtime; el hash només es calcula quan
+aquests canvien, per distingir un fitxer modificat d'un simple 'touch'. La
+ingestió el calcula sobre els bytes que ja ha llegit per parsejar el fitxer
+(check_content), de manera que cada fitxer es llegeix un sol cop de la xarxa.
+
+La mida i el mtime es prenen abans de llegir el fitxer; en registrar-lo es
+torna a fer un stat i, si han canviat (p.ex. el fitxer encara s'estava
+escrivint), no es registra: el que s'ha llegit no es correspon amb el
+contingut actual i el fitxer s'ha de tornar a ingerir.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionManifest:
+    """Gestiona el manifest d'ingestió de fitxers CSV"""
+
+    # Estats possibles d'un fitxer respecte al manifest
+    STATUS_NEW = 'new'
+    STATUS_CHANGED = 'changed'
+    STATUS_UNCHANGED = 'unchanged'
+
+    DEFAULT_MANIFEST_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "ingestion_manifest.json"
+
+    # Mida del bloc de lectura per calcular el hash
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, manifest_path: str = None):
+        """
+        Inicialitza el manifest
+
+        Args:
+            manifest_path: Ruta del fitxer JSON del manifest (opcional)
+        """
+        self.manifest_path = Path(manifest_path) if manifest_path else self.DEFAULT_MANIFEST_PATH
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        """Carrega el manifest des del disc (si existeix)"""
+        try:
+            if self.manifest_path.exists():
+                with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.entries = data.get('files', {})
+                logger.info(f"Manifest d'ingestió carregat: {len(self.entries)} fitxers registrats")
+            else:
+                self.entries = {}
+        except Exception as e:
+            logger.warning(f"No es pot carregar el manifest d'ingestió ({self.manifest_path}): {e}")
+            self.entries = {}
+
+    def save(self) -> bool:
+        """
+        Guarda el manifest al disc de forma atòmica
+
+        Returns:
+            bool: True si s'ha guardat correctament
+        """
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.manifest_path.with_suffix('.tmp')
+            with self._lock:
+                data = {
+                    'updated_at': datetime.now().isoformat(),
+                    'files': self.entries
+                }
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+            logger.info(f"Manifest d'ingestió guardat: {len(self.entries)} fitxers")
+            return True
+        except Exception as e:
+            logger.error(f"Error guardant el manifest d'ingestió: {e}")
+            return False
+
+    def compute_hash(self, file_path: str) -> Optional[str]:
+        """
+        Calcula el hash SHA-1 del contingut d'un fitxer
+
+        Args:
+            file_path: Ruta del fitxer
+
+        Returns:
+            str: Hash hexadecimal o None si no es pot llegir
+        """
+        try:
+            digest = hashlib.sha1()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError as e:
+            logger.warning(f"No es pot calcular el hash de {file_path}: {e}")
+            return None
+
+    @staticmethod
+    def hash_content(content: bytes) -> str:
+        """Hash SHA-1 (el mateix que compute_hash) de contingut ja llegit"""
+        return hashlib.sha1(content).hexdigest()
+
+    def check_file(self, file_path: str, stat_result: os.stat_result = None,
+                   compare_content: bool = True) -> Dict:
+        """
+        Compara un fitxer amb la seva entrada al manifest
+
+        Args:
+            file_path: Ruta del fitxer
+            stat_result: Resultat d'os.stat ja obtingut (opcional, evita un stat extra)
+            compare_content: Si és False i la mida o el mtime han canviat, no es
+                             llegeix el fitxer per calcular el hash: es retorna
+                             'changed' i el contingut es compara després amb check_content
+
+        Returns:
+            dict: {'status': new|changed|unchanged, 'size', 'mtime', 'hash'}
+        """
+        stats = stat_result or os.stat(file_path)
+        size = stats.st_size
+        mtime = stats.st_mtime
+
+        with self._lock:
+            entry = self.entries.get(file_path)
+
+        if entry is None:
+            return {'status': self.STATUS_NEW, 'size': size, 'mtime': mtime, 'hash': None}
+
+        if entry.get('size') == size and entry.get('mtime') == mtime:
+            return {'status': self.STATUS_UNCHANGED, 'size': size, 'mtime': mtime, 'hash': entry.get('hash')}
+
+        # Mida o mtime diferents: cal comparar el contingut
+        check = {'status': self.STATUS_CHANGED, 'size': size, 'mtime': mtime, 'hash': None}
+        if not compare_content:
+            return check
+        return self._compare_hash(file_path, check, self.compute_hash(file_path))
+
+    def check_content(self, file_path: str, check: Dict, content: bytes) -> Dict:
+        """
+        Completa el resultat de check_file amb el hash dels bytes llegits
+
+        Un fitxer 'changed' amb el mateix contingut que l'entrada del manifest
+        només ha rebut un 'touch': passa a 'unchanged' i no s'ha de reingerir.
+
+        Args:
+            file_path: Ruta del fitxer
+            check: Resultat de check_file(..., compare_content=False)
+            content: Contingut complet del fitxer
+
+        Returns:
+            dict: {'status', 'size', 'mtime', 'hash'} amb el hash del contingut
+        """
+        file_hash = self.hash_content(content)
+        if check['status'] != self.STATUS_CHANGED:
+            return dict(check, hash=file_hash)
+        return self._compare_hash(file_path, check, file_hash)
+
+    def _compare_hash(self, file_path: str, check: Dict, file_hash: Optional[str]) -> Dict:
+        """Resol un fitxer amb mida o mtime diferents comparant el hash amb el del manifest"""
+        with self._lock:
+            entry = self.entries.get(file_path)
+            if entry is not None and file_hash is not None and file_hash == entry.get('hash'):
+                # Només ha canviat el mtime ('touch'), actualitzar l'entrada sense reingerir
+                entry['size'] = check['size']
+                entry['mtime'] = check['mtime']
+                return dict(check, status=self.STATUS_UNCHANGED, hash=file_hash)
+        return dict(check, hash=file_hash)
+
+    def record(self, file_path: str, size: int, mtime: float, file_hash: str = None, rows: int = 0) -> bool:
+        """
+        Registra (o actualitza) un fitxer com a ingerit
+
+        size i mtime són els valors del stat previ a la lectura (check_file). El
+        fitxer només es registra si encara els té després de calcular el hash;
+        si no, s'elimina del manifest perquè es torni a ingerir.
+
+        Args:
+            file_path: Ruta del fitxer
+            size: Mida en bytes
+            mtime: Data de modificació (timestamp)
+            file_hash: Hash del contingut (es calcula si no es proporciona)
+            rows: Nombre de files ingerides
+
+        Returns:
+            bool: True si s'ha registrat, False si el fitxer ha canviat des de la lectura
+        """
+        if file_hash is None:
+            file_hash = self.compute_hash(file_path)
+
+        try:
+            stats = os.stat(file_path)
+            unchanged = stats.st_size == size and stats.st_mtime == mtime
+        except OSError:
+            unchanged = False
+
+        if not unchanged:
+            logger.warning(f"{file_path} ha canviat des que es va llegir, no es registra al manifest")
+            self.forget(file_path)
+            return False
+
+        with self._lock:
+            self.entries[file_path] = {
+                'size': size,
+                'mtime': mtime,
+                'hash': file_hash,
+                'rows': rows,
+                'ingested_at': datetime.now().isoformat()
+            }
+        return True
+
+    def forget(self, file_path: str) -> None:
+        """Elimina un fitxer del manifest perquè es torni a ingerir"""
+        with self._lock:
+            self.entries.pop(file_path, None)
+
+    def reset(self) -> None:
+        """Buida el manifest (la propera execució ho ingerirà tot)"""
+        with self._lock:
+            self.entries = {}
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self.entries)
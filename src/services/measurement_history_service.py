@@ -3,8 +3,11 @@
 import logging
 import json
 import os
+import time
 from typing import List, Dict, Any, Optional
 from src.database.database_connection import PostgresConn
+from src.services.query_result_cache import measurement_query_cache, invalidate_measurement_cache
+from src.services.reference_alias_index import reference_alias_index
 
 logger = logging.getLogger(__name__)
 
@@ -171,6 +174,13 @@ ALL_TABLES = list(TABLE_COLUMN_MAPPING.keys())
 class MeasurementHistoryService:
     """Servei per obtenir l'historial de mesures de la base de dades"""
     
+    # Amb diverses taules, llegir les mesures d'un element amb una sola consulta
+    # UNION ALL (False = una consulta per taula, per comparar temps)
+    SINGLE_QUERY_FETCH = True
+    
+    # Resoldre les referències amb l'índex d'àlies (False = només variants fixes)
+    USE_REFERENCE_ALIASES = True
+    
     def __init__(self, machine: str = 'gompc_projectes'):
         """
         Inicialitza el servei amb la configuració de la base de dades
@@ -328,6 +338,102 @@ class MeasurementHistoryService:
         
         return (final_query, tuple(all_params))
     
+    def _cache_key(self, query_name: str, client: str, project_reference: str, lot: str = None) -> tuple:
+        """Clau del cache de resultats: consulta, màquina, client, referència i LOT"""
+        return (query_name, self.machine, client, project_reference, lot)
+    
+    @staticmethod
+    def refresh_cache() -> int:
+        """
+        Refresc manual: descarta tots els resultats cachejats
+        
+        Returns:
+            int: Nombre d'entrades eliminades
+        """
+        return invalidate_measurement_cache("refresc manual")
+    
+    @staticmethod
+    def get_cache_stats() -> Dict[str, Any]:
+        """Retorna els comptadors (hits, misses, evictions...) del cache de resultats"""
+        return measurement_query_cache.get_stats()
+    
+    @staticmethod
+    def _fallback_reference_variants(project_reference: str) -> List[str]:
+        """Variants fixes de la referència (majúscules i sufixos D/_D)"""
+        return [
+            project_reference,
+            f"{project_reference}D",
+            f"{project_reference}_D",
+            project_reference.upper(),
+            project_reference.lower()
+        ]
+    
+    def _reference_variants(self, project_reference: str) -> List[str]:
+        """
+        Valors de referència a consultar
+        
+        Primer es resol la referència amb l'índex d'àlies (una consulta al
+        diccionari); si no hi ha cap coincidència o l'índex no es pot
+        construir, s'utilitzen les variants fixes.
+        
+        Args:
+            project_reference: Referència escrita per l'usuari
+            
+        Returns:
+            Llista de valors per la condició IN de la columna de referència
+        """
+        resolved = self._resolve_reference_aliases(project_reference)
+        if resolved:
+            logger.debug(f"Referència '{project_reference}' resolta a {resolved}")
+            return resolved
+        return self._fallback_reference_variants(project_reference)
+    
+    def _resolve_reference_aliases(self, project_reference: str) -> List[str]:
+        """Valors canònics de l'índex d'àlies (buida si no es resol o està desactivat)"""
+        if not self.USE_REFERENCE_ALIASES:
+            return []
+        try:
+            reference_alias_index.ensure_built(self._fetch_reference_values)
+            return reference_alias_index.resolve(project_reference, self.table_keys)
+        except Exception as e:
+            logger.warning(f"No s'ha pogut resoldre la referència amb l'índex d'àlies: {e}")
+            self._reset_failed_transaction()
+            return []
+    
+    def _fetch_reference_values(self) -> List[tuple]:
+        """
+        Referències distintes de totes les taules de mesures per construir l'índex d'àlies
+        
+        Returns:
+            Llista de tuples (taula, referència)
+        """
+        references = []
+        failed_tables = 0
+        for table_key in ALL_TABLES:
+            mapping = self._get_table_mapping(table_key)
+            ref_col = mapping['columns']['id_referencia_client']
+            query = f"""
+                SELECT DISTINCT CAST({ref_col} AS text)
+                FROM {self.schema}.{mapping['table']}
+                WHERE {ref_col} IS NOT NULL
+            """
+            try:
+                results = self.db_connection.fetchall(query)
+                references.extend((table_key, row[0]) for row in results)
+            except Exception as e:
+                logger.warning(f"   ⚠️ Error llegint referències de {table_key}: {e}")
+                self._reset_failed_transaction()
+                failed_tables += 1
+        if failed_tables == len(ALL_TABLES):
+            # Sense cap taula llegida no es marca l'índex com a construït
+            raise RuntimeError("No s'ha pogut llegir cap taula de mesures")
+        return references
+    
+    @staticmethod
+    def _ref_in_clause(ref_col: str, ref_variants: List[str]) -> str:
+        """Condició IN per la columna de referència amb un paràmetre per valor"""
+        return f"{ref_col} IN ({', '.join(['%s'] * len(ref_variants))})"
+    
     def get_measurement_history(self, client: str, project_reference: str, limit: int = 10, batch_lot: str = None) -> List[Dict[str, Any]]:
         """
         Obté l'historial de mesures per un client i projecte
@@ -387,6 +493,10 @@ class MeasurementHistoryService:
         Obté mesures específiques per un element
         Utilitza el nou sistema de mapatge de columnes
         
+        Amb diverses taules (machine='all') es fa una única consulta UNION ALL
+        amb l'ordre global i el LIMIT aplicats al servidor. Si falla, es
+        consulta taula per taula.
+        
         Args:
             client: Nom del client
             project_reference: Referència del projecte  
@@ -397,7 +507,7 @@ class MeasurementHistoryService:
             limit: Límit de resultats
             
         Returns:
-            Llista de mesures per l'element especificat
+            Llista de mesures per l'element especificat (les més recents primer)
         """
         try:
             logger.info(f"🔍 [NEW SYSTEM] Obtenint mesures per element='{element_name}'")
@@ -406,92 +516,52 @@ class MeasurementHistoryService:
             if lot is None and batch_lot:
                 lot = batch_lot
             
-            # Variants de referència
-            ref_variants = [
-                project_reference,
-                f"{project_reference}D",
-                f"{project_reference}_D",
-                project_reference.upper(),
-                project_reference.lower()
-            ]
+            # Valors canònics de la referència (o variants si no es resol)
+            ref_variants = self._reference_variants(project_reference)
             
-            all_measurements = []
+            start_time = time.perf_counter()
+            all_measurements = None
             
-            for table_key in self.table_keys:
+            if self.SINGLE_QUERY_FETCH and len(self.table_keys) > 1:
                 try:
-                    mapping = self._get_table_mapping(table_key)
-                    table_name = f"{self.schema}.{mapping['table']}"
-                    
-                    # Columnes reals
-                    ref_col = mapping['columns']['id_referencia_client']
-                    lot_col = mapping['columns']['id_lot']
-                    element_col = mapping['columns']['element']
-                    actual_col = mapping['columns']['actual']
-                    nominal_col = mapping['columns']['nominal']
-                    tol_pos_col = mapping['columns']['tolerancia_positiva']
-                    tol_neg_col = mapping['columns']['tolerancia_negativa']
-                    desv_col = mapping['columns']['desviacio']
-                    data_col = mapping['columns']['data_hora']
-                    cavitat_col = mapping['columns']['cavitat'] if mapping['columns']['cavitat'] else 'NULL'
-                    
-                    # Query amb columnes normalitzades
-                    if lot:
-                        query = f"""
-                            SELECT 
-                                {ref_col} as id_referencia_client,
-                                {element_col} as element,
-                                {element_col} as pieza,
-                                {element_col} as datum,
-                                {element_col} as property,
-                                {actual_col} as actual,
-                                {nominal_col} as nominal,
-                                {tol_neg_col} as tolerancia_negativa,
-                                {tol_pos_col} as tolerancia_positiva,
-                                {desv_col} as desviacio,
-                                {data_col} as data_hora,
-                                {lot_col} as id_lot,
-                                {cavitat_col} as cavitat
-                            FROM {table_name}
-                            WHERE {ref_col} IN (%s, %s, %s, %s, %s)
-                            AND {element_col} = %s
-                            AND {lot_col} = %s
-                            ORDER BY {data_col} DESC
-                            LIMIT %s
-                        """
-                        params = tuple(ref_variants + [element_name, lot, limit])
-                    else:
-                        query = f"""
-                            SELECT 
-                                {ref_col} as id_referencia_client,
-                                {element_col} as element,
-                                {element_col} as pieza,
-                                {element_col} as datum,
-                                {element_col} as property,
-                                {actual_col} as actual,
-                                {nominal_col} as nominal,
-                                {tol_neg_col} as tolerancia_negativa,
-                                {tol_pos_col} as tolerancia_positiva,
-                                {desv_col} as desviacio,
-                                {data_col} as data_hora,
-                                {lot_col} as id_lot,
-                                {cavitat_col} as cavitat
-                            FROM {table_name}
-                            WHERE {ref_col} IN (%s, %s, %s, %s, %s)
-                            AND {element_col} = %s
-                            ORDER BY {data_col} DESC
-                            LIMIT %s
-                        """
-                        params = tuple(ref_variants + [element_name, limit])
-                    
-                    results = self.db_connection.fetchall(query, params)
-                    
-                    if results:
-                        logger.info(f"   ✅ {table_key}: {len(results)} mesures")
-                        all_measurements.extend(results)
-                        
+                    query, params = self._build_element_measurements_union(ref_variants, element_name, lot, limit)
+                    all_measurements = self.db_connection.fetchall(query, params)
+                    logger.info(f"   ⏱️ UNION ALL de {len(self.table_keys)} taules: {len(all_measurements)} mesures "
+                                f"en {(time.perf_counter() - start_time) * 1000:.0f} ms (1 consulta)")
                 except Exception as e:
-                    logger.warning(f"   ⚠️ Error en {table_key}: {e}")
-                    continue
+                    logger.warning(f"   ⚠️ Error en la consulta UNION ALL, es consulta taula per taula: {e}")
+                    self._reset_failed_transaction()
+                    all_measurements = None
+            
+            if all_measurements is None:
+                all_measurements = []
+                for table_key in self.table_keys:
+                    try:
+                        query, params = self._build_element_measurements_query(
+                            table_key, ref_variants, element_name, lot, limit
+                        )
+                        results = self.db_connection.fetchall(query, params)
+                        
+                        if results:
+                            logger.info(f"   ✅ {table_key}: {len(results)} mesures")
+                            all_measurements.extend(results)
+                            
+                    except Exception as e:
+                        logger.warning(f"   ⚠️ Error en {table_key}: {e}")
+                        self._reset_failed_transaction()
+                        continue
+                
+                if len(self.table_keys) > 1:
+                    # Mateix resultat que la consulta única: ordre global i LIMIT
+                    try:
+                        all_measurements.sort(key=lambda row: (row[10] is not None, row[10] or 0), reverse=True)
+                    except TypeError:
+                        # Tipus de data diferents entre taules: es manté l'ordre per taula
+                        pass
+                    all_measurements = all_measurements[:limit]
+                logger.info(f"   ⏱️ {len(self.table_keys)} taules: {len(all_measurements)} mesures "
+                            f"en {(time.perf_counter() - start_time) * 1000:.0f} ms "
+                            f"({len(self.table_keys)} consultes)")
             
             # Processar resultats
             measurements = []
@@ -519,6 +589,270 @@ class MeasurementHistoryService:
             logger.error(f"Error obtenint mesures de l'element: {e}")
             raise
     
+    def _build_element_measurements_query(self, table_key: str, ref_variants: List[str], element_name: str,
+                                          lot: str = None, limit: int = 100, normalize_types: bool = False) -> tuple:
+        """
+        Construeix la consulta de mesures d'un element per una taula
+        
+        Args:
+            table_key: Taula de TABLE_COLUMN_MAPPING
+            ref_variants: Valors de la referència (_reference_variants)
+            element_name: Element
+            lot: LOT (opcional)
+            limit: Límit de files
+            normalize_types: Convertir les columnes a tipus comuns (per UNION ALL)
+            
+        Returns:
+            Tuple (query, params)
+        """
+        mapping = self._get_table_mapping(table_key)
+        table_name = f"{self.schema}.{mapping['table']}"
+        
+        # Columnes reals
+        ref_col = mapping['columns']['id_referencia_client']
+        lot_col = mapping['columns']['id_lot']
+        element_col = mapping['columns']['element']
+        # Columnes no disponibles en aquesta taula (None al mapatge): NULL
+        actual_col = mapping['columns']['actual'] or 'NULL'
+        nominal_col = mapping['columns']['nominal'] or 'NULL'
+        tol_pos_col = mapping['columns']['tolerancia_positiva'] or 'NULL'
+        tol_neg_col = mapping['columns']['tolerancia_negativa'] or 'NULL'
+        desv_col = mapping['columns']['desviacio'] or 'NULL'
+        data_col = mapping['columns']['data_hora']
+        cavitat_col = mapping['columns']['cavitat'] if mapping['columns']['cavitat'] else 'NULL'
+        
+        if normalize_types:
+            # Les taules de cada màquina no comparteixen tipus de columna
+            def as_text(col):
+                return f"CAST({col} AS text)"
+            
+            def as_number(col):
+                return f"CAST({col} AS double precision)"
+            
+            data_select = f"CAST({data_col} AS timestamp)"
+        else:
+            def as_text(col):
+                return col
+            
+            as_number = as_text
+            data_select = data_col
+        
+        # Query amb columnes normalitzades
+        query = f"""
+                            SELECT 
+                                {as_text(ref_col)} as id_referencia_client,
+                                {as_text(element_col)} as element,
+                                {as_text(element_col)} as pieza,
+                                {as_text(element_col)} as datum,
+                                {as_text(element_col)} as property,
+                                {as_number(actual_col)} as actual,
+                                {as_number(nominal_col)} as nominal,
+                                {as_number(tol_neg_col)} as tolerancia_negativa,
+                                {as_number(tol_pos_col)} as tolerancia_positiva,
+                                {as_number(desv_col)} as desviacio,
+                                {data_select} as data_hora,
+                                {as_text(lot_col)} as id_lot,
+                                {as_text(cavitat_col)} as cavitat
+                            FROM {table_name}
+                            WHERE {self._ref_in_clause(ref_col, ref_variants)}
+                            AND {element_col} = %s
+                            {f"AND {lot_col} = %s" if lot else ""}
+                            ORDER BY {data_col} DESC
+                            LIMIT %s
+                        """
+        if lot:
+            params = tuple(ref_variants + [element_name, lot, limit])
+        else:
+            params = tuple(ref_variants + [element_name, limit])
+        return query, params
+    
+    def _build_element_measurements_union(self, ref_variants: List[str], element_name: str,
+                                          lot: str = None, limit: int = 100) -> tuple:
+        """
+        Construeix una única consulta UNION ALL de totes les taules de self.table_keys
+        
+        Cada branca manté el seu LIMIT (per aprofitar índexs) i l'ordre global
+        i el LIMIT final s'apliquen al servidor.
+        
+        Returns:
+            Tuple (query, params)
+        """
+        union_parts = []
+        all_params = []
+        for table_key in self.table_keys:
+            query, params = self._build_element_measurements_query(
+                table_key, ref_variants, element_name, lot, limit, normalize_types=True
+            )
+            union_parts.append(f"({query})")
+            all_params.extend(params)
+        
+        final_query = (f"SELECT * FROM ({' UNION ALL '.join(union_parts)}) AS combined "
+                       f"ORDER BY data_hora DESC NULLS LAST LIMIT %s")
+        all_params.append(limit)
+        return final_query, tuple(all_params)
+    
+    def get_lot_element_statistics(self, client: str, project_reference: str, lots: List[str],
+                                   elements: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Obté estadístiques agregades per (LOT, element) en una sola consulta
+        
+        L'agregació es fa al servidor (n, mitjana, desviació estàndard, mínim i
+        màxim de 'actual') sobre totes les taules de la màquina, de manera que
+        Cp/Cpk es poden calcular sense portar les mesures individuals.
+        
+        Args:
+            client: Nom del client
+            project_reference: Referència del projecte
+            lots: LOTs a consultar
+            elements: Elements a consultar (None = tots)
+            
+        Returns:
+            Llista de diccionaris amb id_lot, element, n, mean, stddev, min, max,
+            nominal, tolerancia_positiva i tolerancia_negativa
+        """
+        if not lots:
+            return []
+        
+        lots = sorted({str(lot) for lot in lots})
+        elements = sorted({str(element) for element in elements}) if elements else None
+        
+        cache_key = self._cache_key('lot_element_statistics', client, project_reference,
+                                    (tuple(lots), tuple(elements) if elements else None))
+        cached = measurement_query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        ref_variants = self._reference_variants(project_reference)
+        
+        start_time = time.perf_counter()
+        query, params = self._build_lot_element_statistics_query(ref_variants, lots, elements)
+        try:
+            results = self.db_connection.fetchall(query, params)
+        except Exception as e:
+            logger.error(f"Error obtenint estadístiques per LOT i element: {e}")
+            self._reset_failed_transaction()
+            raise
+        
+        def as_float(value):
+            return float(value) if value is not None else None
+        
+        statistics = []
+        for row in results:
+            statistics.append({
+                'id_lot': row[0],
+                'element': row[1],
+                'n': int(row[2]),
+                'mean': as_float(row[3]),
+                'stddev': as_float(row[4]),
+                'min': as_float(row[5]),
+                'max': as_float(row[6]),
+                'nominal': as_float(row[7]),
+                'tolerancia_positiva': as_float(row[8]),
+                'tolerancia_negativa': as_float(row[9])
+            })
+        
+        logger.info(f"Estadístiques de {len(statistics)} parelles (LOT, element) per {len(lots)} LOTs "
+                    f"en {(time.perf_counter() - start_time) * 1000:.0f} ms (1 consulta)")
+        measurement_query_cache.put(cache_key, statistics)
+        return statistics
+    
+    def _build_lot_element_statistics_query(self, ref_variants: List[str], lots: List[str],
+                                            elements: List[str] = None) -> tuple:
+        """
+        Construeix la consulta agregada per (LOT, element) de totes les taules
+        
+        Returns:
+            Tuple (query, params)
+        """
+        union_parts = []
+        all_params = []
+        for table_key in self.table_keys:
+            mapping = self._get_table_mapping(table_key)
+            table_name = f"{self.schema}.{mapping['table']}"
+            columns = mapping['columns']
+            
+            ref_col = columns['id_referencia_client']
+            lot_col = columns['id_lot']
+            element_col = columns['element']
+            
+            query = f"""
+                SELECT 
+                    CAST({lot_col} AS text) as id_lot,
+                    CAST({element_col} AS text) as element,
+                    CAST({columns['actual'] or 'NULL'} AS double precision) as actual,
+                    CAST({columns['nominal'] or 'NULL'} AS double precision) as nominal,
+                    CAST({columns['tolerancia_positiva'] or 'NULL'} AS double precision) as tolerancia_positiva,
+                    CAST({columns['tolerancia_negativa'] or 'NULL'} AS double precision) as tolerancia_negativa
+                FROM {table_name}
+                WHERE {self._ref_in_clause(ref_col, ref_variants)}
+                AND CAST({lot_col} AS text) = ANY(%s)
+                {f"AND CAST({element_col} AS text) = ANY(%s)" if elements else ""}
+            """
+            union_parts.append(f"({query})")
+            all_params.extend(ref_variants)
+            all_params.append(list(lots))
+            if elements:
+                all_params.append(list(elements))
+        
+        final_query = f"""
+            SELECT 
+                id_lot,
+                element,
+                COUNT(actual) as n,
+                AVG(actual) as mean,
+                STDDEV_SAMP(actual) as stddev,
+                MIN(actual) as min_value,
+                MAX(actual) as max_value,
+                MODE() WITHIN GROUP (ORDER BY nominal) as nominal,
+                MODE() WITHIN GROUP (ORDER BY tolerancia_positiva) as tolerancia_positiva,
+                MODE() WITHIN GROUP (ORDER BY tolerancia_negativa) as tolerancia_negativa
+            FROM ({' UNION ALL '.join(union_parts)}) AS combined
+            WHERE actual IS NOT NULL
+            GROUP BY id_lot, element
+            ORDER BY id_lot, element
+        """
+        return final_query, tuple(all_params)
+    
+    @staticmethod
+    def capability_from_statistics(statistics: Dict[str, Any]) -> Optional[Dict[str, float]]:
+        """
+        Calcula Cp i Cpk a partir d'unes estadístiques agregades
+        
+        Els límits són nominal + tolerancia_negativa i nominal + tolerancia_positiva.
+        
+        Args:
+            statistics: Element de get_lot_element_statistics()
+            
+        Returns:
+            dict amb cp i cpk, o None si no hi ha prou dades o toleràncies
+        """
+        nominal = statistics.get('nominal')
+        tol_pos = statistics.get('tolerancia_positiva')
+        tol_neg = statistics.get('tolerancia_negativa')
+        std = statistics.get('stddev')
+        mean = statistics.get('mean')
+        
+        if (statistics.get('n', 0) < 2 or not std or std <= 0 or mean is None
+                or nominal is None or tol_pos is None or tol_neg is None):
+            return None
+        
+        usl = nominal + tol_pos
+        lsl = nominal + tol_neg
+        if usl <= lsl:
+            return None
+        
+        cp = (usl - lsl) / (6 * std)
+        cpk = min((usl - mean) / (3 * std), (mean - lsl) / (3 * std))
+        return {'cp': cp, 'cpk': cpk}
+    
+    def _reset_failed_transaction(self):
+        """Desfà la transacció avortada perquè les consultes següents puguin continuar"""
+        try:
+            if self.db_connection and self.db_connection.connection:
+                self.db_connection.connection.rollback()
+        except Exception:
+            pass
+    
     def get_available_elements(self, client: str, project_reference: str, batch_lot: str = None, lot: str = None) -> List[Dict[str, Any]]:
         """
         Obté tots els elements disponibles per un client i projecte
@@ -542,7 +876,17 @@ class MeasurementHistoryService:
             if lot is None and batch_lot:
                 lot = batch_lot
             
+            cache_key = self._cache_key('available_elements', client, project_reference, lot)
+            cached = measurement_query_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"✅ Elements servits des del cache ({len(cached)})")
+                return cached
+            
             all_results = []
+            failed_tables = 0
+            
+            # Valors canònics de la referència (o variants si no es resol)
+            ref_variants = self._reference_variants(project_reference)
             
             for table_key in self.table_keys:
                 try:
@@ -557,15 +901,6 @@ class MeasurementHistoryService:
                     logger.info(f"   🔎 Consultant taula: {table_name}")
                     logger.info(f"      Columna referència: {ref_col}")
                     
-                    # Construir query amb variants de referència
-                    ref_variants = [
-                        project_reference,
-                        f"{project_reference}D",
-                        f"{project_reference}_D",
-                        project_reference.upper(),
-                        project_reference.lower()
-                    ]
-                    
                     # Query per obtenir elements distincts
                     if lot:
                         query = f"""
@@ -577,7 +912,7 @@ class MeasurementHistoryService:
                                 {ref_col} as id_referencia_client,
                                 COUNT(*) as count
                             FROM {table_name}
-                            WHERE {ref_col} IN (%s, %s, %s, %s, %s)
+                            WHERE {self._ref_in_clause(ref_col, ref_variants)}
                             AND {lot_col} = %s
                             GROUP BY {element_col}, {ref_col}
                             ORDER BY element
@@ -593,7 +928,7 @@ class MeasurementHistoryService:
                                 {ref_col} as id_referencia_client,
                                 COUNT(*) as count
                             FROM {table_name}
-                            WHERE {ref_col} IN (%s, %s, %s, %s, %s)
+                            WHERE {self._ref_in_clause(ref_col, ref_variants)}
                             GROUP BY {element_col}, {ref_col}
                             ORDER BY element
                         """
@@ -609,6 +944,7 @@ class MeasurementHistoryService:
                         
                 except Exception as e:
                     logger.warning(f"   ⚠️ Error consultant {table_key}: {e}")
+                    failed_tables += 1
                     continue
             
             # Processar resultats
@@ -632,6 +968,10 @@ class MeasurementHistoryService:
             
             batch_info = f" per LOT {lot}" if lot else ""
             logger.info(f"✅ Total: {len(elements)} elements únics{batch_info}")
+            
+            # Un resultat parcial (alguna taula ha fallat) no es cacheja
+            if not failed_tables:
+                measurement_query_cache.put(cache_key, elements)
             return elements
             
         except Exception as e:
@@ -654,16 +994,17 @@ class MeasurementHistoryService:
             logger.info(f"🔍 [NEW SYSTEM] Obtenint LOTs distints")
             logger.info(f"   Client: '{client}', Referència: '{project_reference}'")
             
+            cache_key = self._cache_key('distinct_lots', client, project_reference)
+            cached = measurement_query_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"✅ LOTs servits des del cache ({len(cached)})")
+                return cached
+            
             lots = set()
+            failed_tables = 0
             
-            # Variants de referència
-            ref_variants = [
-                project_reference,
-                f"{project_reference}D",
-                f"{project_reference}_D",
-                project_reference.upper(),
-                project_reference.lower()
-            ]
+            # Valors canònics de la referència (o variants si no es resol)
+            ref_variants = self._reference_variants(project_reference)
             
             for table_key in self.table_keys:
                 try:
@@ -676,7 +1017,7 @@ class MeasurementHistoryService:
                     query = f"""
                         SELECT DISTINCT {lot_col}
                         FROM {table_name}
-                        WHERE {ref_col} IN (%s, %s, %s, %s, %s)
+                        WHERE {self._ref_in_clause(ref_col, ref_variants)}
                         AND {lot_col} IS NOT NULL
                         AND {lot_col} != ''
                     """
@@ -691,10 +1032,14 @@ class MeasurementHistoryService:
                         
                 except Exception as e:
                     logger.warning(f"   ⚠️ Error en {table_key}: {e}")
+                    failed_tables += 1
                     continue
             
             lot_list = sorted(list(lots))
             logger.info(f"✅ Total: {len(lot_list)} LOTs distints")
+            
+            if not failed_tables:
+                measurement_query_cache.put(cache_key, lot_list)
             return lot_list
             
         except Exception as e:
@@ -705,6 +1050,10 @@ class MeasurementHistoryService:
         """
         Construeix condicions de cerca universals per qualsevol client i referència
         
+        Si l'índex d'àlies resol la referència, es retorna una única estratègia
+        d'igualtat amb els valors canònics; la cascada d'estratègies només
+        s'utilitza com a recanvi.
+        
         Args:
             client: Nom del client
             project_reference: Referència del projecte
@@ -713,6 +1062,16 @@ class MeasurementHistoryService:
             Llista d'estratègies de cerca amb condicions SQL i paràmetres
         """
         
+        resolved = self._resolve_reference_aliases(project_reference)
+        if resolved:
+            return [{
+                'name': f'Àlies: {project_reference[:15]}',
+                'client_condition': 'UPPER(TRIM(client)) = UPPER(TRIM(%s))',
+                'ref_condition': 'CAST(id_referencia_client AS TEXT) = ANY(%s)',
+                'params': [client, resolved],
+                'priority': 0
+            }]
+        
         # Generar variants de referència universals
         ref_variants = [
             project_reference,  # Original
@@ -922,6 +1281,11 @@ class MeasurementHistoryService:
             Llista de diccionaris amb els lots disponibles
         """
         try:
+            cache_key = self._cache_key('available_lots', client, project_reference)
+            cached = measurement_query_cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             query_template = """
                 SELECT DISTINCT id_lot, COUNT(*) as count, 
                        MIN(data_hora) as first_measurement, 
@@ -947,6 +1311,7 @@ class MeasurementHistoryService:
                 })
             
             logger.info(f"Trobats {len(lots)} lots disponibles per {client} - {project_reference}")
+            measurement_query_cache.put(cache_key, lots)
             return lots
             
         except Exception as e:
@@ -0,0 +1,310 @@
+"""
+Measurement Lake
+
+Emmagatzematge local de les mesures ingerides en fitxers Parquet particionats
+per CLIENT / REFERENCIA / LOT (estructura tipus Hive):
+
+    <root>/CLIENT=AUTOLIV/REFERENCIA=665220400/LOT=LOT0001/part-LOT0001_2023_01_01_10_00_00-1a2b3c4d.parquet
+
+Cada fitxer CSV d'origen (identificat pel nom del fitxer, columna FITXER)
+genera un fitxer Parquet, de manera que tornar a ingerir un CSV modificat en
+substitueix només el seu fitxer i els CSV nous s'afegeixen com a fitxers o
+particions noves. Sense la columna FITXER s'identifica pel DATA_HORA, i les
+files sense cap identificador es guarden amb un hash del contingut (mai
+sobreescriuen un altre fitxer). El lector només obre les particions demanades.
+
+Requereix pyarrow (opcional).
+"""
+
+import os
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logger.warning("pyarrow no disponible. El lake Parquet de mesures no es podrà utilitzar.")
+
+DEFAULT_LAKE_PATH = Path(__file__).parent.parent.parent / "data" / "lake" / "mesures"
+
+
+class MeasurementLake:
+    """Lake Parquet de mesures particionat per CLIENT / REFERENCIA / LOT"""
+
+    PARTITION_COLUMNS = ['CLIENT', 'REFERENCIA', 'LOT']
+
+    # Columna amb el nom del fitxer CSV d'origen (identificador preferent)
+    SOURCE_FILE_COLUMN = 'FITXER'
+
+    # Data i hora del fitxer CSV d'origen (identificador si no hi ha FITXER)
+    SOURCE_COLUMN = 'DATA_HORA'
+
+    # Format de nom dels fitxers identificats per DATA_HORA
+    TIMESTAMP_TOKEN_FORMAT = '%Y%m%dT%H%M%S'
+
+    # Valor de partició per a claus nul·les (mateix conveni que Hive)
+    NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+    def __init__(self, root_path: str = None, compression: str = 'zstd'):
+        """
+        Inicialitza el lake
+
+        Args:
+            root_path: Directori arrel del lake (per defecte data/lake/mesures)
+            compression: Compressió Parquet ('zstd', 'snappy', 'gzip'...)
+        """
+        self.root_path = Path(root_path) if root_path else DEFAULT_LAKE_PATH
+        self.compression = compression
+
+    def write(self, df: pd.DataFrame) -> Dict:
+        """
+        Escriu (o substitueix) les particions d'un DataFrame
+
+        Args:
+            df: Dades amb les columnes CLIENT, REFERENCIA, LOT i FITXER o DATA_HORA
+
+        Returns:
+            dict: Resum amb partitions_written, files_written i rows_written
+        """
+        if not PYARROW_AVAILABLE:
+            return {
+                'success': False,
+                'error': "pyarrow no està instal·lat",
+                'rows_written': 0
+            }
+
+        missing = [col for col in self.PARTITION_COLUMNS if col not in df.columns]
+        if missing:
+            return {
+                'success': False,
+                'error': f"Falten columnes de partició: {missing}",
+                'rows_written': 0
+            }
+
+        if df.empty:
+            return {'success': True, 'partitions_written': 0, 'files_written': 0, 'rows_written': 0}
+
+        try:
+            # Els identificadors es calculen abans de convertir DATA_HORA (NaT no identifica res)
+            tokens = self._source_tokens(df).rename('__source_token')
+            by_file = self.SOURCE_FILE_COLUMN in df.columns
+            df = self._normalize_types(df)
+
+            partitions = set()
+            files_written = 0
+            for keys, part in df.groupby([*self.PARTITION_COLUMNS, tokens], sort=False, dropna=False):
+                partition_keys = keys[:len(self.PARTITION_COLUMNS)]
+                token = keys[len(self.PARTITION_COLUMNS)]
+                part = part.reset_index(drop=True)
+                if token is None or pd.isna(token):
+                    token = self._content_token(part)
+
+                partition_dir = self._partition_path(partition_keys)
+                partition_dir.mkdir(parents=True, exist_ok=True)
+                file_path = partition_dir / f"part-{token}.parquet"
+
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                tmp_path = file_path.with_suffix('.parquet.tmp')
+                pq.write_table(table, tmp_path, compression=self.compression)
+                os.replace(tmp_path, file_path)
+
+                if by_file:
+                    self._remove_timestamp_part(partition_dir, part)
+
+                partitions.add(partition_dir)
+                files_written += 1
+
+            logger.info(f"Lake de mesures: {len(df)} files escrites a {len(partitions)} particions "
+                        f"({files_written} fitxers)")
+            return {
+                'success': True,
+                'partitions_written': len(partitions),
+                'files_written': files_written,
+                'rows_written': len(df)
+            }
+
+        except Exception as e:
+            logger.error(f"Error escrivint al lake de mesures: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'rows_written': 0
+            }
+
+    def list_partitions(self, clients: Union[str, Iterable[str]] = None,
+                        references: Union[str, Iterable[str]] = None,
+                        lots: Union[str, Iterable[str]] = None) -> List[Dict]:
+        """
+        Llista les particions existents que compleixen els filtres
+
+        Args:
+            clients: Client o clients (None = tots)
+            references: Referència o referències (None = totes)
+            lots: LOT o LOTs (None = tots)
+
+        Returns:
+            list: Diccionaris amb CLIENT, REFERENCIA, LOT i path
+        """
+        filters = [self._as_filter(clients), self._as_filter(references), self._as_filter(lots)]
+        partitions = []
+
+        def walk(directory: Path, level: int, values: List[str]):
+            column = self.PARTITION_COLUMNS[level]
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                return
+            for entry in entries:
+                if not entry.is_dir() or not entry.name.startswith(f"{column}="):
+                    continue
+                value = self._decode_value(entry.name[len(column) + 1:])
+                if filters[level] is not None and value not in filters[level]:
+                    continue
+                if level + 1 < len(self.PARTITION_COLUMNS):
+                    walk(Path(entry.path), level + 1, values + [value])
+                else:
+                    partition = dict(zip(self.PARTITION_COLUMNS, values + [value]))
+                    partition['path'] = entry.path
+                    partitions.append(partition)
+
+        walk(self.root_path, 0, [])
+        return partitions
+
+    def iter_partitions(self, clients: Union[str, Iterable[str]] = None,
+                        references: Union[str, Iterable[str]] = None,
+                        lots: Union[str, Iterable[str]] = None,
+                        columns: List[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Llegeix les particions una a una (memòria acotada a una partició)
+
+        Yields:
+            DataFrame: Dades de cada partició
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow no està instal·lat")
+
+        for partition in self.list_partitions(clients, references, lots):
+            files = sorted(Path(partition['path']).glob("*.parquet"))
+            frames = [pq.read_table(file_path, columns=columns).to_pandas() for file_path in files]
+            if frames:
+                yield pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    def read(self, clients: Union[str, Iterable[str]] = None,
+             references: Union[str, Iterable[str]] = None,
+             lots: Union[str, Iterable[str]] = None,
+             columns: List[str] = None) -> pd.DataFrame:
+        """
+        Llegeix només les particions demanades
+
+        Args:
+            clients: Client o clients (None = tots)
+            references: Referència o referències (None = totes)
+            lots: LOT o LOTs (None = tots)
+            columns: Columnes a llegir (None = totes)
+
+        Returns:
+            DataFrame: Dades de les particions seleccionades
+        """
+        frames = list(self.iter_partitions(clients, references, lots, columns))
+        if not frames:
+            return pd.DataFrame(columns=columns or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def _normalize_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Tipus consistents per Parquet: DATA_HORA com a data i text com a string"""
+        df = df.copy()
+        if self.SOURCE_COLUMN in df.columns:
+            df[self.SOURCE_COLUMN] = pd.to_datetime(df[self.SOURCE_COLUMN], errors='coerce')
+        for col in df.columns:
+            if col != self.SOURCE_COLUMN and df[col].dtype == object:
+                # Columnes amb tipus barrejats: es guarden com a text
+                df[col] = df[col].astype('string')
+        return df
+
+    def _partition_path(self, keys) -> Path:
+        """Ruta de la partició per als valors de CLIENT, REFERENCIA i LOT"""
+        path = self.root_path
+        for column, value in zip(self.PARTITION_COLUMNS, keys):
+            path = path / f"{column}={self._encode_value(value)}"
+        return path
+
+    def _encode_value(self, value) -> str:
+        if value is None or pd.isna(value):
+            return self.NULL_PARTITION
+        return quote(str(value), safe=' -_.')
+
+    def _decode_value(self, encoded: str) -> Optional[str]:
+        if encoded == self.NULL_PARTITION:
+            return None
+        return unquote(encoded)
+
+    def _source_tokens(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Nom de fitxer estable per al CSV d'origen de cada fila (None si no n'hi ha)
+
+        S'usa el nom del fitxer (FITXER) sense extensió més un hash curt del
+        nom exacte (en un disc que no distingeix majúscules, LOT1_... i lot1_...
+        serien el mateix fitxer); si no hi és, el DATA_HORA (com a marca de
+        temps si és vàlid, o el text original).
+        """
+        if self.SOURCE_FILE_COLUMN in df.columns:
+            def file_token(value):
+                if pd.isna(value):
+                    return None
+                name = os.path.basename(str(value))
+                digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+                return f"{quote(os.path.splitext(name)[0], safe='-_.')}-{digest}"
+            return df[self.SOURCE_FILE_COLUMN].map(file_token)
+
+        if self.SOURCE_COLUMN not in df.columns:
+            return pd.Series(None, index=df.index, dtype=object)
+
+        raw = df[self.SOURCE_COLUMN]
+        parsed = pd.to_datetime(raw, errors='coerce')
+        tokens = raw.map(lambda value: None if pd.isna(value) else quote(str(value), safe='-_.')).astype(object)
+        valid = parsed.notna()
+        tokens[valid] = parsed[valid].dt.strftime(self.TIMESTAMP_TOKEN_FORMAT)
+        return tokens
+
+    @staticmethod
+    def _content_token(part: pd.DataFrame) -> str:
+        """Nom de fitxer per a files sense identificador d'origen: hash del contingut"""
+        digest = hashlib.sha1(pd.util.hash_pandas_object(part, index=False).values.tobytes())
+        return f"nosource-{digest.hexdigest()[:16]}"
+
+    def _remove_timestamp_part(self, partition_dir: Path, part: pd.DataFrame) -> None:
+        """
+        Elimina el fitxer del mateix CSV escrit abans amb el nom per DATA_HORA
+
+        Els fitxers antics del lake es deien pel DATA_HORA; si no s'eliminen,
+        les files del CSV quedarien duplicades amb el fitxer nou per FITXER.
+        """
+        if self.SOURCE_COLUMN not in part.columns:
+            return
+        source = part[self.SOURCE_COLUMN].dropna()
+        if source.empty:
+            return
+        legacy_path = partition_dir / f"part-{source.iloc[0].strftime(self.TIMESTAMP_TOKEN_FORMAT)}.parquet"
+        try:
+            legacy_path.unlink()
+            logger.info(f"Fitxer del lake amb nom per DATA_HORA substituït: {legacy_path.name}")
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _as_filter(values) -> Optional[set]:
+        if values is None:
+            return None
+        if isinstance(values, str):
+            return {values}
+        return {str(value) for value in values}
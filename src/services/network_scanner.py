@@ -6,19 +6,93 @@ carpetes de clients i projectes disponibles.
 
 Versió 2.1: Escaneig bàsic + processament de fitxers CSV + inserció a BBDD
 """
+import io
 import os
+import stat
+import time
 import logging
 import pandas as pd
 import re
 import json
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator
 from datetime import datetime
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
 
 from .value_cleaner import ValueCleaner
+from .ingestion_manifest import IngestionManifest
+from .dataset_accumulator import DatasetAccumulator
+from .csv_dialect_sniffer import CsvDialectSniffer
+from .scan_tree_cache import ScanTreeCache
+from .query_result_cache import invalidate_measurement_cache
 
 logger = logging.getLogger(__name__)
 
+def clean_csv_dataframe(df: pd.DataFrame, file_name: str) -> pd.DataFrame:
+    """
+    Neteja un DataFrame llegit d'un CSV GOMPC (columnes i valors problemàtics)
+    
+    És una funció de mòdul perquè es pugui executar en un pool de processos.
+    
+    Args:
+        df: DataFrame llegit del CSV
+        file_name: Nom del fitxer (per al log)
+        
+    Returns:
+        DataFrame net
+    """
+    # Netejar columnes problemàtiques
+    # Si hi ha columna "Out,Alignment", dividir-la
+    if 'Out,Alignment' in df.columns:
+        # Intentar dividir la columna combinada
+        out_alignment = df['Out,Alignment'].astype(str)
+        df['Out'] = out_alignment
+        df['Alignment'] = out_alignment
+        df = df.drop(columns=['Out,Alignment'])
+    
+    # Eliminar columnes duplicades si existeixen
+    df = df.loc[:, ~df.columns.duplicated()]
+    
+    # NETEJAT DE VALORS PROBLEMÀTICS
+    # Detectar columnes que poden contenir valors problemàtics
+    possible_columns = {
+        'element': ['Element', 'element', 'ELEMENT', 'Feature', 'feature', 'FEATURE', 'Mesura', 'mesura'],
+        'actual': ['Actual', 'actual', 'ACTUAL', 'Value', 'value', 'VALUE', 'Valor', 'valor'],
+        'nominal': ['Nominal', 'nominal', 'NOMINAL', 'Target', 'target', 'TARGET'],
+        'tolerance': ['Tolerance', 'tolerance', 'TOLERANCE', 'Tol', 'tol', 'TOL']
+    }
+    
+    # Trobar les columnes corresponents
+    detected_columns = {}
+    for col_type, possible_names in possible_columns.items():
+        for possible_name in possible_names:
+            if possible_name in df.columns:
+                detected_columns[col_type] = possible_name
+                break
+    
+    # Aplicar netejat si trobem columnes
+    if detected_columns:
+        logger.info(f"Netejant valors problemàtics en: {detected_columns}")
+        
+        # Netejar DataFrame (els problemes d'abans i després surten del mateix pas)
+        df, problems_before, problems_after = ValueCleaner.clean_dataframe_with_report(
+            df,
+            element_col=detected_columns.get('element'),
+            actual_col=detected_columns.get('actual'),
+            nominal_col=detected_columns.get('nominal'),
+            tolerance_col=detected_columns.get('tolerance')
+        )
+        
+        # Log del resultat
+        logger.info(f"Netejat completat per {file_name}:")
+        logger.info(f"  Patrons plantilla: {problems_before['template_patterns']} -> {problems_after['template_patterns']}")
+        logger.info(f"  Patrons invàlids: {problems_before['invalid_patterns']} -> {problems_after['invalid_patterns']}")
+        logger.info(f"  Problemes decimals: {problems_before['decimal_issues']} -> {problems_after['decimal_issues']}")
+    
+    return df
+
+
 class NetworkScanner:
     """Gestiona l'escaneig de directoris de xarxa per trobar projectes"""
     
@@ -34,24 +108,75 @@ class NetworkScanner:
     # Client amb estructura ultra-especial de 3 nivells
     PTCOVER_CLIENT = 'PTCOVER'
     
-    def __init__(self, network_path: str = None):
+    # Fils de lectura concurrent de CSV (la lectura està dominada per la latència SMB)
+    DEFAULT_READ_WORKERS = 8
+    
+    # Taules destí vàlides per a la inserció de mesures
+    TARGET_TABLES = ['mesures_gompcnou', 'mesures_gompc_projecets', 'mesureshoytom', 'mesurestoriso']
+    
+    # Ingestió en streaming: files per lot d'escriptura i lots pendents d'escriure alhora
+    DEFAULT_STREAM_BATCH_ROWS = 50000
+    DEFAULT_STREAM_PENDING_BATCHES = 2
+    
+    def __init__(self, network_path: str = None, manifest_path: str = None,
+                 flush_rows: int = None, spill_dir: str = None,
+                 read_workers: int = None, clean_processes: int = 0,
+                 scan_cache_path: str = None, scan_cache_ttl: float = None):
         """
         Inicialitza el scanner de xarxa
         
         Args:
             network_path: Ruta de xarxa personalitzada (opcional)
+            manifest_path: Ruta del manifest d'ingestió incremental (opcional)
+            flush_rows: Files en memòria a partir de les quals el dataset global
+                        es bolca a disc per blocs (opcional, None = tot en memòria)
+            spill_dir: Directori per als blocs bolcats a disc (opcional)
+            read_workers: Fils per llegir CSV en paral·lel (per defecte DEFAULT_READ_WORKERS, 1 = sèrie)
+            clean_processes: Processos per al netejat amb ValueCleaner (0 = al mateix fil de lectura)
+            scan_cache_path: Ruta del cache persistent de l'arbre de carpetes
+                             (opcional, None = cache només en memòria)
+            scan_cache_ttl: Segons de vida dels llistats cachejats (opcional)
         """
         self.network_path = network_path or self.DEFAULT_NETWORK_PATH
+        self.read_workers = max(1, read_workers if read_workers is not None else self.DEFAULT_READ_WORKERS)
+        self.clean_processes = max(0, clean_processes)
+        self.csv_sniffer = CsvDialectSniffer()  # Dialecte CSV detectat per carpeta de referència
         self.last_scan_results = {}
+        self.scan_cache = ScanTreeCache(scan_cache_path, scan_cache_ttl)  # Llistats de carpetes revalidats per mtime
+        self.flush_rows = flush_rows
+        self.spill_dir = spill_dir
         self.global_dataset = pd.DataFrame()  # Dataset global per tots els CSV
         
+        # Manifest d'ingestió (es carrega només quan s'utilitza el mode incremental)
+        self.manifest_path = manifest_path
+        self.ingestion_manifest = None
+        self._pending_manifest_entries = []
+        
         
         # Inicialitzar processador específic per PTCOVER
         
-    def scan_main_directory(self) -> Dict:
+    @property
+    def global_dataset(self) -> pd.DataFrame:
+        """Dataset global amb tots els CSV processats (es materialitza una sola vegada)"""
+        return self._dataset_accumulator.materialize()
+    
+    @global_dataset.setter
+    def global_dataset(self, df: pd.DataFrame) -> None:
+        accumulator = getattr(self, '_dataset_accumulator', None)
+        if accumulator is not None:
+            accumulator.clear()
+        self._dataset_accumulator = DatasetAccumulator(self.flush_rows, self.spill_dir)
+        if df is not None and not df.empty:
+            self._dataset_accumulator.append(df)
+    
+    def scan_main_directory(self, include_sizes: bool = False) -> Dict:
         """
         Escaneja el directori principal i retorna informació sobre les carpetes trobades
         
+        Args:
+            include_sizes: Si és True, calcula la mida de cada carpeta (stat de tots
+                           els fitxers fills; costós sobre la xarxa)
+        
         Returns:
             dict: Informació sobre l'escaneig amb carpetes trobades
         """
@@ -66,18 +191,7 @@ class NetworkScanner:
                 }
             
             # Llegir contingut del directori
-            folders = []
-            files = []
-            
-            for item in os.listdir(self.network_path):
-                item_path = os.path.join(self.network_path, item)
-                
-                if os.path.isdir(item_path):
-                    folder_info = self._get_folder_info(item_path, item)
-                    folders.append(folder_info)
-                else:
-                    file_info = self._get_file_info(item_path, item)
-                    files.append(file_info)
+            folders, files = self._scan_directory(self.network_path, include_sizes)
             
             # Ordenar carpetes per nom
             folders.sort(key=lambda x: x['name'])
@@ -116,12 +230,13 @@ class NetworkScanner:
                 'accessible': False
             }
     
-    def scan_client_folder(self, client_name: str) -> Dict:
+    def scan_client_folder(self, client_name: str, include_sizes: bool = False) -> Dict:
         """
         Escaneja una carpeta específica de client
         
         Args:
             client_name: Nom de la carpeta del client
+            include_sizes: Si és True, calcula la mida de cada subcarpeta
             
         Returns:
             dict: Informació detallada sobre la carpeta del client
@@ -129,14 +244,19 @@ class NetworkScanner:
         try:
             client_path = os.path.join(self.network_path, client_name)
             
-            if not os.path.exists(client_path):
+            try:
+                client_stats = os.stat(client_path)
+            except FileNotFoundError:
+                client_stats = None
+            
+            if client_stats is None:
                 return {
                     'success': False,
                     'error': f"Carpeta del client no trobada: {client_name}",
                     'client_name': client_name
                 }
             
-            if not os.path.isdir(client_path):
+            if not stat.S_ISDIR(client_stats.st_mode):
                 return {
                     'success': False,
                     'error': f"{client_name} no és una carpeta",
@@ -146,18 +266,7 @@ class NetworkScanner:
             logger.info(f"Escanejant carpeta del client: {client_name}")
             
             # Escanejar contingut de la carpeta del client
-            subfolders = []
-            files = []
-            
-            for item in os.listdir(client_path):
-                item_path = os.path.join(client_path, item)
-                
-                if os.path.isdir(item_path):
-                    subfolder_info = self._get_folder_info(item_path, item)
-                    subfolders.append(subfolder_info)
-                else:
-                    file_info = self._get_file_info(item_path, item)
-                    files.append(file_info)
+            subfolders, files = self._scan_directory(client_path, include_sizes, client_stats)
             
             # Ordenar per nom
             subfolders.sort(key=lambda x: x['name'])
@@ -220,10 +329,16 @@ class NetworkScanner:
         return [folder['name'] for folder in client_scan['subfolders']
                 if self._is_project_folder(folder['name'])]
     
-    def scan_all_clients_and_references(self) -> Dict:
+    def scan_all_clients_and_references(self, include_sizes: bool = False) -> Dict:
         """
         Escaneja tots els clients i les seves referències
         
+        Les carpetes de client s'escanegen en paral·lel (read_workers fils) i
+        la mida de les carpetes només es calcula si es demana.
+        
+        Args:
+            include_sizes: Si és True, calcula la mida de cada referència
+        
         Returns:
             dict: Estructura completa amb clients i referències_client
         """
@@ -251,15 +366,18 @@ class NetworkScanner:
             
             logger.info(f"Processant {len(client_folders)} clients")
             
-            # Per cada client, escanejar les seves referències
-            for client_folder in client_folders:
-                client_name = client_folder['name']
+            # Escanejar les carpetes de client en paral·lel (l'ordre del resultat es manté)
+            client_names = [client_folder['name'] for client_folder in client_folders]
+            with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="client_scan") as executor:
+                client_scans = list(executor.map(
+                    lambda name: self.scan_client_folder(name, include_sizes=include_sizes), client_names
+                ))
+            
+            # Per cada client, recollir les seves referències
+            for client_name, client_scan in zip(client_names, client_scans):
                 logger.info(f"Escanejant client: {client_name}")
                 
                 try:
-                    # Escanejar carpeta del client
-                    client_scan = self.scan_client_folder(client_name)
-                    
                     if client_scan['success']:
                         # Obtenir les subcarpetes (referències_client)
                         references = []
@@ -270,7 +388,7 @@ class NetworkScanner:
                                 'path': subfolder['path'],
                                 'accessible': subfolder.get('accessible', True),
                                 'modified_time': subfolder.get('modified_time', ''),
-                                'size': subfolder.get('size', 0)
+                                'size': subfolder.get('size')
                             })
                         
                         clients_structure[client_name] = {
@@ -313,7 +431,9 @@ class NetworkScanner:
                 'clients': clients_structure
             }
             
-            logger.info(f"Escaneig complet finalitzat: {len(clients_structure)} clients, {total_references} referències")
+            self.scan_cache.save()
+            logger.info(f"Escaneig complet finalitzat: {len(clients_structure)} clients, {total_references} referències "
+                        f"(cache: {self.scan_cache.stats['hits']} encerts, {self.scan_cache.stats['misses']} carpetes rellistades)")
             return result
             
         except Exception as e:
@@ -370,24 +490,123 @@ class NetworkScanner:
         except Exception:
             return False
     
-    def _get_folder_info(self, folder_path: str, folder_name: str) -> Dict:
+    def invalidate_scan_cache(self, path: str = None) -> int:
+        """
+        Invalida el cache de l'arbre de carpetes
+        
+        Args:
+            path: Carpeta a invalidar amb totes les seves descendents (None = tot el cache)
+            
+        Returns:
+            int: Nombre de carpetes invalidades
+        """
+        removed = self.scan_cache.invalidate(path)
+        self.scan_cache.save()
+        logger.info(f"Cache d'escaneig invalidat ({path or 'tot'}): {removed} carpetes")
+        return removed
+    
+    def list_csv_files(self, reference_path: str) -> List[str]:
+        """
+        Llista els fitxers CSV d'una carpeta de referència (ordenats per nom)
+        
+        Args:
+            reference_path: Carpeta de la referència
+            
+        Returns:
+            list: Noms dels fitxers CSV
+        """
+        return [name for name, _ in self._list_csv_entries(reference_path)]
+    
+    def _list_csv_entries(self, reference_path: str) -> List[Tuple[str, Optional[os.DirEntry]]]:
+        """
+        Fitxers CSV d'una carpeta de referència amb el seu DirEntry, si es té
+        
+        Si la carpeta no ha canviat (mateix mtime) es retornen els noms del
+        cache sense tornar-la a recórrer, i el DirEntry és None. Si s'ha de
+        tornar a llistar, el DirEntry d'os.scandir porta el stat del fitxer
+        (gratuït a Windows) per al manifest d'ingestió.
+        
+        Args:
+            reference_path: Carpeta de la referència
+            
+        Returns:
+            list: (nom, DirEntry o None) ordenats per nom
+        """
+        dir_stat = os.stat(reference_path)
+        cached = self.scan_cache.get(reference_path, dir_stat.st_mtime_ns)
+        if cached is not None:
+            csv_files = [(name, None) for name in cached[1]]
+        else:
+            csv_files = [(entry.name, entry) for entry in self._scandir_entries(reference_path, dir_stat)[1]]
+        return sorted((item for item in csv_files if item[0].lower().endswith('.csv')), key=lambda item: item[0])
+    
+    def _scandir_entries(self, directory: str,
+                         dir_stat: os.stat_result) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+        """Llista un directori amb os.scandir i en guarda els noms al cache"""
+        listed_at = time.time()
+        folders = []
+        files = []
+        
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                (folders if is_dir else files).append(entry)
+        
+        self.scan_cache.put(directory, dir_stat.st_mtime_ns,
+                            [entry.name for entry in folders], [entry.name for entry in files], listed_at)
+        return folders, files
+    
+    def _scan_directory(self, directory: str, include_sizes: bool = False,
+                        dir_stat: os.stat_result = None) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Llista un directori amb os.scandir reutilitzant la informació de cada DirEntry
+        
+        Sempre es torna a llistar: el cache només té els noms i reconstruir la
+        mida i l'mtime dels fills costaria un stat per element (una anada i
+        tornada a la xarxa cadascun), mentre que l'scandir els porta tots en
+        una sola lectura del directori. El llistat refresca els noms del cache
+        (list_csv_files).
+        
+        Args:
+            directory: Directori a llistar
+            include_sizes: Si és True, calcula la mida de cada subcarpeta
+            dir_stat: stat del directori, si ja es té (opcional)
+            
+        Returns:
+            tuple: (carpetes, fitxers) amb la informació de cada element
+        """
+        if dir_stat is None:
+            dir_stat = os.stat(directory)
+        
+        folder_entries, file_entries = self._scandir_entries(directory, dir_stat)
+        folders = [self._get_folder_info(entry.path, entry.name, entry, include_sizes) for entry in folder_entries]
+        files = [self._get_file_info(entry.path, entry.name, entry) for entry in file_entries]
+        return folders, files
+    
+    def _get_folder_info(self, folder_path: str, folder_name: str,
+                         entry: os.DirEntry = None, include_size: bool = False) -> Dict:
         """
         Obté informació detallada d'una carpeta
         
         Args:
             folder_path: Ruta completa de la carpeta
             folder_name: Nom de la carpeta
+            entry: DirEntry d'os.scandir (opcional, evita un stat extra)
+            include_size: Si és True, calcula la mida (si no, 'size' és None)
             
         Returns:
             dict: Informació de la carpeta
         """
         try:
-            stats = os.stat(folder_path)
+            stats = entry.stat() if entry is not None else os.stat(folder_path)
             return {
                 'name': folder_name,
                 'path': folder_path,
                 'type': 'folder',
-                'size': self._get_folder_size(folder_path),
+                'size': self.get_folder_size(folder_path) if include_size else None,
                 'modified_time': datetime.fromtimestamp(stats.st_mtime).isoformat(),
                 'accessible': True
             }
@@ -400,19 +619,20 @@ class NetworkScanner:
                 'accessible': False
             }
     
-    def _get_file_info(self, file_path: str, file_name: str) -> Dict:
+    def _get_file_info(self, file_path: str, file_name: str, entry: os.DirEntry = None) -> Dict:
         """
         Obté informació detallada d'un fitxer
         
         Args:
             file_path: Ruta completa del fitxer
             file_name: Nom del fitxer
+            entry: DirEntry d'os.scandir (opcional, evita un stat extra)
             
         Returns:
             dict: Informació del fitxer
         """
         try:
-            stats = os.stat(file_path)
+            stats = entry.stat() if entry is not None else os.stat(file_path)
             return {
                 'name': file_name,
                 'path': file_path,
@@ -430,7 +650,7 @@ class NetworkScanner:
                 'error': str(e)
             }
     
-    def _get_folder_size(self, folder_path: str) -> int:
+    def get_folder_size(self, folder_path: str) -> int:
         """
         Calcula la mida total d'una carpeta (només primer nivell per rendiment)
         
@@ -442,10 +662,10 @@ class NetworkScanner:
         """
         try:
             total_size = 0
-            for item in os.listdir(folder_path):
-                item_path = os.path.join(folder_path, item)
-                if os.path.isfile(item_path):
-                    total_size += os.path.getsize(item_path)
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        total_size += entry.stat().st_size
             return total_size
         except Exception:
             return 0
@@ -644,9 +864,11 @@ class NetworkScanner:
             logger.error(f"Error extraient LOT de {filename}: {e}")
             return None, None
     
-    def read_csv_file(self, file_path: str, client: str, referencia: str, lot: str, data_hora: str) -> Optional[pd.DataFrame]:
+    def read_csv_file(self, file_path: str, client: str, referencia: str, lot: str, data_hora: str,
+                      clean_executor: Executor = None, content: bytes = None) -> Optional[pd.DataFrame]:
         """
         Llegeix un fitxer CSV i afegeix les columnes CLIENT, REFERENCIA, LOT, DATA_HORA
+        i FITXER (nom del fitxer d'origen)
         
         Args:
             file_path: Ruta completa del fitxer CSV
@@ -654,88 +876,25 @@ class NetworkScanner:
             referencia: Referència del client
             lot: Número de lot extret del nom del fitxer
             data_hora: Data i hora extreta del nom del fitxer
+            clean_executor: Pool de processos per fer el netejat fora del fil actual (opcional)
+            content: Contingut del fitxer ja llegit (opcional, s'evita tornar-lo a llegir)
             
         Returns:
             DataFrame amb les dades del CSV + columnes addicionals, o None si error
         """
         try:
-            # Llegir CSV - provar diferents separadors i encodings per evitar problemes Unicode
-            separators = [';', ',', '\t']
-            encodings = ['utf-8', 'utf-8-sig', 'windows-1252', 'latin-1', 'cp1252', 'iso-8859-1']
-            df = None
-            
-            for encoding in encodings:
-                for sep in separators:
-                    try:
-                        df = pd.read_csv(file_path, sep=sep, encoding=encoding)
-                        if len(df.columns) > 1:  # Si té més d'una columna, probablement és correcte
-                            logger.debug(f"CSV llegit amb encoding {encoding} i separador '{sep}': {file_path}")
-                            break
-                    except UnicodeDecodeError:
-                        continue
-                    except Exception as e:
-                        logger.debug(f"Error llegint amb {encoding}/{sep}: {e}")
-                        continue
-                if df is not None and len(df.columns) > 1:
-                    break
+            df = self._read_csv_raw(file_path, content)
             
             if df is None or df.empty:
                 logger.warning(f"No es pot llegir o el fitxer està buit: {file_path}")
                 return None
             
-            # Netejar columnes problemàtiques
-            # Si hi ha columna "Out,Alignment", dividir-la
-            if 'Out,Alignment' in df.columns:
-                # Intentar dividir la columna combinada
-                out_alignment = df['Out,Alignment'].astype(str)
-                df['Out'] = out_alignment
-                df['Alignment'] = out_alignment
-                df = df.drop(columns=['Out,Alignment'])
-            
-            # Eliminar columnes duplicades si existeixen
-            df = df.loc[:, ~df.columns.duplicated()]
-            
-            # NETEJAT DE VALORS PROBLEMÀTICS
-            # Detectar columnes que poden contenir valors problemàtics
-            possible_columns = {
-                'element': ['Element', 'element', 'ELEMENT', 'Feature', 'feature', 'FEATURE', 'Mesura', 'mesura'],
-                'actual': ['Actual', 'actual', 'ACTUAL', 'Value', 'value', 'VALUE', 'Valor', 'valor'],
-                'nominal': ['Nominal', 'nominal', 'NOMINAL', 'Target', 'target', 'TARGET'],
-                'tolerance': ['Tolerance', 'tolerance', 'TOLERANCE', 'Tol', 'tol', 'TOL']
-            }
-            
-            # Trobar les columnes corresponents
-            detected_columns = {}
-            for col_type, possible_names in possible_columns.items():
-                for possible_name in possible_names:
-                    if possible_name in df.columns:
-                        detected_columns[col_type] = possible_name
-                        break
-            
-            # Aplicar netejat si trobem columnes
-            if detected_columns:
-                logger.info(f"Netejant valors problemàtics en: {detected_columns}")
-                
-                # Detectar problemes abans
-                problems_before = ValueCleaner.detect_problematic_values(df)
-                
-                # Netejar DataFrame
-                df = ValueCleaner.clean_dataframe_columns(
-                    df,
-                    element_col=detected_columns.get('element'),
-                    actual_col=detected_columns.get('actual'),
-                    nominal_col=detected_columns.get('nominal'),
-                    tolerance_col=detected_columns.get('tolerance')
-                )
-                
-                # Detectar problemes després
-                problems_after = ValueCleaner.detect_problematic_values(df)
-                
-                # Log del resultat
-                logger.info(f"Netejat completat per {os.path.basename(file_path)}:")
-                logger.info(f"  Patrons plantilla: {problems_before['template_patterns']} -> {problems_after['template_patterns']}")
-                logger.info(f"  Patrons invàlids: {problems_before['invalid_patterns']} -> {problems_after['invalid_patterns']}")
-                logger.info(f"  Problemes decimals: {problems_before['decimal_issues']} -> {problems_after['decimal_issues']}")
+            # Netejat (CPU): en un procés separat si hi ha pool de processos
+            file_name = os.path.basename(file_path)
+            if clean_executor is not None:
+                df = clean_executor.submit(clean_csv_dataframe, df, file_name).result()
+            else:
+                df = clean_csv_dataframe(df, file_name)
             
             # Afegir les columnes identificadores
             df['CLIENT'] = client
@@ -743,30 +902,188 @@ class NetworkScanner:
             df['REFERENCIA'] = referencia
             df['LOT'] = lot
             df['DATA_HORA'] = data_hora
+            df['FITXER'] = file_name  # Identifica el CSV d'origen (p.ex. al lake de mesures)
             
-            logger.info(f"CSV llegit: {os.path.basename(file_path)} - {len(df)} files")
+            logger.info(f"CSV llegit: {file_name} - {len(df)} files")
             return df
             
         except Exception as e:
             logger.error(f"Error llegint fitxer CSV {file_path}: {e}")
             return None
     
-    def process_all_csv_files(self) -> Dict:
+    def _read_csv_raw(self, file_path: str, content: bytes = None) -> Optional[pd.DataFrame]:
+        """
+        Llegeix un CSV amb el dialecte detectat (una sola lectura) i, si no
+        es valida, amb la lectura per força bruta
+        
+        Args:
+            file_path: Ruta completa del fitxer CSV
+            content: Contingut del fitxer ja llegit (opcional, es parseja des de memòria)
+            
+        Returns:
+            DataFrame sense processar, o None si no es pot llegir
+        """
+        folder = os.path.dirname(file_path)
+        
+        # 1. Dialecte cachejat de la carpeta (sense llegir el principi del fitxer)
+        cached = self.csv_sniffer.get_cached(folder)
+        if cached:
+            df = self._read_csv_with_dialect(file_path, cached, content)
+            if df is not None:
+                return df
+        
+        # 2. Dialecte detectat a partir del principi del propi fitxer
+        if content is not None:
+            sniffed = self.csv_sniffer.sniff_head(content)
+        else:
+            sniffed = self.csv_sniffer.sniff(file_path)
+        if sniffed and sniffed != cached:
+            df = self._read_csv_with_dialect(file_path, sniffed, content)
+            if df is not None:
+                self.csv_sniffer.remember(folder, sniffed)
+                return df
+        
+        # El dialecte no s'ha pogut validar: lectura per força bruta
+        self.csv_sniffer.invalidate(folder)
+        self.csv_sniffer.record_fallback()
+        logger.debug(f"Dialecte no detectat per {file_path}, provant totes les combinacions")
+        return self._read_csv_brute_force(file_path, content)
+    
+    def _read_csv_with_dialect(self, file_path: str, dialect: Dict[str, str],
+                               content: bytes = None) -> Optional[pd.DataFrame]:
+        """
+        Parseja un CSV una sola vegada amb un encoding i separador concrets
+        
+        Args:
+            file_path: Ruta completa del fitxer CSV
+            dialect: Diccionari amb 'encoding' i 'sep'
+            content: Contingut del fitxer ja llegit (opcional)
+            
+        Returns:
+            DataFrame si la lectura és vàlida (més d'una columna), None altrament
+        """
+        # Els encodings d'un byte descodifiquen qualsevol contingut: com a la lectura
+        # per força bruta, es prova primer UTF-8 perquè un fitxer UTF-8 no es llegeixi malament
+        encodings = [dialect['encoding']]
+        if dialect['encoding'] in CsvDialectSniffer.SINGLE_BYTE_ENCODINGS:
+            encodings.insert(0, 'utf-8')
+        
+        for encoding in encodings:
+            try:
+                df = pd.read_csv(self._csv_source(file_path, content), sep=dialect['sep'], encoding=encoding)
+                if len(df.columns) > 1:
+                    logger.debug(f"CSV llegit amb encoding {encoding} i separador '{dialect['sep']}': {file_path}")
+                    return df
+            except UnicodeDecodeError:
+                continue
+            except Exception as e:
+                logger.debug(f"Error llegint amb {encoding}/{dialect['sep']}: {e}")
+        return None
+    
+    def _read_csv_brute_force(self, file_path: str, content: bytes = None) -> Optional[pd.DataFrame]:
+        """
+        Llegeix un CSV provant diferents separadors i encodings
+        
+        Args:
+            file_path: Ruta completa del fitxer CSV
+            content: Contingut del fitxer ja llegit (opcional)
+            
+        Returns:
+            DataFrame sense processar, o None si no es pot llegir
+        """
+        # Llegir CSV - provar diferents separadors i encodings per evitar problemes Unicode
+        separators = [';', ',', '\t']
+        encodings = ['utf-8', 'utf-8-sig', 'windows-1252', 'latin-1', 'cp1252', 'iso-8859-1']
+        df = None
+        
+        for encoding in encodings:
+            for sep in separators:
+                try:
+                    df = pd.read_csv(self._csv_source(file_path, content), sep=sep, encoding=encoding)
+                    if len(df.columns) > 1:  # Si té més d'una columna, probablement és correcte
+                        logger.debug(f"CSV llegit amb encoding {encoding} i separador '{sep}': {file_path}")
+                        break
+                except UnicodeDecodeError:
+                    continue
+                except Exception as e:
+                    logger.debug(f"Error llegint amb {encoding}/{sep}: {e}")
+                    continue
+            if df is not None and len(df.columns) > 1:
+                break
+        
+        return df
+    
+    @staticmethod
+    def _csv_source(file_path: str, content: Optional[bytes]):
+        """Origen per a pd.read_csv: els bytes ja llegits (un buffer nou per intent) o la ruta"""
+        return io.BytesIO(content) if content is not None else file_path
+    
+    def get_ingestion_manifest(self) -> IngestionManifest:
+        """
+        Retorna el manifest d'ingestió, carregant-lo si cal
+        
+        Returns:
+            IngestionManifest: Manifest de fitxers ja ingerits
+        """
+        if self.ingestion_manifest is None:
+            self.ingestion_manifest = IngestionManifest(self.manifest_path)
+        return self.ingestion_manifest
+    
+    def commit_ingestion_manifest(self) -> int:
+        """
+        Marca com a ingerits els fitxers processats a l'última execució incremental
+        i guarda el manifest. S'ha de cridar només quan les dades ja són a la BBDD.
+        
+        Els fitxers que han canviat des que es van llegir no es registren i es
+        tornaran a ingerir a la propera execució.
+        
+        Returns:
+            int: Nombre de fitxers registrats
+        """
+        if not self._pending_manifest_entries:
+            return 0
+        
+        manifest = self.get_ingestion_manifest()
+        committed = 0
+        for entry in self._pending_manifest_entries:
+            if manifest.record(
+                entry['path'],
+                size=entry['size'],
+                mtime=entry['mtime'],
+                file_hash=entry['hash'],
+                rows=entry['rows']
+            ):
+                committed += 1
+        
+        self._pending_manifest_entries = []
+        manifest.save()
+        logger.info(f"Manifest d'ingestió actualitzat amb {committed} fitxers")
+        return committed
+    
+    def process_all_csv_files(self, incremental: bool = False, scan_result: Dict = None) -> Dict:
         """
         Processa tots els fitxers CSV de tots els clients (excepte EXCLUDED_CLIENTS)
         i crea un dataset global
         
+        Args:
+            incremental: Si és True, consulta el manifest d'ingestió i salta
+                         els fitxers que no han canviat des de l'última ingestió
+            scan_result: Resultat d'un escaneig previ (opcional, si no es torna a escanejar)
+        
         Returns:
             dict: Resum del processament amb estadístiques
         """
         try:
-            logger.info("Iniciant processament de tots els fitxers CSV")
+            logger.info(f"Iniciant processament de tots els fitxers CSV (incremental={incremental})")
             
             # Reinicialitzar dataset global
             self.global_dataset = pd.DataFrame()
+            self._pending_manifest_entries = []
+            manifest = self.get_ingestion_manifest() if incremental else None
             
             # Obtenir estructura de clients i referències
-            scan_result = self.scan_all_clients_and_references()
+            if scan_result is None:
+                scan_result = self.scan_all_clients_and_references()
             
             if not scan_result['success']:
                 return {
@@ -774,114 +1091,36 @@ class NetworkScanner:
                     'error': scan_result['error']
                 }
             
-            # Estadístiques del processament
-            stats = {
-                'clients_processed': 0,
-                'references_processed': 0,
-                'csv_files_found': 0,
-                'csv_files_processed': 0,
-                'csv_files_failed': 0,
-                'total_rows': 0,
-                'clients_skipped': [],
-                'processing_errors': []
-            }
+            stats = self._new_processing_stats()
+            csv_tasks = self._collect_csv_tasks(scan_result, stats)
             
-            # Processar cada client
-            for client_name, client_data in scan_result['clients'].items():
-                
-                # Saltar clients exclosos
-                if client_name in self.EXCLUDED_CLIENTS:
-                    stats['clients_skipped'].append(client_name)
-                    logger.info(f"Saltant client exclòs: {client_name}")
-                    continue
-                
-                stats['clients_processed'] += 1
-                logger.info(f"Processant client: {client_name}")
-                
-                # Verificar si és un client especial amb estructura de fases
-                if client_name in self.SPECIAL_PHASE_CLIENTS:
-                    logger.info(f"Saltant client especial amb fases (sense processador especial): {client_name}")
-                    stats['clients_skipped'].append(client_name)
-                    continue  # Saltar processament normal per clients especials
-                
-                # Verificar si és el client PTCOVER amb estructura ultra-especial
-                if client_name == self.PTCOVER_CLIENT:
-                    logger.info(f"Saltant client PTCOVER (sense processador especial): {client_name}")
-                    stats['clients_skipped'].append(client_name)
-                    continue  # Saltar processament normal per PTCOVER
+            for task, df, manifest_entry in self._iter_ingested_frames(csv_tasks, manifest, stats):
+                if manifest_entry is not None:
+                    self._pending_manifest_entries.append(manifest_entry)
                 
-                # Processament normal per clients regulars
-                # Processar cada referència del client
-                for reference in client_data['references']:
-                    referencia_name = reference['referencia_client']
-                    reference_path = reference['path']
-                    
-                    stats['references_processed'] += 1
-                    logger.info(f"  Processant referència: {referencia_name}")
-                    
-                    try:
-                        # Llistar fitxers CSV en aquesta referència
-                        csv_files = []
-                        for item in os.listdir(reference_path):
-                            if item.lower().endswith('.csv'):
-                                csv_files.append(item)
-                        
-                        stats['csv_files_found'] += len(csv_files)
-                        logger.info(f"    Trobats {len(csv_files)} fitxers CSV")
-                        
-                        # Processar cada fitxer CSV
-                        for csv_file in csv_files:
-                            csv_path = os.path.join(reference_path, csv_file)
-                            
-                            # Extreure LOT i DATA_HORA del nom del fitxer
-                            lot, data_hora = self.extract_lot_and_datetime_from_filename(csv_file)
-                            
-                            if lot is None or data_hora is None:
-                                stats['csv_files_failed'] += 1
-                                error_msg = f"No es pot extreure LOT/DATA_HORA de: {csv_file}"
-                                stats['processing_errors'].append(error_msg)
-                                logger.warning(error_msg)
-                                continue
-                            
-                            # Llegir i processar el CSV
-                            df = self.read_csv_file(csv_path, client_name, referencia_name, lot, data_hora)
-                            
-                            if df is not None:
-                                # Afegir al dataset global
-                                if self.global_dataset.empty:
-                                    self.global_dataset = df.copy()
-                                else:
-                                    self.global_dataset = pd.concat([self.global_dataset, df], ignore_index=True)
-                                
-                                stats['csv_files_processed'] += 1
-                                stats['total_rows'] += len(df)
-                                logger.info(f"    Processat: {csv_file} ({len(df)} files)")
-                            else:
-                                stats['csv_files_failed'] += 1
-                                error_msg = f"Error llegint: {csv_file}"
-                                stats['processing_errors'].append(error_msg)
-                    
-                    except Exception as e:
-                        error_msg = f"Error processant referència {referencia_name}: {str(e)}"
-                        stats['processing_errors'].append(error_msg)
-                        logger.error(error_msg)
+                # Afegir al dataset global (es concatena una sola vegada al final)
+                self._dataset_accumulator.append(df)
             
             # Resultat final
             result = {
                 'success': True,
                 'timestamp': datetime.now().isoformat(),
                 'csv_files_processed': stats['csv_files_processed'],
-                'total_records': len(self.global_dataset),
+                'total_records': self._dataset_accumulator.total_rows,
                 'errors': stats['processing_errors'],
                 'statistics': stats,
                 'dataset_info': {
-                    'total_rows': len(self.global_dataset),
-                    'total_columns': len(self.global_dataset.columns) if not self.global_dataset.empty else 0,
-                    'columns': list(self.global_dataset.columns) if not self.global_dataset.empty else []
+                    'total_rows': self._dataset_accumulator.total_rows,
+                    'total_columns': len(self._dataset_accumulator.columns),
+                    'columns': self._dataset_accumulator.columns,
+                    'chunks': self._dataset_accumulator.num_chunks
                 }
             }
             
-            logger.info(f"Processament completat: {stats['csv_files_processed']} fitxers, {len(self.global_dataset)} files totals")
+            if incremental:
+                logger.info(f"Ingestió incremental: {stats['csv_files_new']} nous, "
+                            f"{stats['csv_files_changed']} modificats, {stats['csv_files_skipped']} sense canvis")
+            logger.info(f"Processament completat: {stats['csv_files_processed']} fitxers, {self._dataset_accumulator.total_rows} files totals")
             return result
             
         except Exception as e:
@@ -891,6 +1130,283 @@ class NetworkScanner:
                 'error': str(e)
             }
     
+    def _new_processing_stats(self) -> Dict:
+        """Estadístiques inicials d'un processament de CSV"""
+        return {
+            'clients_processed': 0,
+            'references_processed': 0,
+            'csv_files_found': 0,
+            'csv_files_processed': 0,
+            'csv_files_failed': 0,
+            'total_rows': 0,
+            'csv_files_new': 0,
+            'csv_files_changed': 0,
+            'csv_files_skipped': 0,
+            'clients_skipped': [],
+            'processing_errors': []
+        }
+    
+    def _collect_csv_tasks(self, scan_result: Dict, stats: Dict) -> List[Dict]:
+        """
+        Recull els fitxers CSV a processar de totes les referències escanejades
+        
+        Args:
+            scan_result: Resultat de scan_all_clients_and_references
+            stats: Estadístiques del processament (s'actualitzen)
+            
+        Returns:
+            list: Tasques (client, referencia, csv_file, csv_path, lot, data_hora, stat) en ordre determinista
+        """
+        csv_tasks = []
+        
+        # Processar cada client
+        for client_name, client_data in scan_result['clients'].items():
+            
+            # Saltar clients exclosos
+            if client_name in self.EXCLUDED_CLIENTS:
+                stats['clients_skipped'].append(client_name)
+                logger.info(f"Saltant client exclòs: {client_name}")
+                continue
+            
+            stats['clients_processed'] += 1
+            logger.info(f"Processant client: {client_name}")
+            
+            # Verificar si és un client especial amb estructura de fases
+            if client_name in self.SPECIAL_PHASE_CLIENTS:
+                logger.info(f"Saltant client especial amb fases (sense processador especial): {client_name}")
+                stats['clients_skipped'].append(client_name)
+                continue  # Saltar processament normal per clients especials
+            
+            # Verificar si és el client PTCOVER amb estructura ultra-especial
+            if client_name == self.PTCOVER_CLIENT:
+                logger.info(f"Saltant client PTCOVER (sense processador especial): {client_name}")
+                stats['clients_skipped'].append(client_name)
+                continue  # Saltar processament normal per PTCOVER
+            
+            # Processament normal per clients regulars
+            # Recollir els fitxers CSV de cada referència del client
+            for reference in client_data['references']:
+                referencia_name = reference['referencia_client']
+                reference_path = reference['path']
+                
+                stats['references_processed'] += 1
+                logger.info(f"  Processant referència: {referencia_name}")
+                
+                try:
+                    # Llistar fitxers CSV en aquesta referència (ordenats per tenir un resultat determinista)
+                    csv_files = self._list_csv_entries(reference_path)
+                    
+                    stats['csv_files_found'] += len(csv_files)
+                    logger.info(f"    Trobats {len(csv_files)} fitxers CSV")
+                    
+                    for csv_file, csv_entry in csv_files:
+                        csv_stat = None
+                        if csv_entry is not None:
+                            try:
+                                csv_stat = csv_entry.stat()
+                            except OSError:
+                                pass
+                        task = self.build_csv_task(client_name, referencia_name,
+                                                   os.path.join(reference_path, csv_file), csv_stat)
+                        
+                        if task is None:
+                            stats['csv_files_failed'] += 1
+                            error_msg = f"No es pot extreure LOT/DATA_HORA de: {csv_file}"
+                            stats['processing_errors'].append(error_msg)
+                            logger.warning(error_msg)
+                            continue
+                        
+                        csv_tasks.append(task)
+                
+                except Exception as e:
+                    error_msg = f"Error processant referència {referencia_name}: {str(e)}"
+                    stats['processing_errors'].append(error_msg)
+                    logger.error(error_msg)
+        
+        self.scan_cache.save()
+        return csv_tasks
+    
+    def build_csv_task(self, client: str, referencia: str, csv_path: str,
+                       stat_result: os.stat_result = None) -> Optional[Dict]:
+        """
+        Crea la tasca d'ingestió d'un fitxer CSV
+        
+        Args:
+            client: Nom del client
+            referencia: Referència del client
+            csv_path: Ruta completa del fitxer CSV
+            stat_result: stat del fitxer ja obtingut (opcional, el manifest no en fa cap altre)
+            
+        Returns:
+            dict: Tasca (client, referencia, csv_file, csv_path, lot, data_hora, stat) o None
+                  si no es pot extreure el LOT/DATA_HORA del nom del fitxer
+        """
+        csv_file = os.path.basename(csv_path)
+        
+        # Extreure LOT i DATA_HORA del nom del fitxer
+        lot, data_hora = self.extract_lot_and_datetime_from_filename(csv_file)
+        if lot is None or data_hora is None:
+            return None
+        
+        return {
+            'client': client,
+            'referencia': referencia,
+            'csv_file': csv_file,
+            'csv_path': csv_path,
+            'lot': lot,
+            'data_hora': data_hora,
+            'stat': stat_result
+        }
+    
+    def is_ingestable_client(self, client_name: str) -> bool:
+        """
+        Indica si els CSV d'un client es processen amb el flux normal
+        (no exclòs, sense estructura de fases i no PTCOVER)
+        """
+        return (client_name not in self.EXCLUDED_CLIENTS
+                and client_name not in self.SPECIAL_PHASE_CLIENTS
+                and client_name != self.PTCOVER_CLIENT)
+    
+    def _iter_ingested_frames(self, csv_tasks: List[Dict], manifest: Optional[IngestionManifest],
+                              stats: Dict) -> Iterator[Tuple[Dict, pd.DataFrame, Optional[Dict]]]:
+        """
+        Llegeix les tasques CSV en ordre i retorna els DataFrames llegits correctament
+        
+        Els fitxers sense canvis i els erronis només actualitzen les estadístiques.
+        
+        Args:
+            csv_tasks: Tasques generades per _collect_csv_tasks
+            manifest: Manifest d'ingestió (None si no és mode incremental)
+            stats: Estadístiques del processament (s'actualitzen)
+            
+        Yields:
+            tuple: (task, df, entrada de manifest o None)
+        """
+        # Llegir i processar els CSV (en paral·lel si read_workers > 1), en ordre determinista
+        logger.info(f"Llegint {len(csv_tasks)} fitxers CSV amb {self.read_workers} fils "
+                    f"i {self.clean_processes} processos de netejat")
+        for task, outcome in self._iter_csv_results(csv_tasks, manifest):
+            csv_file = task['csv_file']
+            
+            if outcome['status'] == IngestionManifest.STATUS_UNCHANGED:
+                stats['csv_files_skipped'] += 1
+                logger.debug(f"    Sense canvis, s'omet: {csv_file}")
+                continue
+            if outcome['status'] == IngestionManifest.STATUS_NEW:
+                stats['csv_files_new'] += 1
+            elif outcome['status'] == IngestionManifest.STATUS_CHANGED:
+                stats['csv_files_changed'] += 1
+            
+            df = outcome['df']
+            if df is not None:
+                manifest_entry = None
+                manifest_check = outcome['manifest_check']
+                if manifest_check is not None:
+                    manifest_entry = {
+                        'path': task['csv_path'],
+                        'size': manifest_check['size'],
+                        'mtime': manifest_check['mtime'],
+                        'hash': manifest_check['hash'],
+                        'rows': len(df)
+                    }
+                
+                stats['csv_files_processed'] += 1
+                stats['total_rows'] += len(df)
+                logger.info(f"    Processat: {csv_file} ({len(df)} files)")
+                yield task, df, manifest_entry
+            else:
+                stats['csv_files_failed'] += 1
+                error_msg = outcome['error'] or f"Error llegint: {csv_file}"
+                stats['processing_errors'].append(error_msg)
+    
+    def _ingest_csv_task(self, task: Dict, manifest: Optional[IngestionManifest],
+                         clean_executor: Optional[Executor]) -> Dict:
+        """
+        Processa un fitxer CSV (consulta al manifest + lectura + netejat)
+        
+        S'executa dins d'un fil del pool de lectura; no modifica cap estat compartit
+        excepte el manifest, que és thread-safe. En mode incremental el fitxer es
+        llegeix un sol cop: dels mateixos bytes se'n calcula el hash per al
+        manifest i es parsegen.
+        
+        Args:
+            task: Diccionari amb client, referencia, csv_file, csv_path, lot i data_hora
+            manifest: Manifest d'ingestió (None si no és mode incremental)
+            clean_executor: Pool de processos per al netejat (opcional)
+            
+        Returns:
+            dict: {'status', 'df', 'error', 'manifest_check'}
+        """
+        outcome = {'status': None, 'df': None, 'error': None, 'manifest_check': None}
+        try:
+            content = None
+            if manifest is not None:
+                manifest_check = manifest.check_file(task['csv_path'], stat_result=task.get('stat'),
+                                                     compare_content=False)
+                if manifest_check['status'] != IngestionManifest.STATUS_UNCHANGED:
+                    with open(task['csv_path'], 'rb') as f:
+                        content = f.read()
+                    manifest_check = manifest.check_content(task['csv_path'], manifest_check, content)
+                outcome['manifest_check'] = manifest_check
+                outcome['status'] = manifest_check['status']
+                if manifest_check['status'] == IngestionManifest.STATUS_UNCHANGED:
+                    return outcome
+            
+            outcome['df'] = self.read_csv_file(
+                task['csv_path'], task['client'], task['referencia'],
+                task['lot'], task['data_hora'], clean_executor=clean_executor, content=content
+            )
+        except Exception as e:
+            outcome['error'] = f"Error processant {task['csv_file']}: {str(e)}"
+            logger.error(outcome['error'])
+        return outcome
+    
+    def _iter_csv_results(self, csv_tasks: List[Dict],
+                          manifest: Optional[IngestionManifest]) -> Iterator[Tuple[Dict, Dict]]:
+        """
+        Executa les tasques de lectura amb concurrència acotada i retorna els
+        resultats en el mateix ordre que les tasques
+        
+        La lectura (dominada per la latència SMB) es fa en un pool de fils; el
+        netejat amb ValueCleaner es pot enviar a un pool de processos. Com a màxim
+        hi ha 2 × read_workers fitxers en vol alhora, per acotar la memòria.
+        
+        Args:
+            csv_tasks: Llista de tasques en l'ordre desitjat
+            manifest: Manifest d'ingestió (None si no és mode incremental)
+            
+        Yields:
+            tuple: (task, outcome) en ordre
+        """
+        clean_executor = ProcessPoolExecutor(max_workers=self.clean_processes) if self.clean_processes > 0 else None
+        
+        try:
+            if self.read_workers <= 1:
+                for task in csv_tasks:
+                    yield task, self._ingest_csv_task(task, manifest, clean_executor)
+                return
+            
+            max_in_flight = self.read_workers * 2
+            with ThreadPoolExecutor(max_workers=self.read_workers, thread_name_prefix="csv_reader") as executor:
+                pending = deque()
+                task_iter = iter(csv_tasks)
+                
+                for task in task_iter:
+                    pending.append((task, executor.submit(self._ingest_csv_task, task, manifest, clean_executor)))
+                    if len(pending) >= max_in_flight:
+                        break
+                
+                while pending:
+                    task, future = pending.popleft()
+                    next_task = next(task_iter, None)
+                    if next_task is not None:
+                        pending.append((next_task, executor.submit(self._ingest_csv_task, next_task,
+                                                                   manifest, clean_executor)))
+                    yield task, future.result()
+        finally:
+            if clean_executor is not None:
+                clean_executor.shutdown()
+    
     def get_global_dataset(self) -> pd.DataFrame:
         """
         Retorna el dataset global amb tots els CSV processats
@@ -900,22 +1416,34 @@ class NetworkScanner:
         """
         return self.global_dataset.copy() if not self.global_dataset.empty else pd.DataFrame()
     
+    def iter_global_dataset_chunks(self) -> Iterator[pd.DataFrame]:
+        """
+        Itera pel dataset global per blocs sense materialitzar-lo sencer
+        
+        Yields:
+            DataFrame: Blocs del dataset global en ordre d'ingestió
+        """
+        yield from self._dataset_accumulator.iter_chunks()
+    
     def save_global_dataset(self, output_path: str, format: str = 'csv') -> bool:
         """
         Guarda el dataset global en un fitxer
         
         Args:
-            output_path: Ruta on guardar el fitxer
-            format: Format del fitxer ('csv', 'excel', 'parquet')
+            output_path: Ruta on guardar el fitxer (o directori arrel del lake)
+            format: Format del fitxer ('csv', 'excel', 'parquet', 'parquet_lake')
             
         Returns:
             bool: True si s'ha guardat correctament
         """
         try:
-            if self.global_dataset.empty:
+            if self._dataset_accumulator.total_rows == 0:
                 logger.warning("El dataset global està buit, no es pot guardar")
                 return False
             
+            if format.lower() == 'parquet_lake':
+                return self.save_to_measurement_lake(output_path)['success']
+            
             if format.lower() == 'csv':
                 self.global_dataset.to_csv(output_path, index=False, encoding='utf-8')
             elif format.lower() == 'excel':
@@ -932,6 +1460,80 @@ class NetworkScanner:
             logger.error(f"Error guardant dataset global: {e}")
             return False
     
+    def save_to_measurement_lake(self, lake_path: str = None, compression: str = 'zstd') -> Dict:
+        """
+        Escriu el dataset global al lake Parquet particionat per CLIENT/REFERENCIA/LOT
+        
+        Es processa bloc a bloc (sense materialitzar el dataset) i només se
+        substitueixen les particions i fitxers presents al dataset, de manera que
+        després d'una execució incremental només s'hi afegeixen els LOTs nous o
+        modificats.
+        
+        Args:
+            lake_path: Directori arrel del lake (per defecte data/lake/mesures)
+            compression: Compressió Parquet
+            
+        Returns:
+            dict: Resum de l'escriptura
+        """
+        from .measurement_lake import MeasurementLake
+        
+        lake = MeasurementLake(lake_path, compression=compression)
+        summary = {'success': True, 'partitions_written': 0, 'files_written': 0, 'rows_written': 0,
+                   'lake_path': str(lake.root_path)}
+        
+        for chunk in self.iter_global_dataset_chunks():
+            result = lake.write(chunk)
+            if not result['success']:
+                logger.error(f"Error guardant al lake de mesures: {result.get('error')}")
+                summary.update(success=False, error=result.get('error'))
+                return summary
+            summary['partitions_written'] += result['partitions_written']
+            summary['files_written'] += result['files_written']
+            summary['rows_written'] += result['rows_written']
+        
+        logger.info(f"Dataset global guardat al lake {lake.root_path}: {summary['rows_written']} files")
+        return summary
+    
+    def load_from_measurement_lake(self, lake_path: str = None, clients=None,
+                                   references=None, lots=None) -> Dict:
+        """
+        Carrega al dataset global les particions seleccionades del lake Parquet
+        (per tornar a ingerir o analitzar sense accedir a la xarxa)
+        
+        Args:
+            lake_path: Directori arrel del lake (per defecte data/lake/mesures)
+            clients: Client o clients (None = tots)
+            references: Referència o referències (None = totes)
+            lots: LOT o LOTs (None = tots)
+            
+        Returns:
+            dict: Resum de la càrrega
+        """
+        from .measurement_lake import MeasurementLake
+        
+        try:
+            lake = MeasurementLake(lake_path)
+            self.global_dataset = pd.DataFrame()
+            partitions = 0
+            for df in lake.iter_partitions(clients, references, lots):
+                self._dataset_accumulator.append(df)
+                partitions += 1
+            
+            logger.info(f"Carregades {partitions} particions del lake ({self._dataset_accumulator.total_rows} files)")
+            return {
+                'success': True,
+                'partitions_loaded': partitions,
+                'total_records': self._dataset_accumulator.total_rows
+            }
+        except Exception as e:
+            logger.error(f"Error carregant el lake de mesures: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'total_records': 0
+            }
+    
     def print_dataset_summary(self) -> None:
         """Imprimeix un resum del dataset global"""
         if self.global_dataset.empty:
@@ -1016,9 +1618,8 @@ class NetworkScanner:
         Returns:
             dict: Resum de la inserció
         """
-        valid_tables = ['mesures_gompcnou', 'mesures_gompc_projecets', 'mesureshoytom', 'mesurestoriso']
-        if target_table not in valid_tables:
-            logger.error(f"Taula destí '{target_table}' no vàlida. Opcions: {valid_tables}")
+        if target_table not in self.TARGET_TABLES:
+            logger.error(f"Taula destí '{target_table}' no vàlida. Opcions: {self.TARGET_TABLES}")
             return {
                 'success': False,
                 'error': f"Taula '{target_table}' no vàlida",
@@ -1034,40 +1635,14 @@ class NetworkScanner:
             }
         
         try:
-            # Carregar configuració BBDD
-            db_config = self.load_db_config()
-            if not db_config:
+            adapter, error = self._open_database_adapter(target_table)
+            if adapter is None:
                 return {
                     'success': False,
-                    'error': 'No es pot carregar la configuració de la BBDD',
+                    'error': error,
                     'records_inserted': 0
                 }
             
-            # Importar i utilitzar l'adapter de BBDD
-            from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
-            
-            # Crear adapter amb configuració i taula específica
-            adapter = QualityMeasurementDBAdapter(db_config, table_name=target_table)
-            
-            # Connectar a la BBDD
-            if not adapter.connect():
-                return {
-                    'success': False,
-                    'error': 'No es pot connectar a la base de dades',
-                    'records_inserted': 0
-                }
-            
-            logger.info(f"Connexió a BBDD establerta correctament (taula: {target_table})")
-            
-            # Actualitzar esquema de la taula si cal
-            logger.info(f"Actualitzant esquema de la taula {target_table}...")
-            schema_result = adapter.update_table_schema()
-            
-            if schema_result['success']:
-                logger.info("Esquema actualitzat correctament")
-            else:
-                logger.warning(f"Advertència actualitzant esquema: {schema_result.get('message', 'Unknown')}")
-            
             # Preparar dataset per inserció
             logger.info("Preparant dataset per inserció...")
             prepared_data = adapter.prepare_dataset_for_insertion(self.global_dataset)
@@ -1088,6 +1663,9 @@ class NetworkScanner:
             # Tancar connexió
             adapter.close()
             
+            if insert_result.get('records_inserted'):
+                invalidate_measurement_cache(f"ingestió a {target_table}")
+            
             if insert_result['success']:
                 logger.info(f"Inserció completada: {insert_result['records_inserted']} registres")
                 return {
@@ -1114,15 +1692,252 @@ class NetworkScanner:
                 'records_inserted': 0
             }
     
-    def process_and_store_data(self) -> Dict:
+    def _open_database_adapter(self, target_table: str):
+        """
+        Crea l'adapter de BBDD, hi connecta i actualitza l'esquema de la taula destí
+        
+        Args:
+            target_table: Nom de la taula destí
+            
+        Returns:
+            tuple: (adapter connectat o None, missatge d'error o None)
+        """
+        # Carregar configuració BBDD
+        db_config = self.load_db_config()
+        if not db_config:
+            return None, 'No es pot carregar la configuració de la BBDD'
+        
+        # Importar i utilitzar l'adapter de BBDD
+        from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+        
+        # Crear adapter amb configuració i taula específica
+        adapter = QualityMeasurementDBAdapter(db_config, table_name=target_table)
+        
+        # Connectar a la BBDD
+        if not adapter.connect():
+            return None, 'No es pot connectar a la base de dades'
+        
+        logger.info(f"Connexió a BBDD establerta correctament (taula: {target_table})")
+        
+        # Actualitzar esquema de la taula si cal
+        logger.info(f"Actualitzant esquema de la taula {target_table}...")
+        schema_result = adapter.update_table_schema()
+        
+        if schema_result['success']:
+            logger.info("Esquema actualitzat correctament")
+        else:
+            logger.warning(f"Advertència actualitzant esquema: {schema_result.get('message', 'Unknown')}")
+        
+        return adapter, None
+    
+    def stream_csv_files_to_database(self, scan_result: Dict = None, incremental: bool = True,
+                                     target_table: str = 'mesures_gompcnou',
+                                     batch_rows: int = None, max_pending_batches: int = None,
+                                     csv_tasks: List[Dict] = None) -> Dict:
+        """
+        Ingestió en streaming: llegeix, neteja, prepara i insereix els CSV per lots
+        sense construir el dataset global
+        
+        Els fitxers llegits s'agrupen en lots de batch_rows files que un fil
+        escriptor prepara (prepare_dataset_for_insertion) i insereix mentre es
+        continuen llegint fitxers de la xarxa. Quan hi ha max_pending_batches lots
+        pendents d'escriure, la lectura s'atura fins que se n'escriu un
+        (back-pressure), de manera que la memòria queda acotada a uns
+        (max_pending_batches + 1) × batch_rows files independentment del volum
+        de la xarxa.
+        
+        En mode incremental, només es registren al manifest els fitxers dels
+        lots inserits correctament.
+        
+        Args:
+            scan_result: Resultat d'un escaneig previ (opcional, si no es torna a escanejar)
+            incremental: Si és True, salta els fitxers sense canvis segons el manifest
+            target_table: Taula destí (vegeu TARGET_TABLES)
+            batch_rows: Files per lot d'escriptura (per defecte DEFAULT_STREAM_BATCH_ROWS)
+            max_pending_batches: Lots pendents d'escriure abans d'aturar la lectura
+            csv_tasks: Tasques CSV concretes a ingerir (opcional, vegeu build_csv_task);
+                       si s'indiquen no s'escaneja la xarxa
+            
+        Returns:
+            dict: Resum del processament i de la inserció
+        """
+        if target_table not in self.TARGET_TABLES:
+            logger.error(f"Taula destí '{target_table}' no vàlida. Opcions: {self.TARGET_TABLES}")
+            return {
+                'success': False,
+                'error': f"Taula '{target_table}' no vàlida",
+                'records_inserted': 0
+            }
+        
+        batch_rows = max(1, batch_rows or self.DEFAULT_STREAM_BATCH_ROWS)
+        max_pending_batches = max(1, max_pending_batches or self.DEFAULT_STREAM_PENDING_BATCHES)
+        
+        logger.info(f"Iniciant ingestió en streaming (incremental={incremental}, "
+                    f"lots de {batch_rows} files, {max_pending_batches} lots pendents com a màxim)")
+        
+        # En streaming no es manté el dataset global en memòria
+        self.global_dataset = pd.DataFrame()
+        self._pending_manifest_entries = []
+        manifest = self.get_ingestion_manifest() if incremental else None
+        
+        stats = self._new_processing_stats()
+        
+        if csv_tasks is None:
+            if scan_result is None:
+                scan_result = self.scan_all_clients_and_references()
+            if not scan_result['success']:
+                return {
+                    'success': False,
+                    'error': scan_result.get('error', 'Error durant l\'escaneig'),
+                    'records_inserted': 0
+                }
+            csv_tasks = self._collect_csv_tasks(scan_result, stats)
+        else:
+            stats['csv_files_found'] = len(csv_tasks)
+        
+        adapter, error = self._open_database_adapter(target_table)
+        if adapter is None:
+            return {
+                'success': False,
+                'error': error,
+                'records_inserted': 0
+            }
+        
+        db_stats = {
+            'batches_written': 0,
+            'batches_failed': 0,
+            'records_inserted': 0,
+            'skipped_records': 0,
+            'errors': [],
+            'max_rows_in_flight': 0
+        }
+        pending = deque()  # (future, files del lot, entrades de manifest del lot)
+        batch_frames = []
+        batch_entries = []
+        batch_size = 0
+        
+        def wait_for_batches(max_left: int) -> None:
+            """Espera que s'escriguin lots fins que en quedin com a màxim max_left"""
+            while len(pending) > max_left:
+                future, rows, entries = pending.popleft()
+                insert_result = future.result()
+                if insert_result.get('success'):
+                    db_stats['batches_written'] += 1
+                    db_stats['records_inserted'] += insert_result.get('records_inserted', 0)
+                    db_stats['skipped_records'] += insert_result.get('skipped_records', 0)
+                    db_stats['errors'].extend(insert_result.get('errors', []))
+                    self._pending_manifest_entries.extend(entries)
+                else:
+                    db_stats['batches_failed'] += 1
+                    db_stats['errors'].append(insert_result.get('error', 'Error desconegut durant la inserció'))
+                    logger.error(f"Error inserint un lot de {rows} files: {insert_result.get('error')}")
+        
+        try:
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="db_writer") as writer:
+                for task, df, manifest_entry in self._iter_ingested_frames(csv_tasks, manifest, stats):
+                    batch_frames.append(df)
+                    batch_size += len(df)
+                    if manifest_entry is not None:
+                        batch_entries.append(manifest_entry)
+                    
+                    if batch_size >= batch_rows:
+                        # Back-pressure: no acumular més lots dels permesos
+                        wait_for_batches(max_pending_batches - 1)
+                        pending.append((writer.submit(self._write_stream_batch, adapter, batch_frames),
+                                        batch_size, batch_entries))
+                        batch_frames, batch_entries, batch_size = [], [], 0
+                    
+                    rows_in_flight = batch_size + sum(rows for _, rows, _ in pending)
+                    db_stats['max_rows_in_flight'] = max(db_stats['max_rows_in_flight'], rows_in_flight)
+                
+                if batch_frames:
+                    pending.append((writer.submit(self._write_stream_batch, adapter, batch_frames),
+                                    batch_size, batch_entries))
+                    batch_frames, batch_entries = [], []
+                wait_for_batches(0)
+        except Exception as e:
+            logger.error(f"Error durant la ingestió en streaming: {e}")
+            return {
+                'success': False,
+                'error': f'Error inesperat: {str(e)}',
+                'records_inserted': db_stats['records_inserted']
+            }
+        finally:
+            adapter.close()
+            if db_stats['records_inserted']:
+                invalidate_measurement_cache(f"ingestió en streaming a {target_table}")
+        
+        # Registrar al manifest només els fitxers dels lots inserits
+        if incremental:
+            self.commit_ingestion_manifest()
+        self._pending_manifest_entries = []
+        
+        logger.info(f"Ingestió en streaming completada: {stats['csv_files_processed']} fitxers, "
+                    f"{db_stats['records_inserted']} registres inserits en {db_stats['batches_written']} lots "
+                    f"(màxim {db_stats['max_rows_in_flight']} files en memòria)")
+        
+        return {
+            'success': db_stats['batches_failed'] == 0,
+            'error': f"{db_stats['batches_failed']} lots no s'han pogut inserir" if db_stats['batches_failed'] else None,
+            'timestamp': datetime.now().isoformat(),
+            'csv_files_processed': stats['csv_files_processed'],
+            'total_records': stats['total_rows'],
+            'errors': stats['processing_errors'],
+            'statistics': stats,
+            'records_inserted': db_stats['records_inserted'],
+            'skipped_records': db_stats['skipped_records'],
+            'target_table': target_table,
+            'database_statistics': db_stats
+        }
+    
+    def _write_stream_batch(self, adapter, frames: List[pd.DataFrame]) -> Dict:
+        """
+        Prepara i insereix un lot de la ingestió en streaming (s'executa al fil escriptor)
+        
+        Args:
+            adapter: QualityMeasurementDBAdapter connectat
+            frames: DataFrames dels fitxers del lot
+            
+        Returns:
+            dict: Resultat d'insert_dataset
+        """
+        try:
+            batch = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            prepared_data = adapter.prepare_dataset_for_insertion(batch)
+            
+            if prepared_data is None or prepared_data.empty:
+                return {
+                    'success': False,
+                    'error': 'Error preparant les dades per inserció',
+                    'records_inserted': 0
+                }
+            
+            return adapter.insert_dataset(prepared_data)
+        except Exception as e:
+            logger.error(f"Error escrivint lot a la BBDD: {e}")
+            return {
+                'success': False,
+                'error': str(e),
+                'records_inserted': 0
+            }
+    
+    def process_and_store_data(self, incremental: bool = True, streaming: bool = False,
+                               batch_rows: int = None) -> Dict:
         """
         Processa tots els CSV i els guarda a la base de dades
         Pipeline complet: scan → process → store
         
+        Args:
+            incremental: Si és True (per defecte), només es processen els fitxers
+                         nous o modificats segons el manifest d'ingestió
+            streaming: Si és True, els fitxers s'insereixen per lots a mesura que es
+                       llegeixen (memòria acotada) en lloc de construir el dataset global
+            batch_rows: Files per lot en mode streaming (opcional)
+        
         Returns:
             dict: Resum del procés complet
         """
-        logger.info("=== INICIANT PIPELINE COMPLET ===")
+        logger.info(f"=== INICIANT PIPELINE COMPLET (incremental={incremental}, streaming={streaming}) ===")
         
         try:
             # Pas 1: Escanejar tots els clients i referències
@@ -1136,11 +1951,55 @@ class NetworkScanner:
                     'step_failed': 'scan'
                 }
             
-            logger.info(f"Escaneig completat: {scan_result['total_clients']} clients trobats")
+            logger.info(f"Escaneig completat: {scan_result['summary']['total_clients']} clients trobats")
+            
+            if streaming:
+                # Passos 2 i 3 alhora: llegir i inserir per lots
+                logger.info("Pas 2-3: Processant i inserint fitxers CSV en streaming...")
+                stream_result = self.stream_csv_files_to_database(
+                    scan_result=scan_result, incremental=incremental, batch_rows=batch_rows
+                )
+                
+                if not stream_result['success']:
+                    return {
+                        'success': False,
+                        'error': f"Error durant la ingestió en streaming: {stream_result.get('error', 'Unknown')}",
+                        'step_failed': 'database',
+                        'scan_data': scan_result,
+                        'process_data': stream_result
+                    }
+                
+                statistics = stream_result['statistics']
+                logger.info("=== PIPELINE COMPLET FINALITZAT (streaming) ===")
+                return {
+                    'success': True,
+                    'message': 'Pipeline complet executat correctament (streaming)',
+                    'scan_summary': {
+                        'clients_found': scan_result['summary']['total_clients'],
+                        'references_found': scan_result['summary']['total_references']
+                    },
+                    'process_summary': {
+                        'csv_files_processed': stream_result['csv_files_processed'],
+                        'total_records': stream_result['total_records'],
+                        'errors': stream_result['errors']
+                    },
+                    'incremental_summary': {
+                        'new_files': statistics['csv_files_new'],
+                        'changed_files': statistics['csv_files_changed'],
+                        'skipped_files': statistics['csv_files_skipped']
+                    },
+                    'database_summary': {
+                        'records_inserted': stream_result['records_inserted'],
+                        'skipped_records': stream_result['skipped_records'],
+                        'db_errors': stream_result['database_statistics']['errors'],
+                        'batches_written': stream_result['database_statistics']['batches_written'],
+                        'max_rows_in_flight': stream_result['database_statistics']['max_rows_in_flight']
+                    }
+                }
             
             # Pas 2: Processar tots els CSV
             logger.info("Pas 2: Processant fitxers CSV...")
-            process_result = self.process_all_csv_files()
+            process_result = self.process_all_csv_files(incremental=incremental, scan_result=scan_result)
             
             if not process_result['success']:
                 return {
@@ -1151,6 +2010,36 @@ class NetworkScanner:
             
             logger.info(f"Processament completat: {process_result['total_records']} registres")
             
+            statistics = process_result['statistics']
+            incremental_summary = {
+                'new_files': statistics['csv_files_new'],
+                'changed_files': statistics['csv_files_changed'],
+                'skipped_files': statistics['csv_files_skipped']
+            }
+            
+            # Res nou a inserir: el pipeline ha acabat correctament sense tocar la BBDD
+            if incremental and process_result['total_records'] == 0:
+                logger.info("=== PIPELINE COMPLET FINALITZAT (cap fitxer nou o modificat) ===")
+                return {
+                    'success': True,
+                    'message': 'Cap fitxer nou o modificat per ingerir',
+                    'scan_summary': {
+                        'clients_found': scan_result['summary']['total_clients'],
+                        'references_found': scan_result['summary']['total_references']
+                    },
+                    'process_summary': {
+                        'csv_files_processed': 0,
+                        'total_records': 0,
+                        'errors': process_result['errors']
+                    },
+                    'incremental_summary': incremental_summary,
+                    'database_summary': {
+                        'records_inserted': 0,
+                        'skipped_records': 0,
+                        'db_errors': []
+                    }
+                }
+            
             # Pas 3: Inserir a la base de dades
             logger.info("Pas 3: Inserint a la base de dades...")
             db_result = self.insert_dataset_to_database()
@@ -1164,6 +2053,10 @@ class NetworkScanner:
                     'process_data': process_result
                 }
             
+            # Les dades ja són a la BBDD: registrar els fitxers al manifest
+            if incremental:
+                self.commit_ingestion_manifest()
+            
             logger.info("=== PIPELINE COMPLET FINALITZAT ===")
             
             # Resum final
@@ -1179,6 +2072,7 @@ class NetworkScanner:
                     'total_records': process_result['total_records'],
                     'errors': process_result['errors']
                 },
+                'incremental_summary': incremental_summary,
                 'database_summary': {
                     'records_inserted': db_result['records_inserted'],
                     'skipped_records': db_result.get('skipped_records', 0),
@@ -0,0 +1,417 @@
+"""
+Network Watcher
+
+Mode de vigilància continu al voltant del NetworkScanner: detecta els CSV
+GOMPC nous o modificats a la xarxa i els insereix de forma incremental en
+pocs segons, en lloc d'esperar l'execució nocturna completa.
+
+Per no reescanejar tota la xarxa a cada cicle, es guarda l'mtime de cada
+carpeta (arrel, clients i referències) i només es llisten les carpetes que
+han canviat. Un fitxer no s'insereix fins que deixa de créixer (mateixa mida
+i mtime en almenys un cicle posterior i durant settle_seconds). Cada cicle
+escriu un fitxer d'estat JSON amb el retard, la cua i el rendiment.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .network_scanner import NetworkScanner
+from .ingestion_manifest import IngestionManifest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATUS_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "network_watcher_status.json"
+
+
+class NetworkWatcher:
+    """Vigila la xarxa GOMPC i insereix els CSV nous a mesura que apareixen"""
+
+    DEFAULT_POLL_INTERVAL = 5.0
+    DEFAULT_SETTLE_SECONDS = 10.0
+
+    # Els fitxers reescrits in situ no canvien l'mtime de la carpeta: cada
+    # cert temps es revisen totes les carpetes encara que no hagin canviat
+    DEFAULT_FULL_RESCAN_INTERVAL = 600.0
+
+    # Finestra per calcular el rendiment (fitxers/minut)
+    THROUGHPUT_WINDOW_SECONDS = 600.0
+
+    def __init__(self, scanner: NetworkScanner = None, poll_interval: float = None,
+                 settle_seconds: float = None, full_rescan_interval: float = None,
+                 status_path: str = None, target_table: str = 'mesures_gompcnou'):
+        """
+        Inicialitza el vigilant
+
+        Args:
+            scanner: NetworkScanner a utilitzar (per defecte un de nou)
+            poll_interval: Segons entre cicles de vigilància
+            settle_seconds: Segons que un fitxer ha d'estar sense canviar abans d'inserir-lo
+            full_rescan_interval: Segons entre revisions completes de totes les carpetes
+            status_path: Ruta del fitxer d'estat JSON (per defecte data/cache)
+            target_table: Taula destí de les mesures
+        """
+        self.scanner = scanner or NetworkScanner()
+        self.poll_interval = self.DEFAULT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.settle_seconds = self.DEFAULT_SETTLE_SECONDS if settle_seconds is None else settle_seconds
+        self.full_rescan_interval = (self.DEFAULT_FULL_RESCAN_INTERVAL
+                                     if full_rescan_interval is None else full_rescan_interval)
+        self.status_path = Path(status_path) if status_path else DEFAULT_STATUS_PATH
+        self.target_table = target_table
+
+        self._stop_event = threading.Event()
+        self._dir_mtimes: Dict[str, int] = {}
+        self._clients: Dict[str, str] = {}
+        self._references: Dict[str, Dict[str, str]] = {}
+        self._candidates: Dict[str, Dict] = {}
+        self._last_full_rescan = 0.0
+        self._ingest_history = deque()  # (temps, fitxers, files)
+
+        self.started_at = datetime.now().isoformat()
+        self.stats = {
+            'polls': 0,
+            'last_poll_duration': 0.0,
+            'directories_changed': 0,
+            'files_ingested': 0,
+            'rows_inserted': 0,
+            'ingest_errors': 0,
+            'last_ingest_lag': None,
+            'last_ingest_rows_per_second': None,
+            'last_ingest_at': None,
+            'last_error': None
+        }
+
+    def stop(self) -> None:
+        """Demana aturar el bucle de vigilància al final del cicle actual"""
+        self._stop_event.set()
+
+    def run(self, max_polls: int = None) -> None:
+        """
+        Bucle de vigilància: un cicle cada poll_interval segons fins que es crida stop()
+
+        Args:
+            max_polls: Nombre màxim de cicles (None = indefinit)
+        """
+        logger.info(f"Iniciant vigilància de {self.scanner.network_path} "
+                    f"(cada {self.poll_interval}s, estabilització {self.settle_seconds}s)")
+        self._stop_event.clear()
+        polls = 0
+
+        try:
+            while not self._stop_event.is_set():
+                started = time.time()
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    self.stats['last_error'] = str(e)
+                    logger.error(f"Error durant el cicle de vigilància: {e}")
+                    self.write_status()
+
+                polls += 1
+                if max_polls is not None and polls >= max_polls:
+                    break
+
+                self._stop_event.wait(max(0.0, self.poll_interval - (time.time() - started)))
+        except KeyboardInterrupt:
+            logger.info("Vigilància interrompuda per l'usuari")
+        finally:
+            self.write_status(state='stopped')
+            logger.info("Vigilància aturada")
+
+    def poll_once(self) -> Dict:
+        """
+        Executa un cicle: detecta canvis, espera que els fitxers s'estabilitzin i insereix els llestos
+
+        Returns:
+            dict: Resultat de la inserció del cicle (o None si no hi havia res llest)
+        """
+        started = time.time()
+        full_rescan = started - self._last_full_rescan >= self.full_rescan_interval
+        if full_rescan:
+            self._last_full_rescan = started
+
+        changed_references = self._detect_changed_references(full_rescan)
+        for reference_path in changed_references:
+            self._discover_csv_files(reference_path)
+
+        ready = self._collect_settled_files(time.time())
+        ingest_result = self._ingest(ready) if ready else None
+
+        self.stats['polls'] += 1
+        self.stats['directories_changed'] = len(changed_references)
+        self.stats['last_poll_duration'] = round(time.time() - started, 3)
+        self.write_status()
+        return ingest_result
+
+    def _dir_changed(self, path: str) -> Optional[bool]:
+        """
+        Compara l'mtime actual d'una carpeta amb l'últim vist
+
+        Returns:
+            bool: True si ha canviat (o és nova), False si no, None si ja no existeix
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._dir_mtimes.pop(path, None)
+            return None
+
+        previous = self._dir_mtimes.get(path)
+        self._dir_mtimes[path] = mtime
+        return previous != mtime
+
+    def _list_subfolders(self, path: str) -> List[os.DirEntry]:
+        """Llista les subcarpetes d'una carpeta amb os.scandir"""
+        folders = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir():
+                            folders.append(entry)
+                    except OSError:
+                        continue
+        except OSError as e:
+            logger.warning(f"No es pot llistar {path}: {e}")
+        return folders
+
+    def _detect_changed_references(self, full_rescan: bool) -> List[str]:
+        """
+        Recorre l'arbre de carpetes comparant mtimes i retorna les referències a rellistar
+
+        Args:
+            full_rescan: Si és True, es retornen totes les referències encara que no hagin canviat
+
+        Returns:
+            list: Rutes de carpetes de referència amb canvis
+        """
+        root_changed = self._dir_changed(self.scanner.network_path)
+        if root_changed is None:
+            raise ConnectionError(f"No es pot accedir a la ruta de xarxa: {self.scanner.network_path}")
+
+        if root_changed or full_rescan:
+            clients = {}
+            for entry in self._list_subfolders(self.scanner.network_path):
+                if self.scanner._is_client_folder(entry.name) and self.scanner.is_ingestable_client(entry.name):
+                    clients[entry.name] = entry.path
+            for removed in set(self._clients) - set(clients):
+                self._forget_client(removed)
+            self._clients = clients
+
+        changed = []
+        for client_name, client_path in self._clients.items():
+            client_changed = self._dir_changed(client_path)
+            if client_changed is None:
+                continue
+            if client_changed or full_rescan:
+                current = {entry.path for entry in self._list_subfolders(client_path)}
+                known = {path for path, ref in self._references.items() if ref['client'] == client_name}
+                for removed in known - current:
+                    self._references.pop(removed, None)
+                    self._dir_mtimes.pop(removed, None)
+                for reference_path in current - known:
+                    self._references[reference_path] = {
+                        'client': client_name,
+                        'referencia': os.path.basename(reference_path)
+                    }
+
+        for reference_path in list(self._references):
+            reference_changed = self._dir_changed(reference_path)
+            if reference_changed is None:
+                self._references.pop(reference_path, None)
+            elif reference_changed or full_rescan:
+                changed.append(reference_path)
+
+        return changed
+
+    def _forget_client(self, client_name: str) -> None:
+        """Deixa de seguir un client eliminat i les seves referències"""
+        for path in [path for path, ref in self._references.items() if ref['client'] == client_name]:
+            self._references.pop(path, None)
+            self._dir_mtimes.pop(path, None)
+        self._dir_mtimes.pop(self._clients.get(client_name), None)
+
+    def _discover_csv_files(self, reference_path: str) -> None:
+        """Afegeix a la cua els CSV nous o modificats d'una referència"""
+        reference = self._references[reference_path]
+        manifest = self.scanner.get_ingestion_manifest()
+
+        try:
+            with os.scandir(reference_path) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith('.csv') or entry.path in self._candidates:
+                        continue
+                    try:
+                        stat_result = entry.stat()
+                    except OSError:
+                        continue
+
+                    # Un 'touch' sense canvis de contingut es detecta en llegir el fitxer
+                    check = manifest.check_file(entry.path, stat_result=stat_result, compare_content=False)
+                    if check['status'] == IngestionManifest.STATUS_UNCHANGED:
+                        continue
+
+                    self._candidates[entry.path] = {
+                        'client': reference['client'],
+                        'referencia': reference['referencia'],
+                        'size': stat_result.st_size,
+                        'mtime': stat_result.st_mtime,
+                        'stable_since': time.time(),
+                        'stable_poll': self.stats['polls'],
+                        'stat': stat_result
+                    }
+                    logger.debug(f"Fitxer detectat: {entry.path} ({check['status']})")
+        except OSError as e:
+            logger.warning(f"No es pot llistar la referència {reference_path}: {e}")
+
+    def _collect_settled_files(self, now: float) -> List[str]:
+        """
+        Comprova els fitxers de la cua i retorna els que ja no creixen
+
+        Un fitxer està llest si s'ha vist amb la mateixa mida i mtime en un
+        cicle posterior al que es va detectar (o al de l'últim canvi) i fa
+        settle_seconds que no canvia. L'mtime del fitxer no serveix: una còpia
+        que conserva la data original sembla antiga des de la primera vegada.
+        """
+        ready = []
+        for path, candidate in list(self._candidates.items()):
+            try:
+                stat_result = os.stat(path)
+            except OSError:
+                self._candidates.pop(path, None)
+                continue
+
+            if stat_result.st_size != candidate['size'] or stat_result.st_mtime != candidate['mtime']:
+                candidate.update(size=stat_result.st_size, mtime=stat_result.st_mtime,
+                                 stable_since=now, stable_poll=self.stats['polls'])
+                continue
+            candidate['stat'] = stat_result
+
+            if (self.stats['polls'] > candidate['stable_poll']
+                    and now - candidate['stable_since'] >= self.settle_seconds):
+                ready.append(path)
+
+        return sorted(ready)
+
+    def _ingest(self, ready: List[str]) -> Dict:
+        """Insereix els fitxers llestos amb la ingestió en streaming del scanner"""
+        csv_tasks = []
+        for path in ready:
+            candidate = self._candidates[path]
+            task = self.scanner.build_csv_task(candidate['client'], candidate['referencia'], path,
+                                               candidate['stat'])
+            if task is None:
+                # No es reintenta fins que el fitxer torni a canviar
+                self.scanner.get_ingestion_manifest().record(path, size=candidate['size'],
+                                                             mtime=candidate['mtime'], rows=0)
+                self._candidates.pop(path, None)
+                logger.warning(f"No es pot extreure LOT/DATA_HORA de: {os.path.basename(path)}")
+                continue
+            csv_tasks.append(task)
+
+        if not csv_tasks:
+            self.scanner.get_ingestion_manifest().save()
+            return None
+
+        started = time.time()
+        result = self.scanner.stream_csv_files_to_database(
+            incremental=True, target_table=self.target_table, csv_tasks=csv_tasks
+        )
+        finished = time.time()
+
+        if 'database_statistics' not in result:
+            # No s'ha arribat a llegir cap fitxer (connexió, configuració...): es reintenta al proper cicle
+            self.stats['ingest_errors'] += 1
+            self.stats['last_error'] = result.get('error')
+            logger.error(f"Error inserint fitxers nous: {result.get('error')}")
+            return result
+
+        # Els fitxers que han fallat no queden al manifest i es tornen a detectar a la revisió completa
+        oldest_mtime = min(self._candidates[task['csv_path']]['mtime'] for task in csv_tasks)
+        for task in csv_tasks:
+            self._candidates.pop(task['csv_path'], None)
+
+        files = result['csv_files_processed']
+        rows = result['records_inserted']
+        self.stats['files_ingested'] += files
+        self.stats['rows_inserted'] += rows
+        self.stats['last_ingest_lag'] = round(finished - oldest_mtime, 3)
+        self.stats['last_ingest_rows_per_second'] = round(rows / max(finished - started, 1e-6), 1)
+        self.stats['last_ingest_at'] = datetime.fromtimestamp(finished).isoformat()
+        if result['errors'] or not result['success']:
+            self.stats['ingest_errors'] += 1
+            self.stats['last_error'] = result.get('error') or result['errors'][-1]
+
+        self._ingest_history.append((finished, files, rows))
+        logger.info(f"Vigilància: {files} fitxers inserits ({rows} registres, "
+                    f"retard {self.stats['last_ingest_lag']}s)")
+        return result
+
+    def get_status(self, state: str = 'running') -> Dict:
+        """
+        Retorna l'estat actual del vigilant
+
+        Args:
+            state: Estat a informar ('running' o 'stopped')
+
+        Returns:
+            dict: Retard, profunditat de la cua i rendiment
+        """
+        now = time.time()
+        while self._ingest_history and now - self._ingest_history[0][0] > self.THROUGHPUT_WINDOW_SECONDS:
+            self._ingest_history.popleft()
+
+        window_minutes = self.THROUGHPUT_WINDOW_SECONDS / 60
+        window_files = sum(files for _, files, _ in self._ingest_history)
+        window_rows = sum(rows for _, _, rows in self._ingest_history)
+        oldest_pending = min((candidate['mtime'] for candidate in self._candidates.values()), default=None)
+
+        return {
+            'state': state,
+            'network_path': self.scanner.network_path,
+            'target_table': self.target_table,
+            'pid': os.getpid(),
+            'started_at': self.started_at,
+            'updated_at': datetime.fromtimestamp(now).isoformat(),
+            'poll': {
+                'count': self.stats['polls'],
+                'interval_seconds': self.poll_interval,
+                'last_duration_seconds': self.stats['last_poll_duration'],
+                'directories_tracked': len(self._dir_mtimes),
+                'directories_changed': self.stats['directories_changed']
+            },
+            'queue_depth': len(self._candidates),
+            'lag_seconds': {
+                'last_ingest': self.stats['last_ingest_lag'],
+                'oldest_pending': round(now - oldest_pending, 3) if oldest_pending is not None else None
+            },
+            'throughput': {
+                'files_total': self.stats['files_ingested'],
+                'rows_total': self.stats['rows_inserted'],
+                'files_per_minute': round(window_files / window_minutes, 2),
+                'rows_per_minute': round(window_rows / window_minutes, 2),
+                'last_ingest_rows_per_second': self.stats['last_ingest_rows_per_second'],
+                'last_ingest_at': self.stats['last_ingest_at']
+            },
+            'errors': {
+                'ingest_errors': self.stats['ingest_errors'],
+                'last_error': self.stats['last_error']
+            }
+        }
+
+    def write_status(self, state: str = 'running') -> None:
+        """Escriu l'estat al fitxer JSON de forma atòmica"""
+        try:
+            self.status_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.status_path.with_suffix(self.status_path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.get_status(state), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.status_path)
+        except OSError as e:
+            logger.warning(f"No es pot escriure l'estat del vigilant a {self.status_path}: {e}")
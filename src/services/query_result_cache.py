@@ -0,0 +1,163 @@
+"""
+Query Result Cache
+
+Cache en memòria (per procés) dels resultats de consultes de mesures, amb
+política LRU + TTL. Les dades de mesures només canvien quan s'executa una
+ingestió, de manera que els resultats es poden reutilitzar entre clics de
+la interfície.
+
+La ingestió del mateix procés invalida el cache amb
+invalidate_measurement_cache(); les ingestions d'altres processos (watcher,
+Airflow) es reflecteixen com a màxim al cap de ttl_seconds.
+"""
+
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueryResultCache:
+    """Cache LRU amb caducitat per resultats de consultes"""
+
+    DEFAULT_MAX_ENTRIES = 256
+    DEFAULT_TTL_SECONDS = 300.0
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        """
+        Inicialitza el cache
+
+        Args:
+            max_entries: Nombre màxim d'entrades (les menys usades s'eliminen)
+            ttl_seconds: Vida màxima d'una entrada en segons
+        """
+        self.max_entries = max_entries or self.DEFAULT_MAX_ENTRIES
+        self.ttl_seconds = self.DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Retorna una còpia del valor cachejat o None si no hi és o ha caducat
+
+        Args:
+            key: Clau de la consulta
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            stored_at, value = entry
+            if time.monotonic() - stored_at >= self.ttl_seconds:
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Guarda el resultat d'una consulta
+
+        Args:
+            key: Clau de la consulta
+            value: Resultat (se'n guarda una còpia)
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool] = None) -> int:
+        """
+        Elimina les entrades que compleixen el predicat (o totes si és None)
+
+        Args:
+            predicate: Funció que rep la clau i retorna True si s'ha d'eliminar
+
+        Returns:
+            int: Nombre d'entrades eliminades
+        """
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                stale = [key for key in self._entries if predicate(key)]
+                for key in stale:
+                    del self._entries[key]
+                removed = len(stale)
+            self.stats['invalidations'] += removed
+            return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Comptadors del cache i percentatge d'encerts"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Cache compartit de les consultes de MeasurementHistoryService
+measurement_query_cache = QueryResultCache()
+
+# Funcions que s'han de cridar quan s'invalida el cache (p.ex. índexs derivats)
+_invalidation_listeners = []
+
+
+def register_invalidation_listener(listener: Callable[[Optional[str]], None]) -> None:
+    """
+    Registra una funció que es crida (amb el motiu) cada vegada que s'invalida
+    el cache de mesures
+
+    Args:
+        listener: Funció que rep el motiu de la invalidació
+    """
+    if listener not in _invalidation_listeners:
+        _invalidation_listeners.append(listener)
+
+
+def invalidate_measurement_cache(reason: str = None) -> int:
+    """
+    Invalida tot el cache de consultes de mesures
+
+    S'ha de cridar quan una ingestió escriu mesures noves a la base de dades
+    o quan l'usuari demana refrescar les dades.
+
+    Args:
+        reason: Motiu (només per al log)
+
+    Returns:
+        int: Nombre d'entrades eliminades
+    """
+    removed = measurement_query_cache.invalidate()
+    for listener in list(_invalidation_listeners):
+        try:
+            listener(reason)
+        except Exception as e:
+            logger.warning(f"Error notificant la invalidació del cache: {e}")
+    if removed:
+        logger.info(f"Cache de consultes de mesures invalidat ({removed} entrades)"
+                    f"{f': {reason}' if reason else ''}")
+    return removed
@@ -0,0 +1,195 @@
+"""
+Reference Alias Index
+
+Índex en memòria (per procés) que relaciona cada variant d'una referència
+amb els valors canònics guardats a les taules de mesures. Les variants
+(majúscules, sufixos D/_D, zeros a l'esquerra, formats xxx_yyy_00N i
+002_x_002) es redueixen a una mateixa clau normalitzada, de manera que una
+referència escrita per l'usuari es resol amb una sola consulta al
+diccionari en lloc de provar estratègies de cerca una darrera l'altra.
+
+L'índex es reconstrueix quan caduca o quan una ingestió invalida el cache
+de mesures (invalidate_measurement_cache).
+"""
+
+import re
+import time
+import logging
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from src.services.query_result_cache import register_invalidation_listener
+
+logger = logging.getLogger(__name__)
+
+# Separadors que no formen part de la clau normalitzada
+_SEPARATORS = re.compile(r'[\s\-_./]+')
+# Formats amb prefix i sufix numèrics: 665_220400_002 i 002_220400_002
+_PREFIXED_FORMAT = re.compile(r'^(\d{3})[\s\-_./]?(\d+)[\s\-_./]00[12]$')
+_WRAPPED_FORMAT = re.compile(r'^002[\s\-_./](\d+)[\s\-_./]002$')
+
+
+def normalize_reference(reference: Any) -> str:
+    """
+    Clau normalitzada d'una referència
+
+    Majúscules, sense espais ni separadors i sense zeros a l'esquerra.
+
+    Args:
+        reference: Referència (text o número)
+
+    Returns:
+        str: Clau normalitzada ('' si la referència és buida)
+    """
+    if reference is None:
+        return ''
+    key = _SEPARATORS.sub('', str(reference).strip().upper())
+    return key.lstrip('0') or key
+
+
+def _has_suffix_d(key: str) -> bool:
+    """True si la clau acaba amb el sufix D després d'un dígit (665220400D)"""
+    return len(key) > 1 and key.endswith('D') and key[-2].isdigit()
+
+
+def reference_alias_keys(reference: Any) -> Set[str]:
+    """
+    Totes les claus per les quals s'ha de poder trobar una referència canònica
+
+    Args:
+        reference: Valor canònic de la base de dades
+
+    Returns:
+        set: Claus normalitzades (buit si la referència és buida)
+    """
+    text = str(reference).strip().upper() if reference is not None else ''
+    key = normalize_reference(text)
+    if not key:
+        return set()
+
+    keys = {key}
+    # Sufix D / _D de les referències de client
+    if _has_suffix_d(key):
+        keys.add(key[:-1].lstrip('0') or key[:-1])
+
+    match = _WRAPPED_FORMAT.match(text)
+    if match:
+        keys.add(normalize_reference(match.group(1)))
+    else:
+        match = _PREFIXED_FORMAT.match(text)
+        if match:
+            keys.add(normalize_reference(match.group(1) + match.group(2)))
+    return keys
+
+
+class ReferenceAliasIndex:
+    """Mapa clau normalitzada -> valors canònics de referència per taula"""
+
+    DEFAULT_TTL_SECONDS = 900.0
+
+    def __init__(self, ttl_seconds: float = None):
+        """
+        Inicialitza l'índex (buit i pendent de construir)
+
+        Args:
+            ttl_seconds: Vida màxima de l'índex en segons
+        """
+        self.ttl_seconds = self.DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._aliases: Dict[str, Dict[str, Set[str]]] = {}
+        self._built_at = None
+        self._lock = threading.RLock()
+        self.stats = {'lookups': 0, 'hits': 0, 'misses': 0, 'rebuilds': 0, 'references': 0}
+
+    def is_stale(self) -> bool:
+        """True si l'índex no s'ha construït, ha caducat o s'ha invalidat"""
+        built_at = self._built_at
+        return built_at is None or time.monotonic() - built_at >= self.ttl_seconds
+
+    def mark_stale(self, reason: str = None) -> None:
+        """Força la reconstrucció a la propera consulta"""
+        if self._built_at is not None:
+            logger.debug(f"Índex d'àlies de referència marcat per reconstruir"
+                         f"{f': {reason}' if reason else ''}")
+        self._built_at = None
+
+    def rebuild(self, fetch_references: Callable[[], Iterable[Tuple[str, Any]]]) -> int:
+        """
+        Reconstrueix l'índex
+
+        Args:
+            fetch_references: Funció que retorna parelles (taula, referència canònica)
+
+        Returns:
+            int: Nombre de referències canòniques indexades
+        """
+        start_time = time.perf_counter()
+        aliases: Dict[str, Dict[str, Set[str]]] = defaultdict(lambda: defaultdict(set))
+        references = 0
+        for table_key, reference in fetch_references():
+            if reference is None:
+                continue
+            canonical = str(reference)
+            references += 1
+            for key in reference_alias_keys(canonical):
+                aliases[key][table_key].add(canonical)
+
+        with self._lock:
+            self._aliases = {key: dict(tables) for key, tables in aliases.items()}
+            self._built_at = time.monotonic()
+            self.stats['rebuilds'] += 1
+            self.stats['references'] = references
+
+        logger.info(f"Índex d'àlies de referència construït: {references} referències, "
+                    f"{len(self._aliases)} claus en {(time.perf_counter() - start_time) * 1000:.0f} ms")
+        return references
+
+    def ensure_built(self, fetch_references: Callable[[], Iterable[Tuple[str, Any]]]) -> None:
+        """Reconstrueix l'índex si és necessari (un sol fil alhora)"""
+        if not self.is_stale():
+            return
+        with self._lock:
+            if self.is_stale():
+                self.rebuild(fetch_references)
+
+    def resolve(self, reference: Any, table_keys: List[str] = None) -> List[str]:
+        """
+        Valors canònics que corresponen a una referència escrita per l'usuari
+
+        Args:
+            reference: Referència a resoldre
+            table_keys: Taules a considerar (None = totes)
+
+        Returns:
+            list: Valors canònics ordenats (buida si no hi ha cap coincidència)
+        """
+        key = normalize_reference(reference)
+        lookup_keys = {key}
+        # Si l'usuari escriu el sufix D, també s'accepta la referència base
+        if _has_suffix_d(key):
+            lookup_keys.add(key[:-1].lstrip('0') or key[:-1])
+
+        resolved = set()
+        with self._lock:
+            self.stats['lookups'] += 1
+            for lookup_key in lookup_keys:
+                for table_key, values in self._aliases.get(lookup_key, {}).items():
+                    if table_keys is None or table_key in table_keys:
+                        resolved.update(values)
+            self.stats['hits' if resolved else 'misses'] += 1
+        return sorted(resolved)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Comptadors de l'índex"""
+        with self._lock:
+            return {
+                **self.stats,
+                'keys': len(self._aliases),
+                'stale': self.is_stale(),
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+# Índex compartit de MeasurementHistoryService; una ingestió el marca per reconstruir
+reference_alias_index = ReferenceAliasIndex()
+register_invalidation_listener(reference_alias_index.mark_stale)
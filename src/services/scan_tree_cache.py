@@ -0,0 +1,175 @@
+"""
+Scan Tree Cache
+
+Cache dels llistats de carpetes de la xarxa GOMPC (arrel → clients →
+referències → fitxers) per al NetworkScanner. Per defecte és només en
+memòria; amb cache_path es guarda a disc i es reutilitza entre execucions
+(p.ex. DEFAULT_CACHE_PATH).
+
+Cada carpeta es guarda amb l'mtime que tenia quan es va llistar. Afegir,
+eliminar o reanomenar elements canvia l'mtime de la carpeta, de manera que
+per saber quins CSV té una referència només cal un stat de la carpeta i
+només es tornen a llistar les que han canviat. Només es guarden els noms
+dels elements: la mida i l'mtime de cada fill poden canviar sense que canviï
+l'mtime de la carpeta (p.ex. un fitxer sobreescrit), i qui els necessita
+torna a llistar la carpeta amb scandir. Les entrades caduquen després de
+ttl_seconds i es poden invalidar explícitament.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent.parent / "data" / "cache" / "scan_tree_cache.json"
+
+
+class ScanTreeCache:
+    """Llistats de carpetes cachejats i revalidats per mtime"""
+
+    VERSION = 2
+
+    # Temps màxim de vida d'un llistat encara que l'mtime no canviï
+    DEFAULT_TTL_SECONDS = 3600.0
+
+    # Una carpeta modificada just abans de llistar-la pot canviar dins del mateix
+    # tic d'mtime: aquests llistats no es reutilitzen
+    RACY_WINDOW_SECONDS = 2.0
+
+    def __init__(self, cache_path: str = None, ttl_seconds: float = None):
+        """
+        Inicialitza el cache
+
+        Args:
+            cache_path: Ruta del fitxer JSON del cache (None = només en memòria)
+            ttl_seconds: Vida màxima d'un llistat en segons
+        """
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.ttl_seconds = self.DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def load(self) -> None:
+        """Carrega el cache des de disc (si existeix i és vàlid)"""
+        with self._lock:
+            self._loaded = True
+            if self.cache_path is None or not self.cache_path.exists():
+                return
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') != self.VERSION:
+                    logger.info("Versió del cache d'escaneig diferent, es descarta")
+                    return
+                now = time.time()
+                self._entries = {path: entry for path, entry in data.get('directories', {}).items()
+                                 if now - entry['listed_at'] < self.ttl_seconds}
+                logger.debug(f"Cache d'escaneig carregat: {len(self._entries)} carpetes")
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"No es pot llegir el cache d'escaneig {self.cache_path}: {e}")
+                self._entries = {}
+
+    def save(self) -> None:
+        """Guarda el cache a disc de forma atòmica si ha canviat"""
+        with self._lock:
+            if not self._dirty or self.cache_path is None:
+                return
+            data = {'version': self.VERSION, 'directories': self._entries}
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.cache_path.with_suffix(self.cache_path.suffix + '.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+            except OSError as e:
+                logger.warning(f"No es pot guardar el cache d'escaneig {self.cache_path}: {e}")
+
+    def get(self, directory: str, mtime_ns: int) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Retorna els noms cachejats d'una carpeta si encara són vàlids
+
+        Args:
+            directory: Carpeta
+            mtime_ns: mtime actual de la carpeta (st_mtime_ns)
+
+        Returns:
+            tuple: Còpia de (noms de carpetes, noms de fitxers) o None si cal tornar a llistar
+        """
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            entry = self._entries.get(directory)
+            if (entry is None
+                    or entry['mtime_ns'] != mtime_ns
+                    or time.time() - entry['listed_at'] >= self.ttl_seconds
+                    or entry['listed_at'] - mtime_ns / 1e9 < self.RACY_WINDOW_SECONDS):
+                self.stats['misses'] += 1
+                return None
+
+            self.stats['hits'] += 1
+            return list(entry['folders']), list(entry['files'])
+
+    def put(self, directory: str, mtime_ns: int, folders: List[str], files: List[str],
+            listed_at: float = None) -> None:
+        """
+        Guarda els noms dels elements d'una carpeta
+
+        Args:
+            directory: Carpeta
+            mtime_ns: mtime de la carpeta abans de llistar-la
+            folders: Noms de les subcarpetes
+            files: Noms dels fitxers
+            listed_at: Moment del llistat (per defecte ara)
+        """
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            self._entries[directory] = {
+                'mtime_ns': mtime_ns,
+                'listed_at': listed_at if listed_at is not None else time.time(),
+                'folders': list(folders),
+                'files': list(files)
+            }
+            self._dirty = True
+
+    def invalidate(self, directory: str = None) -> int:
+        """
+        Invalida el llistat d'una carpeta i de totes les seves descendents
+        (o tot el cache si directory és None)
+
+        Args:
+            directory: Carpeta a invalidar
+
+        Returns:
+            int: Nombre d'entrades eliminades
+        """
+        if not self._loaded:
+            self.load()
+
+        with self._lock:
+            if directory is None:
+                removed = len(self._entries)
+                self._entries = {}
+            else:
+                prefix = directory.rstrip('\\/') + os.sep
+                stale = [path for path in self._entries if path == directory or path.startswith(prefix)]
+                for path in stale:
+                    del self._entries[path]
+                removed = len(stale)
+            if removed:
+                self._dirty = True
+            return removed
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -16,9 +16,10 @@ Data: Juliol 2025
 """
 
 import logging
+import numpy as np
 import pandas as pd
 import re
-from typing import Any, Union, Optional
+from typing import Any, Union, Optional, Tuple
 from decimal import Decimal, InvalidOperation
 import unicodedata
 
@@ -65,6 +66,22 @@ class ValueCleaner:
         ''': "'",    # Cometes simples curvades
     }
     
+    # Taula de traducció precompilada per als reemplaçaments d'un sol caràcter.
+    # Tots generen ASCII, de manera que aplicar-los alhora equival a aplicar-los
+    # en ordre; els de més d'un caràcter (van al final del diccionari) s'apliquen després.
+    UNICODE_TRANSLATION = str.maketrans({char: replacement for char, replacement in UNICODE_REPLACEMENTS.items()
+                                         if len(char) == 1})
+    UNICODE_MULTI_CHAR_REPLACEMENTS = [(chars, replacement) for chars, replacement in UNICODE_REPLACEMENTS.items()
+                                       if len(chars) != 1]
+    
+    # Expressions regulars precompilades per als passos vectoritzats
+    TEMPLATE_REGEX = '|'.join(re.escape(pattern) for pattern in TEMPLATE_PATTERNS)
+    NON_ASCII_REGEX = r'[^\x00-\x7f]'
+    NON_NUMERIC_REGEX = r'[^\d.,+-]'
+    LAST_SEPARATOR_REGEX = r'^(.*)[.,]([^.,]*)$'
+    # Text que astype('float64') converteix igual que float()
+    DECIMAL_REGEX = r'[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)'
+    
     @staticmethod
     def normalize_unicode_text(text: str) -> str:
         """
@@ -82,8 +99,9 @@ class ValueCleaner:
         text_str = str(text)
         
         # Aplicar reemplaçaments específics
-        for unicode_char, replacement in ValueCleaner.UNICODE_REPLACEMENTS.items():
-            text_str = text_str.replace(unicode_char, replacement)
+        text_str = text_str.translate(ValueCleaner.UNICODE_TRANSLATION)
+        for unicode_chars, replacement in ValueCleaner.UNICODE_MULTI_CHAR_REPLACEMENTS:
+            text_str = text_str.replace(unicode_chars, replacement)
         
         # Normalitzar Unicode (NFD = Normalization Form Decomposed)
         # Això separa caràcters amb accents en lletra base + accent
@@ -91,7 +109,7 @@ class ValueCleaner:
         
         # Eliminar tots els caràcters que no són ASCII
         # Mantenim només caràcters del rang ASCII estàndard
-        text_str = ''.join(char for char in text_str if ord(char) < 128)
+        text_str = text_str.encode('ascii', 'ignore').decode('ascii')
         
         return text_str.strip()
     
@@ -213,6 +231,255 @@ class ValueCleaner:
             logger.debug(f"Valor '{value_str}' no convertible: {e}, usant {default_value}")
             return default_value
     
+    @staticmethod
+    def _text_view(series: pd.Series) -> Tuple[Optional[pd.Series], Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        Prepara una columna de text per als passos vectoritzats
+        
+        Els valors no buits es factoritzen: la neteja es fa una sola vegada per
+        valor diferent (les columnes de nominals i toleràncies es repeteixen molt).
+        
+        Args:
+            series: Columna a analitzar
+            
+        Returns:
+            tuple: (valors únics amb índex posicional, codi de cada valor no buit,
+                    posicions dels valors no buits dins de la columna)
+                   o (None, None, None) si la columna no és de text pur i cal el camí per cel·la
+        """
+        values = series.to_numpy(dtype=object)
+        if len(values) == 0 or pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+            return None, None, None
+        
+        valid = ~pd.isna(values)
+        valid[valid] = values[valid] != ''
+        positions = np.flatnonzero(valid)
+        codes, uniques = pd.factorize(values[positions])
+        return pd.Series(uniques, dtype=object), codes, positions
+    
+    @staticmethod
+    def _normalize_text_values(text: pd.Series) -> pd.Series:
+        """Versió vectoritzada de normalize_unicode_text per a text no buit"""
+        for unicode_chars, replacement in ValueCleaner.UNICODE_MULTI_CHAR_REPLACEMENTS:
+            text = text.str.replace(unicode_chars, replacement, regex=False)
+        
+        # Només els valors amb caràcters no ASCII necessiten traducció i NFD
+        non_ascii = text.str.contains(ValueCleaner.NON_ASCII_REGEX, regex=True)
+        if non_ascii.any():
+            text = text.copy()
+            text[non_ascii] = (text[non_ascii]
+                               .str.translate(ValueCleaner.UNICODE_TRANSLATION)
+                               .str.normalize('NFD')
+                               .str.encode('ascii', 'ignore')
+                               .str.decode('ascii'))
+        
+        return text.str.strip()
+    
+    @staticmethod
+    def normalize_unicode_series(series: pd.Series) -> pd.Series:
+        """
+        Aplica normalize_unicode_text a tota una columna amb operacions vectoritzades
+        
+        Args:
+            series: Columna a normalitzar
+            
+        Returns:
+            pd.Series: Mateix resultat que series.apply(normalize_unicode_text)
+        """
+        uniques, codes, positions = ValueCleaner._text_view(series)
+        if uniques is None:
+            return series.apply(ValueCleaner.normalize_unicode_text)
+        
+        result = np.full(len(series), "", dtype=object)
+        result[positions] = ValueCleaner._normalize_text_values(uniques).to_numpy(dtype=object)[codes]
+        return pd.Series(result, index=series.index, name=series.name)
+    
+    @staticmethod
+    def clean_element_series(series: pd.Series) -> pd.Series:
+        """
+        Aplica clean_element_value a tota una columna amb operacions vectoritzades
+        
+        Args:
+            series: Columna d'element
+            
+        Returns:
+            pd.Series: Mateix resultat que series.apply(clean_element_value)
+        """
+        uniques, codes, positions = ValueCleaner._text_view(series)
+        if uniques is None:
+            return series.apply(ValueCleaner.clean_element_value)
+        
+        cleaned_uniques = np.full(len(uniques), "NULL", dtype=object)
+        
+        text = uniques.str.strip()
+        text = text[~text.str.lower().isin(ValueCleaner.INVALID_PATTERNS)]
+        
+        # Treure els patrons de plantilla (si no queda res, és NULL)
+        has_template = text.str.contains(ValueCleaner.TEMPLATE_REGEX, regex=True)
+        if has_template.any():
+            cleaned = text[has_template]
+            for pattern in ValueCleaner.TEMPLATE_PATTERNS:
+                cleaned = cleaned.str.replace(pattern, '', regex=False)
+            text = text.copy()
+            text[has_template] = cleaned.str.strip()
+            text = text[~has_template | (text != '')]
+        
+        normalized = ValueCleaner._normalize_text_values(text)
+        cleaned_uniques[normalized.index.to_numpy()] = normalized.to_numpy(dtype=object)
+        
+        result = np.full(len(series), "NULL", dtype=object)
+        result[positions] = cleaned_uniques[codes]
+        return pd.Series(result, index=series.index, name=series.name)
+    
+    @staticmethod
+    def clean_numeric_series(series: pd.Series, default_value: float = 0.000) -> pd.Series:
+        """
+        Aplica clean_numeric_value a tota una columna amb operacions vectoritzades
+        
+        Args:
+            series: Columna numèrica (text amb format europeu o anglès)
+            default_value: Valor per defecte si no es pot convertir
+            
+        Returns:
+            pd.Series: Mateix resultat que series.apply(clean_numeric_value)
+        """
+        return ValueCleaner.parse_numeric_series(series, default_value)[0]
+    
+    @staticmethod
+    def parse_numeric_series(series: pd.Series, default_value: float = 0.000) -> Tuple[pd.Series, dict]:
+        """
+        Com clean_numeric_series, però també retorna els comptadors de conversió
+        
+        Args:
+            series: Columna numèrica (text amb format europeu o anglès)
+            default_value: Valor per defecte si no es pot convertir
+            
+        Returns:
+            tuple: (sèrie convertida, estadístiques) amb total, empty (nuls,
+                   invàlids i plantilles), converted (vectoritzat), fallback
+                   (float() per valor), failed i conversion_rate
+        """
+        if pd.api.types.is_float_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+            result = ValueCleaner._clean_numeric_dtype(series, default_value)
+            empty = int(series.isna().sum())
+            return result, ValueCleaner._conversion_stats(
+                total=len(series), empty=empty, converted=len(series) - empty, fallback=0, failed=0
+            )
+        
+        uniques, codes, positions = ValueCleaner._text_view(series)
+        if uniques is None:
+            # Columna mixta: camí per cel·la (tot compta com a fallback)
+            result = series.apply(ValueCleaner.clean_numeric_value, default_value=default_value)
+            empty = int(series.isna().sum())
+            return result, ValueCleaner._conversion_stats(
+                total=len(series), empty=empty, converted=0, fallback=len(series) - empty, failed=0
+            )
+        
+        cleaned_uniques = np.full(len(uniques), default_value, dtype=float)
+        
+        text = uniques.str.strip()
+        text = text[~text.str.lower().isin(ValueCleaner.INVALID_PATTERNS)
+                    & ~text.str.contains(ValueCleaner.TEMPLATE_REGEX, regex=True)]
+        
+        text = ValueCleaner._normalize_text_values(text)
+        text = (text.str.replace(' ', '', regex=False)
+                    .str.replace(ValueCleaner.NON_NUMERIC_REGEX, '', regex=True))
+        text = text[~text.isin(['', '+', '-', '.', ','])]
+        attempted = text.index.to_numpy()
+        
+        # Format europeu: "123,45" -> "123.45"; amb tots dos separadors,
+        # l'últim és el decimal i els altres es treuen ("1.234,56" -> "1234.56")
+        has_comma = text.str.contains(',', regex=False)
+        has_dot = text.str.contains('.', regex=False)
+        if has_comma.any():
+            text = text.copy()
+            comma_only = has_comma & ~has_dot
+            text[comma_only] = text[comma_only].str.replace(',', '.', regex=False)
+            both = has_comma & has_dot
+            if both.any():
+                parts = text[both].str.extract(ValueCleaner.LAST_SEPARATOR_REGEX)
+                text[both] = (parts[0].str.replace('.', '', regex=False).str.replace(',', '', regex=False)
+                              + '.' + parts[1])
+        
+        # Conversió vectoritzada del text amb sintaxi decimal ASCII; la resta
+        # (dígits Unicode, "1.2.3", "5-") passa per float() valor a valor
+        numbers, fallback = ValueCleaner._convert_decimal_text(text)
+        converted = np.isfinite(numbers)
+        cleaned_uniques[text.index.to_numpy()[converted]] = numbers[converted]
+        
+        result = np.full(len(series), default_value, dtype=float)
+        result[positions] = cleaned_uniques[codes]
+        
+        # Comptadors per files: cada valor únic compta tantes vegades com apareix
+        rows_per_unique = np.bincount(codes, minlength=len(uniques))
+        attempted = rows_per_unique[text.index.to_numpy()]
+        stats = ValueCleaner._conversion_stats(
+            total=len(series),
+            empty=len(series) - int(attempted.sum()),
+            converted=int(attempted[converted & ~fallback].sum()),
+            fallback=int(attempted[converted & fallback].sum()),
+            failed=int(attempted[~converted].sum())
+        )
+        return pd.Series(result, index=series.index, name=series.name), stats
+    
+    @staticmethod
+    def _convert_decimal_text(text: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Converteix text numèric net a float
+        
+        El text que compleix DECIMAL_REGEX es converteix d'una vegada amb
+        astype('float64'), que arrodoneix igual que float(); la resta es
+        prova amb float() valor a valor.
+        
+        Args:
+            text: Valors de text sense nuls
+            
+        Returns:
+            tuple: (floats amb NaN si no es pot convertir, màscara dels valors
+                    que han passat per float())
+        """
+        numbers = np.full(len(text), np.nan)
+        direct = text.str.fullmatch(ValueCleaner.DECIMAL_REGEX).to_numpy(dtype=bool)
+        if direct.any():
+            numbers[direct] = text[direct].astype('float64').to_numpy()
+        fallback = ~direct
+        for position in np.flatnonzero(fallback):
+            try:
+                numbers[position] = float(text.iat[position])
+            except (ValueError, OverflowError):
+                pass
+        return numbers, fallback
+    
+    @staticmethod
+    def _conversion_stats(total: int, empty: int, converted: int, fallback: int, failed: int) -> dict:
+        """Estadístiques d'una conversió de columna (comptades per files)"""
+        attempted = total - empty
+        return {
+            'total': total,
+            'empty': empty,
+            'converted': converted,
+            'fallback': fallback,
+            'failed': failed,
+            'conversion_rate': round((converted + fallback) / attempted * 100, 1) if attempted else 0.0
+        }
+    
+    @staticmethod
+    def _clean_numeric_dtype(series: pd.Series, default_value: float) -> pd.Series:
+        """
+        clean_numeric_value per a columnes que ja són numèriques
+        
+        El camí escalar passa pel text del valor: 0 i NaN donen el valor per
+        defecte, i els floats que str() escriu en notació científica
+        (|x| < 1e-4 o |x| >= 1e16) no es poden llegir i també el donen.
+        """
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        valid = np.isfinite(values) & (values != 0)
+        if pd.api.types.is_float_dtype(series.dtype):
+            magnitude = np.abs(values)
+            valid &= (magnitude >= 1e-4) & (magnitude < 1e16)
+        result = np.where(valid, values, default_value)
+        return pd.Series(result, index=series.index, name=series.name)
+    
     @staticmethod
     def clean_dataframe_columns(df: pd.DataFrame, 
                                element_col: str = None, 
@@ -220,7 +487,7 @@ class ValueCleaner:
                                nominal_col: str = None,
                                tolerance_col: str = None) -> pd.DataFrame:
         """
-        Neteja les columnes d'un DataFrame
+        Neteja les columnes d'un DataFrame (columnes senceres, sense bucles per cel·la)
         
         Args:
             df: DataFrame a netejar
@@ -236,22 +503,51 @@ class ValueCleaner:
         
         # Netejar columna d'element
         if element_col and element_col in df_clean.columns:
-            df_clean[element_col] = df_clean[element_col].apply(ValueCleaner.clean_element_value)
+            df_clean[element_col] = ValueCleaner.clean_element_series(df_clean[element_col])
         
         # Netejar columnes numèriques
-        numeric_columns = []
-        if actual_col and actual_col in df_clean.columns:
-            numeric_columns.append(actual_col)
-        if nominal_col and nominal_col in df_clean.columns:
-            numeric_columns.append(nominal_col)
-        if tolerance_col and tolerance_col in df_clean.columns:
-            numeric_columns.append(tolerance_col)
-            
-        for col in numeric_columns:
-            df_clean[col] = df_clean[col].apply(ValueCleaner.clean_numeric_value)
+        for col in ValueCleaner._numeric_columns(df_clean, actual_col, nominal_col, tolerance_col):
+            df_clean[col] = ValueCleaner.clean_numeric_series(df_clean[col])
         
         return df_clean
     
+    @staticmethod
+    def clean_dataframe_with_report(df: pd.DataFrame,
+                                    element_col: str = None,
+                                    actual_col: str = None,
+                                    nominal_col: str = None,
+                                    tolerance_col: str = None) -> Tuple[pd.DataFrame, dict, dict]:
+        """
+        Neteja un DataFrame i retorna els comptadors de problemes d'abans i després
+        
+        Equival a detect_problematic_values + clean_dataframe_columns +
+        detect_problematic_values, però les columnes no netejades només s'analitzen una vegada.
+        
+        Returns:
+            tuple: (DataFrame net, problemes abans, problemes després)
+        """
+        column_problems = {col: ValueCleaner._count_column_problems(df[col])
+                           for col in df.select_dtypes(include=['object']).columns}
+        problems_before = ValueCleaner._sum_problems(column_problems.values(), len(df))
+        
+        df_clean = ValueCleaner.clean_dataframe_columns(df, element_col, actual_col, nominal_col, tolerance_col)
+        
+        cleaned_columns = {element_col, *ValueCleaner._numeric_columns(df_clean, actual_col, nominal_col, tolerance_col)}
+        after = []
+        for col in df_clean.select_dtypes(include=['object']).columns:
+            if col in cleaned_columns or col not in column_problems:
+                after.append(ValueCleaner._count_column_problems(df_clean[col]))
+            else:
+                after.append(column_problems[col])
+        problems_after = ValueCleaner._sum_problems(after, len(df_clean))
+        
+        return df_clean, problems_before, problems_after
+    
+    @staticmethod
+    def _numeric_columns(df: pd.DataFrame, *columns: str) -> list:
+        """Columnes numèriques indicades que existeixen al DataFrame"""
+        return [col for col in columns if col and col in df.columns]
+    
     @staticmethod
     def detect_problematic_values(df: pd.DataFrame) -> dict:
         """
@@ -263,26 +559,59 @@ class ValueCleaner:
         Returns:
             dict: Resum de valors problemàtics trobats
         """
+        # Comptar patrons problemàtics en totes les columnes de text
+        column_problems = [ValueCleaner._count_column_problems(df[col])
+                           for col in df.select_dtypes(include=['object']).columns]
+        return ValueCleaner._sum_problems(column_problems, len(df))
+    
+    @staticmethod
+    def _sum_problems(column_problems, total_rows: int) -> dict:
+        """Suma els comptadors de problemes de cada columna"""
         problems = {
             'template_patterns': 0,
             'invalid_patterns': 0,
             'decimal_issues': 0,
-            'total_rows': len(df)
+            'total_rows': total_rows
         }
+        for counts in column_problems:
+            for key in ('template_patterns', 'invalid_patterns', 'decimal_issues'):
+                problems[key] += counts[key]
+        return problems
+    
+    @staticmethod
+    def _count_column_problems(series: pd.Series) -> dict:
+        """
+        Compta els valors problemàtics d'una columna
         
-        # Comptar patrons problemàtics en totes les columnes de text
-        for col in df.select_dtypes(include=['object']).columns:
-            for _, value in df[col].items():
+        Cada valor compta una sola vegada: plantilla, si no invàlid, si no problema decimal.
+        """
+        counts = {'template_patterns': 0, 'invalid_patterns': 0, 'decimal_issues': 0}
+        
+        uniques, codes, _ = ValueCleaner._text_view(series)
+        if uniques is None:
+            # Columnes amb tipus barrejats: anàlisi per cel·la
+            for value in series:
                 if not value or pd.isna(value):
                     continue
-                    
+                
                 value_str = str(value)
                 
                 if any(pattern in value_str for pattern in ValueCleaner.TEMPLATE_PATTERNS):
-                    problems['template_patterns'] += 1
+                    counts['template_patterns'] += 1
                 elif value_str.lower() in ValueCleaner.INVALID_PATTERNS:
-                    problems['invalid_patterns'] += 1
+                    counts['invalid_patterns'] += 1
                 elif ',' in value_str or ('.' in value_str and value_str.count('.') > 1):
-                    problems['decimal_issues'] += 1
+                    counts['decimal_issues'] += 1
+            return counts
         
-        return problems
+        # Classificar cada valor únic i ponderar pel nombre d'aparicions
+        occurrences = np.bincount(codes, minlength=len(uniques))
+        template = uniques.str.contains(ValueCleaner.TEMPLATE_REGEX, regex=True).to_numpy(dtype=bool)
+        invalid = ~template & uniques.str.lower().isin(ValueCleaner.INVALID_PATTERNS).to_numpy(dtype=bool)
+        decimal = (~template & ~invalid
+                   & (uniques.str.contains(',', regex=False) | (uniques.str.count(r'\.') > 1)).to_numpy(dtype=bool))
+        
+        counts['template_patterns'] = int(occurrences[template].sum())
+        counts['invalid_patterns'] = int(occurrences[invalid].sum())
+        counts['decimal_issues'] = int(occurrences[decimal].sum())
+        return counts
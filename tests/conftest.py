@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Fixtures compartides pels tests d'ingestió del NetworkScanner
+"""
+
+import threading
+from pathlib import Path
+
+import pytest
+
+
+def _create_share(root: Path, n_refs: int = 3, n_lots: int = 6) -> None:
+    """Crear una estructura CLIENT/REFERENCIA amb diversos CSV"""
+    for r in range(n_refs):
+        ref_dir = root / "AUTOLIV" / f"66522040{r}"
+        ref_dir.mkdir(parents=True)
+        for l in range(n_lots):
+            rows = "\n".join(f"ELEM {i};{10 + i / 100:.2f}".replace('.', ',') + ";10,00" for i in range(l + 2))
+            (ref_dir / f"LOT{r}{l:03d}_2023_01_{l + 1:02d}_10_00_00.csv").write_text(
+                "Element;Actual;Nominal\n" + rows + "\n", encoding="utf-8")
+    # Un fitxer amb nom invàlid ha d'acabar a processing_errors
+    (root / "AUTOLIV" / "665220400" / "invalid_name.csv").write_text("a;b\n1;2\n", encoding="utf-8")
+
+
+class RecordingAdapter:
+    """Adapter en memòria que registra els lots rebuts"""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+        self.closed = False
+
+    def prepare_dataset_for_insertion(self, df):
+        return df
+
+    def insert_dataset(self, df):
+        self.threads.add(threading.current_thread().name)
+        self.batches.append(df)
+        return {'success': True, 'records_inserted': len(df), 'skipped_records': 0, 'errors': []}
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def create_share():
+    """Funció que crea un share de prova: create_share(root, n_refs=3, n_lots=6)"""
+    return _create_share
+
+
+@pytest.fixture
+def recording_adapter():
+    """Adapter de BBDD en memòria (RecordingAdapter)"""
+    return RecordingAdapter()
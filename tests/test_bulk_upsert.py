@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests de la inserció per COPY + merge del QualityMeasurementDBAdapter
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.pending.append(('execute', sql))
+
+    def copy_expert(self, sql, buffer):
+        data = buffer.read()
+        if 'FAIL' in data:
+            raise RuntimeError("valor invàlid")
+        self.connection.pending.append(('copy', data))
+
+
+class RecordingConnection:
+    """Connexió en memòria que registra les transaccions confirmades"""
+
+    def __init__(self):
+        self.autocommit = True
+        self.pending = []
+        self.committed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.committed.append(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+        self.rollbacks += 1
+
+
+def make_adapter():
+    adapter = QualityMeasurementDBAdapter({'host': 'localhost'})
+    adapter.connection = RecordingConnection()
+    # Els agregats es proven a test_measurement_aggregates.py
+    adapter.update_aggregates = False
+    adapter.get_current_table_structure = lambda: {
+        'id_referencia_some': {}, 'id_element': {}, 'actual': {}, 'element': {}
+    }
+    return adapter
+
+
+def test_copy_insert_isolates_failing_batches():
+    adapter = make_adapter()
+    df = pd.DataFrame({
+        'id_referencia_some': ['R1', 'R1', 'R2', 'R3'],
+        'id_element': ['E1', 'E2', 'E1', 'E1'],
+        'actual': [1.5, None, 2.0, 3.0],
+        'element': ['A', '', 'FAIL', 'B'],
+        'extra': [1, 2, 3, 4],
+    })
+
+    result = adapter.insert_dataset(df, batch_size=2)
+
+    assert result['method'] == 'copy'
+    assert result['success'] is False
+    assert result['records_inserted'] == 2
+    assert result['skipped_records'] == 2
+    assert len(result['errors']) == 1
+    assert result['total_processed'] == 4
+    assert result['rows_per_second'] > 0
+
+    # Creació de la staging + un únic lot confirmat (COPY + merge) + eliminació de la staging;
+    # l'altre lot, rollback
+    assert len(adapter.connection.committed) == 3
+    (_, copied), (_, merge_sql) = adapter.connection.committed[1]
+    assert adapter.connection.committed[2] == [('execute', 'DROP TABLE IF EXISTS pg_temp.stg_mesuresqualitat')]
+    assert copied.splitlines() == ['R1,E1,1.5,A', 'R1,E2,\\N,']
+    assert 'SELECT id_referencia_some, id_element, actual, element FROM stg_mesuresqualitat' in merge_sql
+    assert 'ON CONFLICT (id_referencia_some, id_element)' in merge_sql
+    assert adapter.connection.autocommit is True
+
+
+def test_copy_insert_keeps_last_duplicate_key():
+    adapter = make_adapter()
+    df = pd.DataFrame({
+        'id_referencia_some': ['R1', 'R1'],
+        'id_element': ['E1', 'E1'],
+        'actual': [1.0, 2.0],
+        'element': ['A', 'B'],
+    })
+
+    result = adapter.insert_dataset(df)
+
+    assert result['success'] is True
+    (_, copied), _ = adapter.connection.committed[1]
+    assert copied.splitlines() == ['R1,E1,2.0,B']
+
+
+class SessionConnection(RecordingConnection):
+    """Connexió reutilitzada (com les del pool): les taules temporals hi sobreviuen"""
+
+    def __init__(self, table_columns):
+        super().__init__()
+        self.table_columns = table_columns
+        self.staging_columns = None
+
+    def cursor(self):
+        return SessionCursor(self)
+
+
+class SessionCursor(RecordingCursor):
+    def execute(self, sql, params=None):
+        super().execute(sql, params)
+        if sql.startswith('DROP TABLE IF EXISTS pg_temp.stg_mesuresqualitat'):
+            self.connection.staging_columns = None
+        elif 'CREATE TEMP TABLE' in sql and 'stg_mesuresqualitat' in sql:
+            if self.connection.staging_columns is None:
+                self.connection.staging_columns = list(self.connection.table_columns)
+            elif 'IF NOT EXISTS' not in sql:
+                raise RuntimeError("la taula stg_mesuresqualitat ja existeix")
+
+    def copy_expert(self, sql, buffer):
+        columns = sql[sql.index('(') + 1:sql.index(')')].split(', ')
+        missing = [col for col in columns if col not in self.connection.staging_columns]
+        if missing:
+            raise RuntimeError(f"la columna {missing[0]} no existeix a stg_mesuresqualitat")
+        super().copy_expert(sql, buffer)
+
+
+def test_staging_follows_schema_changes_on_reused_connection():
+    adapter = make_adapter()
+    structure = {'id_referencia_some': {}, 'id_element': {}, 'actual': {}}
+    adapter.connection = SessionConnection(structure)
+    adapter.get_current_table_structure = lambda: structure
+    df = pd.DataFrame({'id_referencia_some': ['R1'], 'id_element': ['E1'], 'actual': [1.0], 'element': ['A']})
+
+    assert adapter.insert_dataset(df)['records_inserted'] == 1
+
+    # update_table_schema afegeix una columna; la connexió (i la sessió) és la mateixa
+    structure['element'] = {}
+    result = adapter.insert_dataset(df)
+
+    assert result['success'] is True and result['records_inserted'] == 1
+    assert adapter.connection.staging_columns is None
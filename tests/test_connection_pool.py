@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests del pool de connexions compartit (sense base de dades real)
+"""
+
+import sys
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database import connection_pool
+from src.database.connection_pool import PooledConnectionProvider
+from src.database.database_connection import PostgresConn
+
+
+class FakeConnection:
+    """Connexió en memòria amb la interfície que fa servir el pool"""
+
+    opened = 0
+
+    def __init__(self, **params):
+        FakeConnection.opened += 1
+        self.params = params
+        self.closed = 0
+        self.autocommit = False
+        self.resets = 0
+        self.healthy = True
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query, params=None):
+                if not connection.healthy:
+                    raise psycopg2.OperationalError("server closed the connection")
+
+        return Cursor()
+
+    def reset(self):
+        self.resets += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    FakeConnection.opened = 0
+    monkeypatch.setattr(psycopg2, 'connect', FakeConnection)
+    yield
+    connection_pool.close_all_pools()
+
+
+PARAMS = {'host': 'db', 'database': 'qualitat', 'user': 'u', 'password': 'p', 'port': 5432}
+
+
+def test_postgres_conn_reuses_pooled_connection(fake_connect):
+    first = PostgresConn(**PARAMS)
+    conn = first.connect()
+    conn.autocommit = True
+    first.close()
+
+    second = PostgresConn(**PARAMS)
+    assert second.connect() is conn
+    assert conn.resets == 1 and conn.autocommit is False
+    second.close()
+
+    status = connection_pool.get_connection_pool(PARAMS).get_status()
+    assert status['checkouts'] == 2
+    assert status['in_use_connections'] == 0
+
+
+def test_checkout_waits_when_pool_is_full(fake_connect):
+    provider = PooledConnectionProvider(PARAMS, min_connections=1, max_connections=1,
+                                        checkout_timeout=0.05)
+    conn = provider.getconn()
+    with pytest.raises(PoolError):
+        provider.getconn()
+
+    released = threading.Timer(0.05, provider.putconn, args=(conn,))
+    provider.checkout_timeout = 5
+    released.start()
+    assert provider.getconn() is conn
+    provider.putconn(conn)
+    assert provider.stats['waits'] == 2
+    provider.closeall()
+
+
+def test_idle_and_broken_connections_are_replaced(fake_connect):
+    provider = PooledConnectionProvider(PARAMS, min_connections=1, max_connections=2,
+                                        max_idle_seconds=60, health_check_seconds=0)
+    conn = provider.getconn()
+    provider.putconn(conn)
+
+    conn.healthy = False
+    replacement = provider.getconn()
+    assert replacement is not conn and conn.closed
+    assert provider.stats['health_check_failures'] == 1
+    provider.putconn(replacement)
+
+    provider.max_idle_seconds = 0
+    recycled = provider.getconn()
+    assert recycled is not replacement and replacement.closed
+    assert provider.stats['recycled'] == 1
+    provider.putconn(recycled)
+    provider.closeall()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests de la còpia COPY TO -> COPY FROM amb buffer acotat (sense base de dades real)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.copy_stream import stream_copy
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, sql, file, size=8192):
+        self.connection.statements.append(sql)
+        self.rowcount = self.connection.copy(file, size)
+
+
+class SourceConnection:
+    """COPY TO: escriu una fila per crida a write(), com psycopg2"""
+
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def copy(self, file, size):
+        for number, row in enumerate(self.rows):
+            if number == self.fail_after:
+                raise RuntimeError("connexió perduda")
+            file.write(row)
+        return len(self.rows)
+
+
+class TargetConnection:
+    """COPY FROM: llegeix blocs de `size` bytes fins a b''"""
+
+    def __init__(self, fail_after_bytes=None):
+        self.fail_after_bytes = fail_after_bytes
+        self.statements = []
+        self.received = bytearray()
+        self.max_pending = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def copy(self, file, size):
+        while True:
+            self.max_pending = max(self.max_pending, file._queue.qsize())
+            data = file.read(size)
+            if not data:
+                return self.received.count(b'\n')
+            self.received += data
+            if self.fail_after_bytes is not None and len(self.received) >= self.fail_after_bytes:
+                raise RuntimeError("violació de clau")
+
+
+def make_rows(count):
+    return [f"AUTOLIV\t2025-01-31 22:01:00\tLOT{number:06d}\t10.0{number % 10}\n".encode('utf-8')
+            for number in range(count)]
+
+
+def test_rows_are_streamed_in_order_through_bounded_buffer():
+    rows = make_rows(20000)
+    source, target = SourceConnection(rows), TargetConnection()
+
+    stats = stream_copy(source, target, "SELECT client, data_hora, id_lot, actual FROM qualitat.mesureshoytom",
+                        'stg_sync_mesureshoytom', ['client', 'data_hora', 'id_lot', 'actual'],
+                        chunk_size=4096, max_chunks=2)
+
+    assert bytes(target.received) == b''.join(rows)
+    assert stats['rows'] == 20000
+    assert stats['bytes'] == len(target.received)
+    assert stats['rows_per_second'] > 0
+    assert target.max_pending <= 2
+    assert source.statements[0].startswith("COPY (SELECT client") and 'TO STDOUT WITH (FORMAT text)' in source.statements[0]
+    assert target.statements[0] == ("COPY stg_sync_mesureshoytom (client, data_hora, id_lot, actual) "
+                                    "FROM STDIN WITH (FORMAT text)")
+
+
+def test_source_error_is_raised_and_target_copy_aborted():
+    source, target = SourceConnection(make_rows(5000), fail_after=3000), TargetConnection()
+
+    with pytest.raises(RuntimeError, match="connexió perduda"):
+        stream_copy(source, target, "SELECT 1", 'stg', ['a'], copy_format='binary', chunk_size=1024)
+
+    assert 'FORMAT binary' in target.statements[0]
+
+
+def test_target_error_stops_the_source():
+    source, target = SourceConnection(make_rows(100000)), TargetConnection(fail_after_bytes=10000)
+
+    with pytest.raises(RuntimeError, match="violació de clau"):
+        stream_copy(source, target, "SELECT 1", 'stg', ['a'], chunk_size=1024, max_chunks=2)
+
+    assert len(target.received) < 20000
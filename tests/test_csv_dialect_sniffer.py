@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Tests de la detecció del dialecte dels CSV (encoding + separador) per carpeta
+"""
+
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+
+
+def test_dialect_is_sniffed_once_per_folder(tmp_path, create_share):
+    create_share(tmp_path, n_refs=2, n_lots=4)
+    latin_dir = tmp_path / "AUTOLIV" / "665220409"
+    latin_dir.mkdir()
+    (latin_dir / "LOT9000_2023_01_01_10_00_00.csv").write_bytes(
+        "Element,Actual\nALÇADA 1,10.5\n".encode("windows-1252"))
+
+    scanner = NetworkScanner(str(tmp_path), read_workers=1, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    result = scanner.process_all_csv_files()
+
+    assert result['csv_files_processed'] == 9
+    # Un sniff per carpeta; la resta de fitxers reutilitzen el dialecte cachejat
+    assert scanner.csv_sniffer.stats['sniffed'] == 3
+    assert scanner.csv_sniffer.stats['cache_hits'] == 6
+    assert scanner.csv_sniffer.stats['fallbacks'] == 0
+    dataset = scanner.get_global_dataset()
+    assert "ALCADA 1" in set(dataset['Element'])
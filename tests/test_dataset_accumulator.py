@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests de l'acumulador del dataset global
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.dataset_accumulator import DatasetAccumulator
+
+
+def make_frames(n_files: int, rows: int = 3):
+    return [pd.DataFrame({'Element': [f"E{i}" for i in range(rows)], 'LOT': f"LOT{n}"})
+            for n in range(n_files)]
+
+
+def test_materialize_matches_repeated_concat():
+    frames = make_frames(10)
+    accumulator = DatasetAccumulator()
+    for df in frames:
+        accumulator.append(df)
+
+    expected = pd.concat(frames, ignore_index=True)
+    pd.testing.assert_frame_equal(accumulator.materialize(), expected)
+    assert accumulator.total_rows == 30
+    assert accumulator.columns == ['Element', 'LOT']
+
+
+def test_spilled_chunks_keep_order(tmp_path):
+    frames = make_frames(10)
+    accumulator = DatasetAccumulator(flush_rows=7, spill_dir=str(tmp_path))
+    for df in frames:
+        accumulator.append(df)
+
+    chunks = list(accumulator.iter_chunks())
+    assert len(chunks) == accumulator.num_chunks > 1
+    assert sum(len(chunk) for chunk in chunks) == 30
+    pd.testing.assert_frame_equal(accumulator.materialize(), pd.concat(frames, ignore_index=True))
+
+    accumulator.clear()
+    assert accumulator.total_rows == 0
+    assert not list(tmp_path.glob("chunk_*.pkl"))
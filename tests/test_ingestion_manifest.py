@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests del manifest d'ingestió incremental del NetworkScanner
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.ingestion_manifest import IngestionManifest
+from src.services.network_scanner import NetworkScanner
+
+CSV_CONTENT = "Element;Actual;Nominal\nDIAM 1;10,02;10,00\nDIAM 2;5,01;5,00\n"
+
+
+def create_share(root: Path) -> Path:
+    """Crear una estructura mínima CLIENT/REFERENCIA/LOT_data.csv"""
+    ref_dir = root / "AUTOLIV" / "665220400"
+    ref_dir.mkdir(parents=True)
+    (ref_dir / "1200135A_2023_01_31_22_01_56.csv").write_text(CSV_CONTENT, encoding="utf-8")
+    (ref_dir / "1200136B_2023_02_01_08_00_00.csv").write_text(CSV_CONTENT, encoding="utf-8")
+    return ref_dir
+
+
+def test_manifest_classifies_files(tmp_path):
+    csv_path = tmp_path / "lot.csv"
+    csv_path.write_text(CSV_CONTENT, encoding="utf-8")
+    manifest = IngestionManifest(tmp_path / "manifest.json")
+
+    check = manifest.check_file(str(csv_path))
+    assert check['status'] == IngestionManifest.STATUS_NEW
+
+    manifest.record(str(csv_path), check['size'], check['mtime'], rows=2)
+    manifest.save()
+
+    reloaded = IngestionManifest(tmp_path / "manifest.json")
+    assert reloaded.check_file(str(csv_path))['status'] == IngestionManifest.STATUS_UNCHANGED
+
+    # Un 'touch' sense canvi de contingut no obliga a reingerir
+    os.utime(csv_path, (1_000_000_000, 1_000_000_000))
+    assert reloaded.check_file(str(csv_path))['status'] == IngestionManifest.STATUS_UNCHANGED
+
+    csv_path.write_text(CSV_CONTENT + "DIAM 3;1,00;1,00\n", encoding="utf-8")
+    assert reloaded.check_file(str(csv_path))['status'] == IngestionManifest.STATUS_CHANGED
+
+
+def test_incremental_processing_skips_ingested_files(tmp_path):
+    share = tmp_path / "share"
+    ref_dir = create_share(share)
+    scanner = NetworkScanner(str(share), manifest_path=str(tmp_path / "manifest.json"),
+                             scan_cache_path=str(tmp_path / "scan_cache.json"))
+
+    first = scanner.process_all_csv_files(incremental=True)
+    assert first['statistics']['csv_files_new'] == 2
+    assert first['total_records'] == 4
+    assert scanner.commit_ingestion_manifest() == 2
+
+    second = scanner.process_all_csv_files(incremental=True)
+    assert second['statistics']['csv_files_skipped'] == 2
+    assert second['total_records'] == 0
+
+    (ref_dir / "1200136B_2023_02_01_08_00_00.csv").write_text(
+        CSV_CONTENT + "DIAM 3;1,00;1,00\n", encoding="utf-8")
+    third = scanner.process_all_csv_files(incremental=True)
+    assert third['statistics']['csv_files_changed'] == 1
+    assert third['statistics']['csv_files_skipped'] == 1
+    assert third['total_records'] == 3
+
+
+def test_file_written_after_reading_is_not_recorded(tmp_path):
+    share = tmp_path / "share"
+    ref_dir = create_share(share)
+    scanner = NetworkScanner(str(share), manifest_path=str(tmp_path / "manifest.json"),
+                             scan_cache_path=str(tmp_path / "scan_cache.json"))
+
+    first = scanner.process_all_csv_files(incremental=True)
+    assert first['total_records'] == 4
+
+    # El fitxer encara s'estava escrivint: les files llegides no són el contingut final
+    growing = ref_dir / "1200136B_2023_02_01_08_00_00.csv"
+    with open(growing, 'a', encoding='utf-8') as f:
+        f.write("DIAM 3;1,00;1,00\n")
+    assert scanner.commit_ingestion_manifest() == 1
+
+    second = scanner.process_all_csv_files(incremental=True)
+    assert second['statistics']['csv_files_new'] == 1
+    assert second['total_records'] == 3
+
+
+def test_incremental_run_reads_each_file_once(tmp_path, monkeypatch):
+    share = tmp_path / "share"
+    ref_dir = create_share(share)
+    scanner = NetworkScanner(str(share), manifest_path=str(tmp_path / "manifest.json"),
+                             scan_cache_path=str(tmp_path / "scan_cache.json"))
+
+    # El hash es calcula sobre els bytes llegits per parsejar, mai tornant a obrir el fitxer
+    def fail_compute_hash(self, file_path):
+        raise AssertionError(f"{file_path} s'ha tornat a llegir per calcular el hash")
+    monkeypatch.setattr(IngestionManifest, 'compute_hash', fail_compute_hash)
+
+    opened = []
+    real_open = open
+    def counting_open(file, *args, **kwargs):
+        if str(file).endswith('.csv'):
+            opened.append(os.path.basename(str(file)))
+        return real_open(file, *args, **kwargs)
+    monkeypatch.setattr('builtins.open', counting_open)
+
+    first = scanner.process_all_csv_files(incremental=True)
+    assert first['total_records'] == 4
+    assert scanner.commit_ingestion_manifest() == 2
+    assert sorted(opened) == ["1200135A_2023_01_31_22_01_56.csv", "1200136B_2023_02_01_08_00_00.csv"]
+
+    # Un 'touch' es resol amb una sola lectura, sense parsejar ni reingerir
+    opened.clear()
+    os.utime(ref_dir / "1200135A_2023_01_31_22_01_56.csv", (1_000_000_000, 1_000_000_000))
+    second = scanner.process_all_csv_files(incremental=True)
+    assert second['statistics']['csv_files_skipped'] == 2
+    assert opened == ["1200135A_2023_01_31_22_01_56.csv"]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Tests de la taula d'agregats per element (sense base de dades)
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.measurement_aggregates import MeasurementAggregateStore
+from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+from src.database.schema_metadata_cache import schema_metadata_cache
+
+
+class RecordingCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.pending.append((sql, params))
+        self.rows = self.connection.rows_for(sql)
+
+    def copy_expert(self, sql, buffer):
+        self.connection.pending.append((sql, buffer.read()))
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class RecordingConnection:
+    """Connexió en memòria; les consultes de grups anteriors retornen previous_groups"""
+
+    def __init__(self, previous_groups=None, fail_on=None, aggregate_table=True):
+        self.autocommit = True
+        self.aggregate_table = aggregate_table
+        self.pending = []
+        self.committed = []
+        self.previous_groups = previous_groups or []
+        self.fail_on = fail_on
+
+    def rows_for(self, sql):
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("permís denegat")
+        if 'FROM pg_catalog.pg_class' in sql:
+            return [(16384, 'v1')] if self.aggregate_table else []
+        if 'FROM information_schema.columns' in sql:
+            return [('maquina', 'character varying', 50, 'NO')] if self.aggregate_table else []
+        if 'SELECT DISTINCT' in sql:
+            return list(self.previous_groups)
+        return []
+
+    def merge_batch(self):
+        """Última transacció confirmada amb el merge d'un lot"""
+        return next(batch for batch in reversed(self.committed)
+                    if any('ON CONFLICT' in sql for sql, _ in batch))
+
+    def statements(self):
+        return [sql for batch in self.committed for sql, _ in batch] + [sql for sql, _ in self.pending]
+
+    def cursor(self):
+        return RecordingCursor(self)
+
+    def commit(self):
+        self.committed.append(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+
+def make_adapter(connection):
+    schema_metadata_cache.invalidate()
+    adapter = QualityMeasurementDBAdapter({'host': 'localhost'})
+    adapter.connection = connection
+    adapter.get_current_table_structure = lambda: {
+        'id_referencia_some': {}, 'id_element': {}, 'id_referencia_client': {}, 'id_lot': {},
+        'element': {}, 'actual': {}
+    }
+    return adapter
+
+
+def make_dataset():
+    return pd.DataFrame({
+        'id_referencia_some': ['C_R1_L1', 'C_R1_L1'],
+        'id_element': ['E1_X', 'E2_X'],
+        'id_referencia_client': ['R1', 'R1'],
+        'id_lot': ['L1', 'L1'],
+        'element': ['E1', None],
+        'actual': [1.0, 2.0],
+    })
+
+
+def test_copy_insert_refreshes_affected_groups_in_same_transaction():
+    connection = RecordingConnection(previous_groups=[('gompc', 'R1', 'L0', 'E1', '')])
+    adapter = make_adapter(connection)
+
+    result = adapter.insert_dataset(make_dataset())
+
+    assert result['success'] is True
+    batch = [sql for sql, _ in connection.merge_batch()]
+    merge = next(i for i, sql in enumerate(batch) if 'ON CONFLICT' in sql)
+    assert any('SELECT DISTINCT' in sql for sql in batch[:merge])
+    delete_params = next(params for sql, params in connection.merge_batch()
+                         if 'DELETE FROM mesuresqualitat_agregats' in sql)
+    # Grup anterior (LOT L0) + grups nous; la màquina i la cavitat que falten es prenen per defecte
+    assert list(zip(*delete_params)) == [('gompc', 'R1', 'L0', 'E1', ''),
+                                         ('gompc', 'R1', 'L1', '', ''),
+                                         ('gompc', 'R1', 'L1', 'E1', '')]
+    assert any('INSERT INTO mesuresqualitat_agregats' in sql for sql in batch[merge:])
+
+
+def test_aggregate_failure_keeps_the_batch():
+    connection = RecordingConnection(fail_on='INSERT INTO mesuresqualitat_agregats')
+    adapter = make_adapter(connection)
+
+    result = adapter.insert_dataset(make_dataset())
+
+    assert result['success'] is True and result['records_inserted'] == 2
+    batch = [sql for sql, _ in connection.merge_batch()]
+    assert any('ON CONFLICT' in sql for sql in batch)
+    assert 'ROLLBACK TO SAVEPOINT aggregates' in batch
+
+
+def test_insert_path_runs_no_ddl_and_checks_table_once():
+    connection = RecordingConnection()
+    adapter = make_adapter(connection)
+
+    assert adapter.insert_dataset(make_dataset())['success'] is True
+    assert adapter.insert_dataset(make_dataset())['success'] is True
+
+    statements = connection.statements()
+    # Només la taula temporal de staging del COPY
+    assert not any(sql.lstrip().startswith(('CREATE', 'DROP')) and 'stg_mesuresqualitat' not in sql
+                   for sql in statements)
+    assert sum('information_schema.columns' in sql for sql in statements) == 1
+    assert sum('INSERT INTO mesuresqualitat_agregats' in sql for sql in statements) == 2
+
+
+def test_missing_aggregate_table_inserts_without_aggregates():
+    connection = RecordingConnection(aggregate_table=False)
+    adapter = make_adapter(connection)
+
+    result = adapter.insert_dataset(make_dataset())
+
+    assert result['success'] is True and result['records_inserted'] == 2
+    statements = connection.statements()
+    assert any('ON CONFLICT' in sql for sql in statements)
+    assert not any('mesuresqualitat_agregats' in sql for sql in statements)
+
+
+def test_provisioning_creates_group_index_concurrently():
+    connection = RecordingConnection()
+    connection.autocommit = False
+
+    MeasurementAggregateStore(connection).ensure_table()
+
+    statements = [sql for sql, _ in connection.pending]
+    assert any('CREATE TABLE IF NOT EXISTS mesuresqualitat_agregats' in sql for sql in statements)
+    assert any(sql.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_mesuresqualitat_agg_group')
+               for sql in statements)
+    assert connection.autocommit is False
+
+
+def test_capability_from_sums_matches_direct_calculation():
+    values = [10.0, 10.2, 9.9, 10.1, 10.3, 9.8]
+    n = len(values)
+    moving_ranges = [abs(b - a) for a, b in zip(values, values[1:])]
+
+    overview = MeasurementAggregateStore.capability_from_aggregate(
+        'E1', n, sum(values), sum(v * v for v in values), min(values), max(values), 0,
+        sum(moving_ranges), len(moving_ranges), 10.0, -0.5, 0.5
+    )
+
+    mean = sum(values) / n
+    std_overall = (sum((v - mean) ** 2 for v in values) / (n - 1)) ** 0.5
+    std_within = sum(moving_ranges) / len(moving_ranges) / 1.128
+    assert abs(overview['mean'] - mean) < 1e-9
+    assert abs(overview['std_overall'] - std_overall) < 1e-9
+    assert abs(overview['pp'] - 1.0 / (6 * std_overall)) < 1e-9
+    assert abs(overview['cpk'] - min(10.5 - mean, mean - 9.5) / (3 * std_within)) < 1e-9
+
+    empty = MeasurementAggregateStore.capability_from_aggregate('E2', 1, 5.0, 25.0, 5.0, 5.0, 0, 0, 0,
+                                                                None, None, None)
+    assert empty['cp'] is None and empty['pp'] is None and empty['std_overall'] is None
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests de construcció de consultes del MeasurementHistoryService (sense base de dades)
+"""
+
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services import measurement_history_service as mhs
+
+
+class RecordingConnection:
+    """PostgresConn en memòria que registra les consultes"""
+
+    def __init__(self, rows=None):
+        self.queries = []
+        self.rows = rows or []
+        self.connection = None
+
+    def fetchall(self, query, params=None):
+        self.queries.append((query, params))
+        return list(self.rows)
+
+
+def make_service(machine='all', rows=None):
+    service = mhs.MeasurementHistoryService.__new__(mhs.MeasurementHistoryService)
+    service.machine = machine
+    service.schema = mhs.MEASUREMENT_SCHEMA
+    service.table_keys = mhs.ALL_TABLES if machine == 'all' else [mhs.MACHINE_TABLES[machine]['table_key']]
+    service.machine_name = mhs.MACHINE_TABLES[machine]['name']
+    service.db_connection = RecordingConnection(rows)
+    # Variants fixes: l'índex d'àlies es prova a test_reference_alias_index.py
+    service.USE_REFERENCE_ALIASES = False
+    return service
+
+
+def test_all_machines_use_a_single_union_query():
+    row = ('R1', 'E1', 'E1', 'E1', 'E1', 1.5, 1.0, -0.1, 0.1, 0.5, datetime(2024, 1, 1), 'LOT1', None)
+    service = make_service('all', rows=[row])
+
+    measurements = service.get_element_measurements('CLIENT', 'R1', 'E1', lot='LOT1', limit=20)
+
+    assert len(service.db_connection.queries) == 1
+    query, params = service.db_connection.queries[0]
+    assert query.count('UNION ALL') == len(mhs.ALL_TABLES) - 1
+    assert query.rstrip().endswith('ORDER BY data_hora DESC NULLS LAST LIMIT %s')
+    assert query.count('%s') == len(params) and params[-1] == 20
+    assert 'None' not in query
+    assert measurements[0]['actual'] == 1.5 and measurements[0]['id_lot'] == 'LOT1'
+
+
+def test_single_machine_keeps_one_query_per_table():
+    service = make_service('gompc_projectes')
+
+    service.get_element_measurements('CLIENT', 'R1', 'E1', limit=5)
+
+    query, params = service.db_connection.queries[0]
+    assert 'UNION ALL' not in query
+    assert params == ('R1', 'R1D', 'R1_D', 'R1', 'r1', 'E1', 5)
+
+
+def test_lot_element_statistics_use_one_aggregated_query():
+    rows = [('LOT1', 'E1', 10, 1.0, 0.01, 0.97, 1.03, 1.0, 0.1, -0.1)]
+    service = make_service('all', rows=rows)
+    mhs.measurement_query_cache.invalidate()
+
+    statistics = service.get_lot_element_statistics('CLIENT', 'R1', ['LOT2', 'LOT1'], elements=['E1'])
+
+    assert len(service.db_connection.queries) == 1
+    query, params = service.db_connection.queries[0]
+    assert 'GROUP BY id_lot, element' in query and 'STDDEV_SAMP(actual)' in query
+    assert query.count('%s') == len(params)
+    assert params[5] == ['LOT1', 'LOT2'] and params[6] == ['E1']
+
+    capability = service.capability_from_statistics(statistics[0])
+    assert round(capability['cp'], 3) == round(0.2 / 0.06, 3)
+    assert round(capability['cpk'], 3) == round(0.1 / 0.03, 3)
+
+    # Segona crida servida des del cache
+    service.get_lot_element_statistics('CLIENT', 'R1', ['LOT1', 'LOT2'], elements=['E1'])
+    assert len(service.db_connection.queries) == 1
+    mhs.measurement_query_cache.invalidate()
+
+
+def test_capability_requires_spread_and_tolerances():
+    stats = {'n': 5, 'mean': 1.0, 'stddev': 0.0, 'nominal': 1.0,
+             'tolerancia_positiva': 0.1, 'tolerancia_negativa': -0.1}
+    assert mhs.MeasurementHistoryService.capability_from_statistics(stats) is None
+    stats.update(stddev=0.01, tolerancia_negativa=None)
+    assert mhs.MeasurementHistoryService.capability_from_statistics(stats) is None
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests de la provisió d'índexs de les taules de mesures (sense base de dades real)
+"""
+
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.measurement_index_manager import MeasurementIndexManager
+from src.services.measurement_history_service import TABLE_COLUMN_MAPPING
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append(sql)
+        if 'FROM pg_tables' in sql:
+            self._rows = [(table,) for table in self.connection.tables]
+        elif 'FROM pg_index' in sql:
+            self._rows = list(self.connection.indexes.items())
+        elif 'FROM pg_extension' in sql:
+            self._rows = [(1,)]
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    def __init__(self, tables, indexes=None):
+        self.tables = tables
+        self.indexes = indexes or {}
+        self.executed = []
+        self.autocommit = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def test_definitions_cover_mapping_and_respect_name_limit():
+    manager = MeasurementIndexManager(FakeConnection([]))
+    definitions = manager.derive_index_definitions()
+
+    hoytom = {d['name']: d['sql'] for d in definitions if d['table'] == 'mesureshoytom'}
+    assert any('ref_some, tipo_ensayo, fecha_ensayo DESC' in sql for sql in hoytom.values())
+    assert any('USING gin (UPPER(CAST(ref_some AS text)) gin_trgm_ops)' in sql for sql in hoytom.values())
+    assert all(len(d['name']) <= 63 for d in definitions)
+    assert len({d['name'] for d in definitions}) == len(definitions)
+    assert {d['table'] for d in definitions} == {m['table'] for m in TABLE_COLUMN_MAPPING.values()}
+
+
+def test_provision_is_idempotent_and_rebuilds_invalid_indexes():
+    manager = MeasurementIndexManager(FakeConnection(['mesureszwick']))
+    names = [d['name'] for d in manager.derive_index_definitions() if d['table'] == 'mesureszwick']
+    manager.connection.indexes = {names[0]: True, names[1]: False}
+
+    result = manager.provision()
+
+    assert result['existing'] == [names[0]]
+    assert set(result['created']) == set(names[1:])
+    assert any(stmt.startswith('DROP INDEX CONCURRENTLY IF EXISTS') and names[1] in stmt
+               for stmt in result['statements'])
+    assert all('mesureszwick' not in item['name'] for item in result['skipped'])
+    assert manager.connection.autocommit is False
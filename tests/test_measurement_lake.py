@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests del lake Parquet de mesures
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+pytest.importorskip("pyarrow")
+
+from src.services.measurement_lake import MeasurementLake
+
+
+def make_measurements(lot: str, data_hora: str, rows: int = 3, reference: str = "665220400"):
+    return pd.DataFrame({
+        'Element': [f"ELEM {i}" for i in range(rows)],
+        'Actual': [10.0 + i / 100 for i in range(rows)],
+        'CLIENT': 'AUTOLIV',
+        'FASE': 'Única',
+        'REFERENCIA': reference,
+        'LOT': lot,
+        'DATA_HORA': data_hora
+    })
+
+
+def test_write_and_read_selected_partitions(tmp_path):
+    lake = MeasurementLake(str(tmp_path))
+    df = pd.concat([
+        make_measurements("LOT0001", "2023-01-01 10:00:00"),
+        make_measurements("LOT0002", "2023-01-02 10:00:00"),
+        make_measurements("LOT/9", "2023-01-03 10:00:00", reference="665220401"),
+    ], ignore_index=True)
+
+    result = lake.write(df)
+    assert result['success'] and result['partitions_written'] == 3
+
+    only_lot = lake.read(lots="LOT0002")
+    assert set(only_lot['LOT']) == {"LOT0002"}
+    assert len(only_lot) == 3
+    assert pd.api.types.is_datetime64_any_dtype(only_lot['DATA_HORA'])
+
+    assert set(lake.read(references="665220401")['LOT']) == {"LOT/9"}
+    assert len(lake.read(clients=["AUTOLIV"], columns=['Element', 'LOT'])) == 9
+
+
+def test_rewriting_a_source_file_replaces_only_its_rows(tmp_path):
+    lake = MeasurementLake(str(tmp_path))
+    lake.write(make_measurements("LOT0001", "2023-01-01 10:00:00"))
+    lake.write(make_measurements("LOT0001", "2023-01-01 12:00:00", rows=2))
+    # El primer CSV es modifica i es torna a ingerir
+    lake.write(make_measurements("LOT0001", "2023-01-01 10:00:00", rows=5))
+
+    assert len(lake.read(lots="LOT0001")) == 7
+    assert len(lake.list_partitions()) == 1
+
+
+def test_source_files_are_identified_by_file_name(tmp_path):
+    lake = MeasurementLake(str(tmp_path))
+    # Dos CSV del mateix LOT i segon (el LOT es normalitza a majúscules)
+    first = make_measurements("LOT0001", "2023-01-01 10:00:00")
+    first['FITXER'] = "LOT0001_2023_01_01_10_00_00.csv"
+    second = make_measurements("LOT0001", "2023-01-01 10:00:00", rows=2)
+    second['FITXER'] = "lot0001_2023_01_01_10_00_00.csv"
+    lake.write(pd.concat([first, second], ignore_index=True))
+
+    assert len(lake.read(lots="LOT0001")) == 5
+    assert set(lake.read(lots="LOT0001")['FITXER']) == {first['FITXER'][0], second['FITXER'][0]}
+
+
+def test_rows_without_source_never_overwrite_each_other(tmp_path):
+    lake = MeasurementLake(str(tmp_path))
+    lake.write(make_measurements("LOT0001", None))
+    lake.write(make_measurements("LOT0001", "no és una data", rows=2))
+    lake.write(make_measurements("LOT0001", None, rows=4))
+
+    assert len(lake.read(lots="LOT0001")) == 9
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Tests de l'escaneig concurrent de clients i referències del NetworkScanner
+"""
+
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+
+
+def test_concurrent_scan_keeps_schema_and_skips_sizes(tmp_path, create_share):
+    create_share(tmp_path, n_refs=2, n_lots=2)
+    (tmp_path / "BROSE" / "7001234").mkdir(parents=True)
+
+    scanner = NetworkScanner(str(tmp_path), read_workers=4, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    result = scanner.scan_all_clients_and_references()
+
+    assert result['success']
+    assert list(result['clients']) == ['AUTOLIV', 'BROSE']
+    reference = result['clients']['AUTOLIV']['references'][0]
+    assert set(reference) == {'referencia_client', 'path', 'accessible', 'modified_time', 'size'}
+    assert reference['size'] is None
+
+    sized = scanner.scan_all_clients_and_references(include_sizes=True)
+    assert sized['clients']['AUTOLIV']['references'][0]['size'] > 0
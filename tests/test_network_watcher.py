@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests del mode de vigilància de la xarxa
+"""
+
+import os
+import sys
+import json
+import time
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+from src.services.network_watcher import NetworkWatcher
+
+
+def make_watcher(tmp_path, create_share, adapter, settle_seconds):
+    share = tmp_path / "share"
+    create_share(share, n_refs=2, n_lots=2)
+    scanner = NetworkScanner(str(share), read_workers=2, manifest_path=str(tmp_path / "manifest.json"),
+                             scan_cache_path=str(tmp_path / "scan_cache.json"))
+    scanner._open_database_adapter = lambda table: (adapter, None)
+    watcher = NetworkWatcher(scanner, settle_seconds=settle_seconds,
+                             status_path=str(tmp_path / "status.json"))
+    return share, adapter, watcher
+
+
+def test_watcher_ingests_only_new_files(tmp_path, create_share, recording_adapter):
+    share, adapter, watcher = make_watcher(tmp_path, create_share, recording_adapter, settle_seconds=0)
+
+    # Cal un cicle sense canvis abans d'inserir
+    assert watcher.poll_once() is None
+    first = watcher.poll_once()
+    assert first['csv_files_processed'] == 4
+    # El fitxer amb nom invàlid es registra i no es torna a intentar
+    assert watcher.get_status()['queue_depth'] == 0
+
+    assert watcher.poll_once() is None
+    assert watcher.stats['directories_changed'] == 0
+
+    (share / "AUTOLIV" / "665220401" / "LOT1099_2023_02_01_10_00_00.csv").write_text(
+        "Element;Actual;Nominal\nELEM 0;10,00;10,00\n", encoding="utf-8")
+    assert watcher.poll_once() is None
+    second = watcher.poll_once()
+    assert second['csv_files_processed'] == 1
+    assert second['statistics']['csv_files_new'] == 1
+
+    status = json.loads((tmp_path / "status.json").read_text(encoding="utf-8"))
+    assert status['throughput']['files_total'] == 5
+    assert status['lag_seconds']['last_ingest'] is not None
+    assert len(adapter.batches) == 2
+
+
+def test_watcher_waits_for_growing_files(tmp_path, create_share, recording_adapter):
+    share, adapter, watcher = make_watcher(tmp_path, create_share, recording_adapter, settle_seconds=0)
+    # Còpia que conserva la data original: no es considera estable a la primera
+    old = time.time() - 3600
+    for csv_path in share.rglob("*.csv"):
+        os.utime(csv_path, (old, old))
+
+    assert watcher.poll_once() is None
+    assert watcher.get_status()['queue_depth'] == 5
+    assert watcher.poll_once()['csv_files_processed'] == 4
+
+    growing = share / "AUTOLIV" / "665220400" / "LOT0099_2023_02_01_10_00_00.csv"
+    growing.write_text("Element;Actual;Nominal\n", encoding="utf-8")
+    assert watcher.poll_once() is None
+    with open(growing, 'a', encoding='utf-8') as f:
+        f.write("ELEM 0;10,00;10,00\n")
+    assert watcher.poll_once() is None
+    status = watcher.get_status()
+    assert status['queue_depth'] == 1
+    assert status['lag_seconds']['oldest_pending'] is not None
+
+    assert watcher.poll_once()['csv_files_processed'] == 1
+
+
+def test_watcher_honours_settle_seconds(tmp_path, create_share, recording_adapter):
+    share, adapter, watcher = make_watcher(tmp_path, create_share, recording_adapter, settle_seconds=60)
+
+    assert watcher.poll_once() is None
+    assert watcher.poll_once() is None
+    assert watcher.get_status()['queue_depth'] == 5
+    assert watcher._collect_settled_files(time.time() + 61) != []
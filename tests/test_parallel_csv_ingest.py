@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests de la lectura concurrent de CSV del NetworkScanner
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+
+
+def test_parallel_ingest_matches_serial(tmp_path, create_share):
+    create_share(tmp_path)
+
+    serial = NetworkScanner(str(tmp_path), read_workers=1, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    serial_result = serial.process_all_csv_files()
+
+    threaded = NetworkScanner(str(tmp_path), read_workers=4, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    threaded_result = threaded.process_all_csv_files()
+
+    assert serial_result['csv_files_processed'] == threaded_result['csv_files_processed'] == 18
+    assert serial_result['errors'] == threaded_result['errors']
+    assert len(threaded_result['errors']) == 1
+    pd.testing.assert_frame_equal(serial.get_global_dataset(), threaded.get_global_dataset())
+
+
+def test_process_pool_cleaning_matches_serial(tmp_path, create_share):
+    create_share(tmp_path, n_refs=1, n_lots=3)
+
+    serial = NetworkScanner(str(tmp_path), read_workers=1, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    serial.process_all_csv_files()
+
+    pooled = NetworkScanner(str(tmp_path), read_workers=2, clean_processes=2,
+                            scan_cache_path=str(tmp_path / "scan_cache.json"))
+    pooled.process_all_csv_files()
+
+    pd.testing.assert_frame_equal(serial.get_global_dataset(), pooled.get_global_dataset())
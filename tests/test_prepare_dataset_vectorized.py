@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests de la preparació per columnes del QualityMeasurementDBAdapter
+(mateix resultat que la preparació cel·la a cel·la)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+sys.path.append(str(project_root / 'scripts'))
+
+from benchmark_prepare_dataset import make_dataset, prepare_dataset_rowwise, run_frozen
+from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+from src.services.value_cleaner import ValueCleaner
+
+MIXED = pd.DataFrame({
+    'CLIENT': ['AUTOLIV', None, 'BRÖSE'],
+    'REFERENCIA': [665, 0, 12],
+    'LOT': ['L1', np.nan, ''],
+    'Element': ['Δ1', None, '¿¿¿'],
+    'Actual': ['1,5', None, '0,00001'],
+    'Nominal': [1.0, np.nan, 2.0],
+    'Tol -': ['-0,1', '-0.1', ''],
+    'Tol +': ['0,1', '0.1', 'x'],
+    'Check': [True, False, None],
+    'DATA_HORA': ['2025-01-01', None, 'x'],
+}, index=[10, 5, 7])
+
+
+@pytest.mark.parametrize('df', [
+    make_dataset(2000, elements=50),
+    make_dataset(500, elements=20).astype(object),
+    MIXED,
+    MIXED.astype(object),
+    MIXED.iloc[:0],
+], ids=['text', 'object', 'mixed', 'mixed-object', 'empty'])
+@pytest.mark.filterwarnings('ignore')
+def test_columnar_preparation_matches_rowwise(df):
+    adapter = QualityMeasurementDBAdapter({'host': 'localhost'})
+
+    expected, _ = run_frozen(prepare_dataset_rowwise, adapter, df)
+    prepared, _ = run_frozen(adapter.prepare_dataset_for_insertion, df)
+
+    pd.testing.assert_frame_equal(prepared, expected)
+
+
+def test_numeric_dtype_fast_path_matches_scalar():
+    rng = np.random.default_rng(1)
+    floats = pd.Series(np.concatenate([
+        rng.standard_normal(2000) * 10.0 ** rng.integers(-8, 20, 2000),
+        [0.0, -0.0, np.nan, np.inf, -np.inf, 1e-4, 9.99e-5, 1e16, 9999999999999998.0]
+    ]))
+    integers = pd.Series([0, 1, -5, 10 ** 17, 2 ** 60])
+
+    for series in (floats, integers):
+        pd.testing.assert_series_equal(ValueCleaner.clean_numeric_series(series),
+                                       series.apply(ValueCleaner.clean_numeric_value))
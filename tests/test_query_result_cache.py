@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests del cache LRU + TTL de resultats de consultes de mesures
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.query_result_cache import QueryResultCache
+
+
+def test_lru_eviction_and_hit_miss_counters():
+    cache = QueryResultCache(max_entries=2, ttl_seconds=60)
+    cache.put(('lots', 'all', 'AUTOLIV', '665220400', None), ['LOT1'])
+    cache.put(('lots', 'all', 'BROSE', '123', None), ['LOT2'])
+
+    # L'accés fa que AUTOLIV sigui la més recent: s'expulsa BROSE
+    assert cache.get(('lots', 'all', 'AUTOLIV', '665220400', None)) == ['LOT1']
+    cache.put(('lots', 'all', 'ZF', '999', None), ['LOT3'])
+
+    assert cache.get(('lots', 'all', 'BROSE', '123', None)) is None
+    stats = cache.get_stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+
+def test_entries_expire_and_are_copies():
+    cache = QueryResultCache(ttl_seconds=0.05)
+    elements = [{'element': 'E1'}]
+    cache.put('key', elements)
+
+    cached = cache.get('key')
+    cached[0]['element'] = 'modificat'
+    assert cache.get('key') == [{'element': 'E1'}]
+
+    time.sleep(0.06)
+    assert cache.get('key') is None
+    assert cache.get_stats()['expirations'] == 1
+
+
+def test_invalidate_by_predicate():
+    cache = QueryResultCache()
+    cache.put(('elements', 'hoytom', 'A', 'R1', None), [1])
+    cache.put(('elements', 'zwick', 'A', 'R1', None), [2])
+
+    assert cache.invalidate(lambda key: key[1] == 'hoytom') == 1
+    assert cache.get(('elements', 'zwick', 'A', 'R1', None)) == [2]
+    assert cache.invalidate() == 1 and len(cache) == 0
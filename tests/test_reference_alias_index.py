@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests de l'índex d'àlies de referència (sense base de dades)
+"""
+
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services import measurement_history_service as mhs
+from src.services.query_result_cache import invalidate_measurement_cache
+from src.services.reference_alias_index import (
+    ReferenceAliasIndex, normalize_reference, reference_alias_keys, reference_alias_index
+)
+
+
+class ReferenceConnection:
+    """PostgresConn en memòria: retorna referències per les consultes DISTINCT"""
+
+    def __init__(self, references):
+        self.references = references
+        self.queries = []
+        self.connection = None
+
+    def fetchall(self, query, params=None):
+        self.queries.append((query, params))
+        if 'SELECT DISTINCT CAST(' in query:
+            return [(reference,) for reference in self.references]
+        return []
+
+
+def make_service(references):
+    service = mhs.MeasurementHistoryService.__new__(mhs.MeasurementHistoryService)
+    service.machine = 'gompc_projectes'
+    service.schema = mhs.MEASUREMENT_SCHEMA
+    service.table_keys = [mhs.MACHINE_TABLES['gompc_projectes']['table_key']]
+    service.machine_name = mhs.MACHINE_TABLES['gompc_projectes']['name']
+    service.db_connection = ReferenceConnection(references)
+    return service
+
+
+def test_variants_share_normalized_key():
+    assert normalize_reference(' 00665-220400 ') == '665220400'
+    assert normalize_reference('abc_12') == 'ABC12'
+    assert reference_alias_keys('665220400D') == {'665220400D', '665220400'}
+    assert '665220400' in reference_alias_keys('665_220400_002')
+    assert '220400' in reference_alias_keys('002_220400_002')
+    assert reference_alias_keys(None) == set()
+
+
+def test_resolve_maps_user_input_to_canonical_values():
+    index = ReferenceAliasIndex()
+    index.rebuild(lambda: [('t1', '665220400D'), ('t1', '0665220400'), ('t2', 'other'), ('t1', None)])
+
+    assert index.resolve('665220400') == ['0665220400', '665220400D']
+    assert index.resolve('665220400_d') == ['0665220400', '665220400D']
+    assert index.resolve('OTHER', table_keys=['t1']) == []
+    assert index.resolve('missing') == []
+    assert index.get_stats()['references'] == 3
+
+
+def test_service_resolves_once_and_falls_back_to_variants():
+    invalidate_measurement_cache()
+    service = make_service(['665220400D'])
+
+    assert service._reference_variants('665220400') == ['665220400D']
+    build_queries = len(service.db_connection.queries)
+    assert build_queries == len(mhs.ALL_TABLES)
+
+    # L'índex ja construït no torna a consultar la base de dades
+    assert service._reference_variants('665220400d') == ['665220400D']
+    assert service._reference_variants('R1') == ['R1', 'R1D', 'R1_D', 'R1', 'r1']
+    assert len(service.db_connection.queries) == build_queries
+
+    service.get_distinct_lots('CLIENT', '665220400')
+    query, params = service.db_connection.queries[-1]
+    assert params == ('665220400D',) and query.count('%s') == 1
+
+    # Una ingestió marca l'índex per reconstruir
+    invalidate_measurement_cache("ingestió")
+    assert reference_alias_index.is_stale()
+
+
+def test_cascade_collapses_to_alias_strategy():
+    invalidate_measurement_cache()
+    service = make_service(['665220400D'])
+
+    strategies = service._build_universal_search_conditions('CLIENT', '665220400')
+    assert len(strategies) == 1 and strategies[0]['params'] == ['CLIENT', ['665220400D']]
+
+    strategies = service._build_universal_search_conditions('CLIENT', 'UNKNOWN')
+    assert len(strategies) > 1
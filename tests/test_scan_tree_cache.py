@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests del cache de l'arbre de carpetes escanejat (revalidat per mtime)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+
+
+def test_warm_scan_reuses_cached_tree(tmp_path, create_share):
+    share = tmp_path / "share"
+    create_share(share, n_refs=2, n_lots=2)
+    old = time.time() - 3600
+    for directory in [share, *[p for p in share.rglob("*") if p.is_dir()]]:
+        os.utime(directory, (old, old))
+    cache_path = str(tmp_path / "scan_cache.json")
+
+    cold = NetworkScanner(str(share), read_workers=1, scan_cache_path=cache_path)
+    cold_result = cold.process_all_csv_files()
+    assert cold.scan_cache.stats == {'hits': 0, 'misses': 2}
+
+    # Un scanner nou llegeix el cache de disc: cap referència es torna a llistar
+    warm = NetworkScanner(str(share), read_workers=1, scan_cache_path=cache_path)
+    warm_result = warm.process_all_csv_files()
+    assert warm.scan_cache.stats == {'hits': 2, 'misses': 0}
+    assert warm_result['csv_files_processed'] == cold_result['csv_files_processed']
+
+    # Un fitxer nou canvia l'mtime de la seva referència i només aquesta es rellista
+    (share / "AUTOLIV" / "665220401" / "LOT1099_2023_02_01_10_00_00.csv").write_text(
+        "Element;Actual\nELEM 0;10,00\n", encoding="utf-8")
+    assert warm.process_all_csv_files()['csv_files_processed'] == cold_result['csv_files_processed'] + 1
+    assert warm.scan_cache.stats == {'hits': 3, 'misses': 1}
+
+    assert warm.invalidate_scan_cache(str(share / "AUTOLIV")) == 3
+
+
+def test_cache_hit_costs_one_stat(tmp_path, create_share, monkeypatch):
+    share = tmp_path / "share"
+    create_share(share, n_refs=1, n_lots=3)
+    old = time.time() - 3600
+    for directory in [share, *[p for p in share.rglob("*") if p.is_dir()]]:
+        os.utime(directory, (old, old))
+    ref_dir = share / "AUTOLIV" / "665220400"
+    scanner = NetworkScanner(str(share), read_workers=1)
+
+    stat_calls = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, 'stat', lambda path, *args, **kwargs: stat_calls.append(path) or
+                        real_stat(path, *args, **kwargs))
+
+    def count(action):
+        stat_calls.clear()
+        result = action()
+        return result, len(stat_calls)
+
+    # Noms de CSV: el cold llista la carpeta; el hit només fa el stat de la carpeta
+    miss, miss_stats = count(lambda: scanner.list_csv_files(str(ref_dir)))
+    hit, hit_stats = count(lambda: scanner.list_csv_files(str(ref_dir)))
+    assert hit == miss and len(hit) == 4
+    assert scanner.scan_cache.stats == {'hits': 1, 'misses': 1}
+    assert miss_stats == hit_stats == 1
+
+    # Amb metadades sempre es torna a fer l'scandir: cap stat per fitxer
+    (_, files), scan_stats = count(lambda: scanner._scan_directory(str(ref_dir)))
+    assert scan_stats == 1 and len(files) == 4
+
+    # Sobreescriure un fitxer no canvia l'mtime de la carpeta: la mida és la nova
+    csv_path = next(ref_dir.glob("LOT*.csv"))
+    sizes = {f['name']: f['size'] for f in files}
+    csv_path.write_text(csv_path.read_text(encoding="utf-8") + "ELEM 9;10,00;10,00\n", encoding="utf-8")
+    os.utime(ref_dir, (old, old))
+    _, files = scanner._scan_directory(str(ref_dir))
+    assert {f['name']: f['size'] for f in files}[csv_path.name] > sizes[csv_path.name]
+
+    # Sense scan_cache_path el cache és només en memòria
+    assert scanner.scan_cache.cache_path is None
+    scanner.scan_cache.save()
+    assert not any(tmp_path.rglob("*.json"))
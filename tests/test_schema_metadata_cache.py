@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests del cache d'estructura de taules (sense base de dades real)
+"""
+
+import sys
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.quality_measurement_adapter import QualityMeasurementDBAdapter
+from src.database.schema_metadata_cache import SchemaMetadataCache, schema_metadata_cache
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append(sql)
+        if 'FROM pg_catalog.pg_class' in sql:
+            self._rows = [(16384, self.connection.fingerprint)] if self.connection.columns else []
+        elif 'FROM information_schema.columns' in sql:
+            self._rows = [(name, 'character varying', 100, 'YES') for name in self.connection.columns]
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    def __init__(self, columns, database='documentacio'):
+        self.columns = list(columns)
+        self.fingerprint = 'v1'
+        self.database = database
+        self.executed = []
+        self.autocommit = True
+
+    def get_dsn_parameters(self):
+        return {'host': 'localhost', 'port': '5432', 'dbname': self.database, 'user': 'tecnica'}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def catalog_queries(self):
+        return [sql for sql in self.executed if 'information_schema' in sql or 'pg_catalog' in sql]
+
+
+def test_structure_is_read_once_per_database():
+    cache = SchemaMetadataCache()
+    first, second = FakeConnection(['id_element', 'actual']), FakeConnection(['id_element', 'actual'])
+
+    columns = cache.get_columns(first, 'mesuresqualitat')
+    columns['actual']['type'] = 'modificat'
+
+    assert cache.get_columns(second, 'mesuresqualitat')['actual']['type'] == 'character varying(100)'
+    assert len(first.catalog_queries()) == 2
+    assert second.catalog_queries() == []
+    assert cache.get_stats()['hits'] == 1
+
+    other_database = FakeConnection(['id_element'], database='altra')
+    assert list(cache.get_columns(other_database, 'mesuresqualitat')) == ['id_element']
+
+
+def test_fingerprint_detects_schema_changes():
+    cache = SchemaMetadataCache(revalidate_seconds=0)
+    connection = FakeConnection(['id_element'])
+    cache.get_columns(connection, 'mesuresqualitat')
+    connection.executed.clear()
+
+    # Empremta igual: només la consulta a pg_catalog
+    assert list(cache.get_columns(connection, 'mesuresqualitat')) == ['id_element']
+    assert len(connection.executed) == 1 and 'pg_catalog' in connection.executed[0]
+
+    connection.columns.append('fase')
+    connection.fingerprint = 'v2'
+    assert list(cache.get_columns(connection, 'mesuresqualitat')) == ['id_element', 'fase']
+    assert cache.get_stats()['schema_changes'] == 1
+
+
+def test_schema_update_runs_once_per_session():
+    schema_metadata_cache.invalidate()
+    adapter = QualityMeasurementDBAdapter({'host': 'localhost'})
+    adapter.connection = FakeConnection(['id_referencia_some', 'id_element', 'valor', 'ok'])
+
+    first = adapter.update_table_schema()
+    alters = [sql for sql in adapter.connection.executed if sql.startswith(('ALTER', 'CREATE INDEX'))]
+    adapter.connection.executed.clear()
+
+    second = adapter.update_table_schema()
+    adapter.get_current_table_structure()
+
+    assert first['success'] and second['success']
+    assert any('ADD COLUMN client' in sql for sql in alters)
+    assert adapter.connection.executed == []
+
+    schema_metadata_cache.invalidate(adapter.connection, 'mesuresqualitat')
+    assert not schema_metadata_cache.is_schema_applied(adapter.connection, 'mesuresqualitat')
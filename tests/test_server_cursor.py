@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests de la lectura per blocs amb cursors de servidor (sense base de dades real)
+"""
+
+import sys
+from decimal import Decimal
+from pathlib import Path
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.database.server_cursor import iter_query_chunks, read_query_dataframe
+
+
+class NamedCursor:
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+        self.description = None
+        self.itersize = 2000
+        self._rows = []
+
+    def execute(self, query, params=None):
+        assert not self.connection.autocommit, "un cursor amb nom necessita transacció"
+        self._rows = list(self.connection.rows)
+
+    def fetchmany(self, size):
+        self.description = [('id',), ('valor',)]
+        self.connection.fetches.append(size)
+        chunk, self._rows = self._rows[:size], self._rows[size:]
+        return chunk
+
+    def close(self):
+        self.connection.closed_cursors += 1
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.autocommit = True
+        self.fetches = []
+        self.closed_cursors = 0
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        assert name, "s'ha d'usar un cursor de servidor"
+        return NamedCursor(self, name)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_rows_are_fetched_in_chunks_and_autocommit_is_restored():
+    connection = FakeConnection([(i, Decimal(i) / 2) for i in range(5)])
+
+    chunks = list(iter_query_chunks(connection, "SELECT id, valor FROM t", itersize=2))
+
+    assert [len(rows) for _, rows in chunks] == [2, 2, 1]
+    assert chunks[0][0] == ['id', 'valor']
+    assert connection.autocommit is True
+    assert connection.closed_cursors == 1 and connection.rollbacks == 1
+
+
+def test_dataframe_read_matches_read_sql_types():
+    connection = FakeConnection([(i, Decimal(i) / 2) for i in range(5)])
+
+    df = read_query_dataframe(connection, "SELECT id, valor FROM t", itersize=2)
+
+    assert list(df['valor']) == [0.0, 0.5, 1.0, 1.5, 2.0]
+    assert df['valor'].dtype == float
+
+
+def test_empty_result_keeps_columns():
+    connection = FakeConnection([])
+
+    df = read_query_dataframe(connection, "SELECT id, valor FROM t")
+
+    assert df.empty and list(df.columns) == ['id', 'valor']
+
+
+def test_chunks_are_accumulated_with_widened_types():
+    # id enter al primer bloc i amb NULL (float) als següents
+    connection = FakeConnection([(i if i < 3 else None, Decimal(i) / 2) for i in range(7)])
+
+    df = read_query_dataframe(connection, "SELECT id, valor FROM t", itersize=3)
+
+    assert len(df) == 7 and list(df.columns) == ['id', 'valor']
+    assert list(df['id'][:3]) == [0.0, 1.0, 2.0] and df['id'][3:].isna().all()
+    assert list(df['valor']) == [i / 2 for i in range(7)]
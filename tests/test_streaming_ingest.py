@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests de la ingestió en streaming del NetworkScanner
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.network_scanner import NetworkScanner
+
+
+def test_streaming_writes_bounded_batches(tmp_path, monkeypatch, create_share, recording_adapter):
+    create_share(tmp_path)
+    adapter = recording_adapter
+
+    scanner = NetworkScanner(str(tmp_path), read_workers=2,
+                             manifest_path=str(tmp_path / "manifest.json"),
+                             scan_cache_path=str(tmp_path / "scan_cache.json"))
+    monkeypatch.setattr(scanner, '_open_database_adapter', lambda table: (adapter, None))
+
+    result = scanner.stream_csv_files_to_database(batch_rows=10, max_pending_batches=1)
+
+    reference = NetworkScanner(str(tmp_path), read_workers=1, scan_cache_path=str(tmp_path / "scan_cache.json"))
+    reference.process_all_csv_files()
+    expected = reference.get_global_dataset()
+
+    assert result['success']
+    assert result['records_inserted'] == len(expected)
+    assert len(adapter.batches) > 1
+    assert adapter.closed
+    assert all(name.startswith("db_writer") for name in adapter.threads)
+    # Com a màxim un lot pendent + el lot en construcció (cada fitxer té menys de 10 files)
+    assert result['database_statistics']['max_rows_in_flight'] < 10 * 2 + 10
+    pd.testing.assert_frame_equal(pd.concat(adapter.batches, ignore_index=True), expected)
+    assert scanner.global_dataset.empty
+
+    # Tots els fitxers inserits queden al manifest: la segona execució no escriu res
+    second = scanner.stream_csv_files_to_database(batch_rows=10)
+    assert second['records_inserted'] == 0
+    assert second['statistics']['csv_files_skipped'] == 18
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests de la neteja vectoritzada del ValueCleaner (mateix resultat que per cel·la)
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Afegir el directori root del projecte al path
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.services.value_cleaner import ValueCleaner
+
+VALUES = [
+    "10,5", "1.234,56", "1,234.56", " -0,003 ", "+5", "1.2.3", "12 mm", "±0,1", "3°",
+    "ΔALÇADA 1", "Planitud ≤ 0,05", "¿¿¿???", "¿¿¿ Cota A", "???", "nan", "NULL", "#N/A",
+    "error", "", None, np.nan, "   ", "日本", "ELEMENT 1", "ELEMENT 1", "10,5",
+]
+
+
+def make_series(values=VALUES):
+    return pd.Series(values, dtype=object, index=np.arange(len(values))[::-1])
+
+
+def test_series_cleaning_matches_scalar_functions():
+    series = make_series()
+
+    pd.testing.assert_series_equal(ValueCleaner.clean_element_series(series),
+                                   series.apply(ValueCleaner.clean_element_value))
+    pd.testing.assert_series_equal(ValueCleaner.clean_numeric_series(series),
+                                   series.apply(ValueCleaner.clean_numeric_value))
+    pd.testing.assert_series_equal(ValueCleaner.normalize_unicode_series(series),
+                                   series.apply(ValueCleaner.normalize_unicode_text))
+
+
+def test_non_text_columns_use_scalar_path():
+    series = pd.Series([1.0, 0.0, np.nan, 1e-5, 3])
+    pd.testing.assert_series_equal(ValueCleaner.clean_numeric_series(series),
+                                   series.apply(ValueCleaner.clean_numeric_value))
+
+
+def test_report_matches_separate_detection():
+    df = pd.DataFrame({
+        'Element': VALUES[::-1],
+        'Actual': VALUES,
+        'Comentari': ["a,b", "1.2.3", "nan", "¿¿¿"] * 6 + ["ok", "ok"],
+    })
+
+    cleaned, before, after = ValueCleaner.clean_dataframe_with_report(df, element_col='Element', actual_col='Actual')
+
+    assert before == ValueCleaner.detect_problematic_values(df)
+    assert after == ValueCleaner.detect_problematic_values(cleaned)
+    pd.testing.assert_frame_equal(cleaned, ValueCleaner.clean_dataframe_columns(df, 'Element', 'Actual'))
+    assert cleaned['Actual'].tolist()[:2] == [10.5, 1234.56]
+
+
+def test_numeric_stats_count_rows():
+    series = pd.Series(["10,5", "10,5", "1.2.3", "¿¿¿", None, "12 mm"], dtype=object)
+
+    cleaned, stats = ValueCleaner.parse_numeric_series(series)
+
+    pd.testing.assert_series_equal(cleaned, series.apply(ValueCleaner.clean_numeric_value))
+    assert stats['total'] == 6
+    assert stats['empty'] == 2
+    assert stats['converted'] + stats['fallback'] == 3
+    assert stats['failed'] == 1